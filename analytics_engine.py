@@ -2,103 +2,577 @@
 # File: analytics_engine.py
 # =============================
 
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import re
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import config  # Import the centralized configuration
 
-def _build_person_archetypes(df: pd.DataFrame, user_df: pd.DataFrame) -> pd.DataFrame:
+def build_sparse_scores(df: pd.DataFrame, task_col: str = 'Task_Prefixed') -> Dict[str, Any]:
+    """
+    Coordinate (COO) representation of the answered cells: one entry per (person, task) score.
+    Memory is proportional to answered cells; unanswered cells are simply absent.
+    'weight' is None (all answers count fully) unless a caller down-weights some entries.
+    """
+    person, names = pd.factorize(df['Name'], sort=True)
+    task, tasks = pd.factorize(df[task_col], sort=True)
+    return {
+        'person': person.astype(np.int32),
+        'task': task.astype(np.int32),
+        'score': df['Score'].to_numpy(dtype=float),
+        'weight': None,
+        'names': pd.Index(names, name='Name'),
+        'tasks': pd.Index(tasks, name=task_col),
+    }
+
+
+def build_score_matrix(scores: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Scatters sparse scores into a dense people x tasks float matrix (NaN = not answered).
+    Only for views that genuinely need the full grid.
+    """
+    matrix = np.full((len(scores['names']), len(scores['tasks'])), np.nan)
+    matrix[scores['person'], scores['task']] = scores['score']
+    return {
+        'names': scores['names'],
+        'tasks': scores['tasks'],
+        'scores': matrix,
+    }
+
+
+def _person_lookup(scores: Dict[str, Any], user_df: pd.DataFrame, column: str) -> np.ndarray:
+    """Per-person attribute from user_df, aligned to the sparse person codes."""
+    return user_df.drop_duplicates('Name').set_index('Name')[column].reindex(scores['names']).to_numpy()
+
+
+def _build_person_archetypes(scores: Dict[str, Any], user_df: pd.DataFrame) -> pd.DataFrame:
     """Calculates Avg Score, Volatility, and defines a persona archetype for each person."""
-    summary = df.groupby('Name')['Score'].agg(['mean', 'std']).rename(columns={'mean': 'Avg Score', 'std': 'Volatility'})
-    median_v = summary['Volatility'].median()
-    median_p = summary['Avg Score'].median()
-
-    def archetype(row: pd.Series) -> str:
-        """Assigns an archetype based on performance and volatility."""
-        if pd.isna(row['Volatility']) or row['Avg Score'] == 0:
-            return config.ARCHETYPE_NEEDS_SUPPORT
-        if row['Avg Score'] >= median_p and row['Volatility'] <= median_v:
-            return config.ARCHETYPE_VERSATILE_LEADER
-        if row['Avg Score'] >= median_p and row['Volatility'] > median_v:
-            return config.ARCHETYPE_NICHE_SPECIALIST
-        if row['Avg Score'] < median_p and row['Volatility'] <= median_v:
-            return config.ARCHETYPE_CONSISTENT_LEARNER
-        return config.ARCHETYPE_NEEDS_SUPPORT
-
-    summary['Archetype'] = summary.apply(archetype, axis=1)
-    
+    summary = (
+        pd.Series(scores['score']).groupby(scores['person']).agg(['mean', 'std'])
+        .rename(columns={'mean': 'Avg Score', 'std': 'Volatility'})
+        .set_axis(scores['names'])
+    )
+    return assign_archetypes(summary, user_df)
+
+
+def archetype_labels(avg: np.ndarray, volatility: np.ndarray, median_p: float, median_v: float) -> np.ndarray:
+    """Assigns an archetype based on performance and volatility relative to the team medians."""
+    with np.errstate(invalid='ignore'):
+        return np.select(
+            [
+                np.isnan(volatility) | (avg == 0),
+                (avg >= median_p) & (volatility <= median_v),
+                (avg >= median_p) & (volatility > median_v),
+                (avg < median_p) & (volatility <= median_v),
+            ],
+            [
+                config.ARCHETYPE_NEEDS_SUPPORT,
+                config.ARCHETYPE_VERSATILE_LEADER,
+                config.ARCHETYPE_NICHE_SPECIALIST,
+                config.ARCHETYPE_CONSISTENT_LEARNER,
+            ],
+            default=config.ARCHETYPE_NEEDS_SUPPORT,
+        ).astype(object)
+
+
+def assign_archetypes(summary: pd.DataFrame, user_df: pd.DataFrame) -> pd.DataFrame:
+    """Adds the persona archetype (and Team Leader / Scheduler tag) to per-person Avg Score and Volatility."""
+    summary['Archetype'] = archetype_labels(
+        summary['Avg Score'].to_numpy(), summary['Volatility'].to_numpy(),
+        summary['Avg Score'].median(), summary['Volatility'].median()
+    )
+
     if 'Team Leader' in user_df.columns and 'Scheduler tag' in user_df.columns:
         summary = summary.join(user_df.set_index('Name')[['Team Leader', 'Scheduler tag']], how='left')
     
     return summary
 
 
-def compute_analytics(df: pd.DataFrame, user_df: pd.DataFrame) -> Dict[str, Any]:
+def default_thresholds() -> Dict[str, float]:
+    """Returns the threshold set defined in config.py (used as what-if slider defaults)."""
+    return {
+        'expert': config.EXPERT_THRESHOLD,
+        'beginner': config.BEGINNER_THRESHOLD,
+        'pipeline_min': config.PIPELINE_MIN,
+        'pipeline_max': config.PIPELINE_MAX,
+        'critical_avg': config.CRITICAL_AVG_SCORE,
+        'high_risk': config.HIGH_RISK_INDEX,
+    }
+
+
+def build_threshold_index(
+    scores: Dict[str, Any],
+    user_df: pd.DataFrame,
+    person_summary: pd.DataFrame,
+    as_of: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Precomputes per-task sorted scores so threshold-dependent views can be rebuilt cheaply.
+    Scores are sorted by (task, score) and encoded as a single monotonic key array, so the
+    count of scores below a threshold for every task is one vectorized searchsorted call.
+    With per-answer weights, prefix sums of the sorted weights turn counts into weighted counts.
+    """
+    codes, tasks = scores['task'], scores['tasks']
+    values = scores['score']
+    order = np.lexsort((values, codes))
+    sorted_codes = codes[order]
+    sorted_scores = values[order]
+    offsets = np.searchsorted(sorted_codes, np.arange(len(tasks) + 1))
+
+    # Key = code * n_unique + rank of the score among all distinct scores: an exact integer,
+    # strictly grouped by task and sorted by score within a task
+    unique_scores = np.unique(sorted_scores)
+    n_unique = max(len(unique_scores), 1)
+    keys = sorted_codes.astype(np.int64) * n_unique + np.searchsorted(unique_scores, sorted_scores)
+
+    # Highest score per task among people whose license expires inside the window
+    as_of = as_of or datetime.now()
+    expiration_window = as_of + pd.Timedelta(days=config.LICENSE_EXPIRATION_WINDOW_DAYS)
+    person_expiry = pd.Series(_person_lookup(scores, user_df, 'License Expiration'), dtype='datetime64[ns]')
+    expiring_person = (person_expiry.notna() & (person_expiry < expiration_window)).to_numpy()
+    expiring = expiring_person[scores['person']]
+    max_expiring_score = np.full(len(tasks), -np.inf)
+    np.maximum.at(max_expiring_score, codes[expiring], values[expiring])
+
+    sorted_persons = scores['person'][order]
+    sorted_rows = pd.DataFrame({
+        'Name': scores['names'].to_numpy()[sorted_persons],
+        'Archetype': person_summary['Archetype'].reindex(scores['names']).to_numpy()[sorted_persons],
+        'Task_Prefixed': tasks.to_numpy()[sorted_codes],
+        'Score': sorted_scores,
+    })
+
+    weights = scores.get('weight')
+    if weights is None:
+        cum_weights = None
+        avg_score = pd.Series(values).groupby(codes).mean().reindex(np.arange(len(tasks))).to_numpy()
+    else:
+        cum_weights = np.concatenate([[0.0], np.cumsum(weights[order])])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_score = (np.bincount(codes, weights * values, minlength=len(tasks))
+                         / np.bincount(codes, weights, minlength=len(tasks)))
+
+    return {
+        'tasks': tasks,
+        'keys': keys,
+        'offsets': offsets,
+        'unique_scores': unique_scores,
+        'n_unique': n_unique,
+        'avg_score': avg_score,
+        'cum_weights': cum_weights,
+        'max_expiring_score': max_expiring_score,
+        'as_of': as_of,  # Evaluation date of the expiration window
+        'sorted_scores': sorted_scores,
+        'sorted_persons': sorted_persons,
+        'sorted_rows': sorted_rows,
+    }
+
+
+def _count_below(index: Dict[str, Any], threshold: float, side: str = 'left') -> np.ndarray:
+    """Per-task count of scores < threshold (or <= threshold when side='right')."""
+    codes = np.arange(len(index['tasks']), dtype=np.int64)
+    # Distinct scores below the threshold, in [0, n_unique]: the query never leaves the task's segment
+    rank = np.searchsorted(index['unique_scores'], threshold, side=side)
+    return np.searchsorted(index['keys'], codes * index['n_unique'] + rank) - index['offsets'][:-1]
+
+
+def _weight_below(index: Dict[str, Any], threshold: float) -> np.ndarray:
+    """Per-task count (weighted count if the index carries weights) of scores < threshold."""
+    below = _count_below(index, threshold)
+    if index['cum_weights'] is None:
+        return below
+    starts = index['offsets'][:-1]
+    return index['cum_weights'][starts + below] - index['cum_weights'][starts]
+
+
+def build_task_summary(
+    tasks: pd.Index,
+    avg_score: np.ndarray,
+    expert_count: np.ndarray,
+    beginner_count: np.ndarray,
+    max_expiring_score: np.ndarray,
+    thresholds: Dict[str, float]
+) -> pd.DataFrame:
+    """Per-task summary (risk, SPOF, competency, expiration overlay) from per-task aggregates."""
+    task_summary = pd.DataFrame({
+        'Avg_Score': avg_score,
+        'Expert_Count': expert_count,
+        'Beginner_Count': beginner_count,
+    }, index=tasks)
+    task_summary['Risk Index'] = (task_summary['Beginner_Count'] + 1) / (task_summary['Expert_Count'] + 1)
+    task_summary['SPOF'] = task_summary['Expert_Count'] == 1
+    task_summary['Competency_Score'] = task_summary['Avg_Score'] * (task_summary['Expert_Count'] + 1)
+    task_summary['Expiration Risk'] = max_expiring_score >= thresholds['expert']
+    return task_summary
+
+
+def apply_thresholds(index: Dict[str, Any], thresholds: Dict[str, float]) -> Dict[str, Any]:
+    """
+    Rebuilds task_summary, risk_radar, risk_matrix and talent_pipeline for a threshold set.
+    Costs O(tasks * log rows) plus the size of the pipeline output. Expert/beginner counts
+    are weighted counts when the index was built with down-weighted answers.
+    """
+    if index['cum_weights'] is None:
+        counts = np.diff(index['offsets'])
+    else:
+        counts = np.diff(index['cum_weights'][index['offsets']])
+    expert_count = counts - _weight_below(index, thresholds['expert'])
+    beginner_count = _weight_below(index, thresholds['beginner'])
+
+    task_summary = build_task_summary(
+        index['tasks'], index['avg_score'], expert_count, beginner_count, index['max_expiring_score'], thresholds
+    )
+
+    # Talent pipeline: medium performers in critical tasks, sliced straight out of the sorted segments
+    critical = np.flatnonzero(index['avg_score'] < thresholds['critical_avg'])
+    starts = index['offsets'][critical] + _count_below(index, thresholds['pipeline_min'])[critical]
+    stops = index['offsets'][critical] + _count_below(index, thresholds['pipeline_max'], side='right')[critical]
+    lengths = np.maximum(stops - starts, 0)
+    positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    talent_pipeline = index['sorted_rows'].iloc[positions].sort_values('Score', ascending=False)
+
+    return {
+        'thresholds': dict(thresholds),
+        'task_summary': task_summary,
+        'risk_radar': task_summary.sort_values(by='Risk Index', ascending=False),
+        'risk_matrix': task_summary[task_summary['Risk Index'] > thresholds['high_risk']],
+        'talent_pipeline': talent_pipeline,
+    }
+
+
+def bootstrap_resample_count(index: Dict[str, Any]) -> int:
+    """
+    Resamples to draw for a dataset: BOOTSTRAP_RESAMPLES while the draw volume (answered cells x
+    resamples) fits BOOTSTRAP_MAX_DRAWS, scaled down only for datasets beyond that.
+    """
+    num_rows = max(len(index['sorted_scores']), 1)
+    return int(np.clip(config.BOOTSTRAP_MAX_DRAWS // num_rows, config.BOOTSTRAP_MIN_RESAMPLES, config.BOOTSTRAP_RESAMPLES))
+
+
+def bootstrap_task_intervals(
+    index: Dict[str, Any],
+    thresholds: Dict[str, float],
+    n_resamples: int = config.BOOTSTRAP_RESAMPLES,
+    confidence: float = config.BOOTSTRAP_CONFIDENCE,
+    seed: int = 0,
+    max_block_cells: int = 4_000_000
+) -> pd.DataFrame:
+    """
+    Percentile bootstrap intervals for every task's Avg_Score, Expert_Count and Risk Index.
+    Resampling is unweighted, even when the index carries down-weighting.
+    Each resample draws, for all tasks at once, random positions inside each task's sorted
+    segment of the threshold index; per-task aggregates come from np.add.reduceat. Resamples
+    are processed in blocks of at most `max_block_cells` drawn scores to bound memory.
+    """
+    rng = np.random.default_rng(seed)
+    sorted_scores = index['sorted_scores']
+    starts = index['offsets'][:-1]
+    counts = np.diff(index['offsets'])
+    num_rows, num_tasks = len(sorted_scores), len(counts)
+    row_start = np.repeat(starts, counts)
+    row_count = np.repeat(counts, counts).astype(np.float32)
+    row_last = np.repeat(starts + counts - 1, counts)
+
+    avg = np.empty((n_resamples, num_tasks))
+    experts = np.empty((n_resamples, num_tasks))
+    beginners = np.empty((n_resamples, num_tasks))
+    block = max(1, max_block_cells // max(num_rows, 1))
+    for lo in range(0, n_resamples, block):
+        hi = min(lo + block, n_resamples)
+        # float32 draws are cheaper than integer draws; clamp guards the rounding edge case
+        offsets = (rng.random((hi - lo, num_rows), dtype=np.float32) * row_count).astype(np.intp)
+        drawn = sorted_scores[np.minimum(row_start + offsets, row_last)]
+        avg[lo:hi] = np.add.reduceat(drawn, starts, axis=1) / counts
+        experts[lo:hi] = np.add.reduceat(drawn >= thresholds['expert'], starts, axis=1, dtype=np.int32)
+        beginners[lo:hi] = np.add.reduceat(drawn < thresholds['beginner'], starts, axis=1, dtype=np.int32)
+    risk = (beginners + 1) / (experts + 1)
+
+    tail = (1 - confidence) / 2
+    intervals = pd.DataFrame(index=index['tasks'])
+    for label, samples in [('Avg_Score', avg), ('Expert_Count', experts), ('Risk Index', risk)]:
+        low, high = np.quantile(samples, [tail, 1 - tail], axis=0)
+        intervals[f'{label} Low'] = low
+        intervals[f'{label} High'] = high
+    return intervals
+
+
+def build_ranking_index(
+    scores: Dict[str, Any],
+    df: pd.DataFrame,
+    user_df: pd.DataFrame,
+    person_summary: pd.DataFrame,
+    threshold_index: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Rank and percentile of every person overall, per category and per task, built once per dataset.
+    Ranks are 'min' ranks by descending score (ties share the best rank, 0 = not ranked); the
+    percentile is the share of ranked people at or below that rank (1.0 = top).
+    Overall and per-category values are dense per-person arrays (categories are few). Per-task
+    values are stored per answered cell in the threshold index's (task, score) order, plus a
+    person-major permutation, so a profile or a leaderboard is a slice rather than a filter.
+    """
+    names = scores['names']
+    n_people = len(names)
+
+    # Overall
+    overall_rank = person_summary['Avg Score'].reindex(names).rank(method='min', ascending=False).to_numpy(dtype=np.int32)
+    overall_percentile = ((n_people - overall_rank + 1) / max(n_people, 1)).astype(np.float32)
+
+    # Per category: people x categories means from one bincount
+    task_category = df.drop_duplicates('Task_Prefixed').set_index('Task_Prefixed')['Category'].reindex(scores['tasks'])
+    task_category_code, categories = pd.factorize(task_category, sort=True)
+    n_categories = len(categories)
+    cell_category = task_category_code[scores['task']]
+    flat = scores['person'].astype(np.int64) * n_categories + cell_category
+    counts = np.bincount(flat, minlength=n_people * n_categories).reshape(n_people, n_categories)
+    sums = np.bincount(flat, scores['score'], minlength=n_people * n_categories).reshape(n_people, n_categories)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        category_scores = sums / counts
+        team_category_avg = sums.sum(axis=0) / counts.sum(axis=0)
+    category_ranked = (counts > 0).sum(axis=0)
+    # Means are rounded for ranking so equal averages tie regardless of summation order
+    category_rank = np.nan_to_num(
+        pd.DataFrame(category_scores.round(9)).rank(method='min', ascending=False).to_numpy(), nan=0
+    ).astype(np.int32)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        category_percentile = np.where(
+            category_rank > 0, (category_ranked - category_rank + 1) / category_ranked, np.nan
+        ).astype(np.float32)
+    # Leaderboard order per category: best first, unranked (NaN) last, ties by name
+    category_order = np.argsort(-category_scores.round(9), axis=0, kind='stable').astype(np.int32)
+
+    # Per task: within each sorted (task, score) segment, rank = 1 + number of strictly higher scores
+    keys, offsets = threshold_index['keys'], threshold_index['offsets']
+    task_ranked = np.diff(offsets)
+    cell_task = np.repeat(np.arange(len(scores['tasks']), dtype=np.int32), task_ranked)
+    cell_rank = (offsets[cell_task + 1] - np.searchsorted(keys, keys, side='right') + 1).astype(np.int32)
+    cell_percentile = ((task_ranked[cell_task] - cell_rank + 1) / task_ranked[cell_task]).astype(np.float32)
+
+    # Person-major view of the same cells (each person's tasks stay in task order)
+    cell_person = threshold_index['sorted_persons']
+    person_order = np.argsort(cell_person, kind='stable').astype(np.int32)
+    person_offsets = np.searchsorted(cell_person[person_order], np.arange(n_people + 1))
+
+    # Roster: every person in the file, assessed or not, best rank first
+    roster = user_df[['Name']].drop_duplicates().reset_index(drop=True)
+    position = names.get_indexer(roster['Name'])
+    assessed = position >= 0
+    roster['Rank'] = pd.Series(overall_rank[position], dtype='Int64').where(assessed)
+    roster['Percentile'] = np.where(assessed, overall_percentile[position], np.nan)
+    roster['Avg Score'] = person_summary['Avg Score'].reindex(roster['Name']).to_numpy()
+    roster['Archetype'] = person_summary['Archetype'].reindex(roster['Name']).to_numpy()
+    roster['Assessed'] = assessed
+    roster = roster.sort_values('Rank', na_position='last', kind='stable', ignore_index=True)
+
+    return {
+        'names': names,
+        'tasks': scores['tasks'],
+        'categories': pd.Index(categories, name='Category'),
+        'overall_rank': overall_rank,
+        'overall_percentile': overall_percentile,
+        'category_scores': category_scores,
+        'team_category_avg': team_category_avg,
+        'category_rank': category_rank,
+        'category_percentile': category_percentile,
+        'category_ranked': category_ranked,
+        'category_order': category_order,
+        'task_offsets': offsets,
+        'task_ranked': task_ranked,
+        'cell_task': cell_task,
+        'cell_person': cell_person,
+        'cell_score': threshold_index['sorted_scores'],
+        'cell_rank': cell_rank,
+        'cell_percentile': cell_percentile,
+        'person_order': person_order,
+        'person_offsets': person_offsets,
+        'roster': roster,
+    }
+
+
+def person_rankings(index: Dict[str, Any], name: str) -> Optional[Dict[str, Any]]:
+    """
+    One person's overall, per-category and per-task standing read from the ranking index.
+    Categories the person did not answer have Score NaN and Rank 0. Returns None for people without scores.
+    """
+    p = index['names'].get_indexer([name])[0]
+    if p < 0:
+        return None
+    categories = pd.DataFrame({
+        'Score': index['category_scores'][p],
+        'Team Avg': index['team_category_avg'],
+        'Rank': index['category_rank'][p],
+        'Of': index['category_ranked'],
+        'Percentile': index['category_percentile'][p],
+    }, index=index['categories'])
+    cells = index['person_order'][index['person_offsets'][p]:index['person_offsets'][p + 1]]
+    tasks = pd.DataFrame({
+        'Score': index['cell_score'][cells],
+        'Rank': index['cell_rank'][cells],
+        'Of': index['task_ranked'][index['cell_task'][cells]],
+        'Percentile': index['cell_percentile'][cells],
+    }, index=index['tasks'][index['cell_task'][cells]])
+    return {
+        'rank': int(index['overall_rank'][p]),
+        'of': len(index['names']),
+        'percentile': float(index['overall_percentile'][p]),
+        'categories': categories,
+        'tasks': tasks,
+    }
+
+
+def ranking_leaderboard(index: Dict[str, Any], by: str, key: str) -> pd.DataFrame:
+    """Everyone ranked on one task (by='Task') or one category (by='Category'), best first."""
+    if by == 'Task':
+        t = index['tasks'].get_loc(key)
+        cells = np.arange(index['task_offsets'][t + 1] - 1, index['task_offsets'][t] - 1, -1)
+        people = index['cell_person'][cells]
+        score, rank, percentile = index['cell_score'][cells], index['cell_rank'][cells], index['cell_percentile'][cells]
+    else:
+        c = index['categories'].get_loc(key)
+        people = index['category_order'][:index['category_ranked'][c], c]
+        score = index['category_scores'][people, c]
+        rank, percentile = index['category_rank'][people, c], index['category_percentile'][people, c]
+    return pd.DataFrame({
+        'Rank': rank,
+        'Name': index['names'].to_numpy()[people],
+        'Score': score,
+        'Percentile': percentile,
+    })
+
+
+def build_expiry_index(scores: Dict[str, Any], user_df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Sorts every (task, person) score row by task and license expiry day so expert coverage
+    over time can be answered with cumulative counts instead of re-filtering per date.
+    """
+    codes = scores['task']
+    person_expiry = pd.Series(_person_lookup(scores, user_df, 'License Expiration'), dtype='datetime64[ns]')
+    # Days since epoch; a missing expiry date never lapses inside any horizon
+    person_days = person_expiry.to_numpy(dtype='datetime64[D]').astype(np.int64)
+    person_days[person_expiry.isna().to_numpy()] = np.iinfo(np.int64).max
+    person_licensed = pd.Series(_person_lookup(scores, user_df, 'Active License')).fillna(False).to_numpy(dtype=bool)
+    expiry_days = person_days[scores['person']]
+    order = np.lexsort((expiry_days, codes))
+
+    return {
+        'tasks': scores['tasks'],
+        'codes': codes[order],
+        'expiry_days': expiry_days[order],
+        'scores': scores['score'][order],
+        'licensed': person_licensed[scores['person']][order],
+    }
+
+
+def forecast_expert_coverage(
+    index: Dict[str, Any],
+    as_of: datetime,
+    horizon_days: int = 180,
+    step_days: int = 7,
+    expert_threshold: float = config.EXPERT_THRESHOLD
+) -> pd.DataFrame:
+    """
+    Number of licensed experts remaining per task (rows) on each forecast date (columns).
+    A license counts as lapsed on its expiration day. Evaluated for all tasks and dates in
+    one searchsorted pass; results depend only on the arguments, so they are cacheable.
+    """
+    start_day = np.datetime64(pd.Timestamp(as_of).normalize(), 'D').astype(np.int64)
+    offsets_days = np.arange(0, horizon_days + 1, step_days)
+    num_tasks = len(index['tasks'])
+
+    # Keep licensed experts; the sorted (task, expiry) order survives the boolean mask
+    mask = index['licensed'] & (index['scores'] >= expert_threshold)
+    codes = index['codes'][mask]
+    relative = np.clip(index['expiry_days'][mask] - start_day, -1, horizon_days + 1)
+    span = horizon_days + 3
+    keys = codes * span + relative + 1
+
+    totals = np.bincount(codes, minlength=num_tasks)
+    task_starts = np.searchsorted(codes, np.arange(num_tasks))
+    queries = (np.arange(num_tasks)[:, None] * span + offsets_days[None, :] + 1).ravel()
+    lapsed = np.searchsorted(keys, queries, side='right').reshape(num_tasks, -1) - task_starts[:, None]
+
+    dates = pd.to_datetime(start_day + offsets_days, unit='D')
+    return pd.DataFrame(totals[:, None] - lapsed, index=index['tasks'], columns=pd.DatetimeIndex(dates, name='Date'))
+
+
+def summarize_coverage_forecast(forecast: pd.DataFrame) -> pd.DataFrame:
+    """First forecast date on which each task drops to one expert and to zero experts (NaT = never)."""
+    values = forecast.to_numpy()
+    dates = forecast.columns.to_numpy()
+    summary = pd.DataFrame({'Experts Now': values[:, 0] if values.shape[1] else 0}, index=forecast.index)
+    for label, limit in [('Drops to One', 1), ('Drops to Zero', 0)]:
+        hit = values <= limit
+        first = np.where(hit.any(axis=1), dates[hit.argmax(axis=1)], np.datetime64('NaT'))
+        summary[label] = pd.to_datetime(first)
+    return summary.sort_values(['Drops to Zero', 'Drops to One'], na_position='last')
+
+
+def compute_analytics(
+    df: pd.DataFrame,
+    user_df: pd.DataFrame,
+    as_of: Optional[datetime] = None,
+    response_quality: Optional[pd.DataFrame] = None,
+    quality_mode: str = 'include'
+) -> Dict[str, Any]:
     """
     Computes all advanced analytics for the dashboard.
+    `as_of` fixes the evaluation date for expiry-based flags (defaults to now).
+    `quality_mode` controls people flagged in `response_quality`: 'include' (as-is),
+    'downweight' (their answers count config.QUALITY_DOWNWEIGHT in task statistics),
+    or 'exclude' (dropped before any aggregation).
     """
     analytics = {}
+    flagged = pd.Index([])
+    if response_quality is not None and not response_quality.empty:
+        flagged = response_quality.index[response_quality['Flag'] != '']
+    if quality_mode == 'exclude' and len(flagged):
+        df = df[~df['Name'].isin(flagged)]
     if df.empty:
         return analytics
 
     analytics['df_merged_for_lookup'] = df 
+    analytics['quality_mode'] = quality_mode
+
+    # 0. Sparse (COO) scores: every aggregation below runs on these arrays
+    scores = build_sparse_scores(df)
+    if quality_mode == 'downweight' and len(flagged):
+        flagged_person = scores['names'].isin(flagged)
+        scores['weight'] = np.where(flagged_person[scores['person']], config.QUALITY_DOWNWEIGHT, 1.0)
+    analytics['scores'] = scores
 
     # 1. Personas / Archetypes
-    person_summary = _build_person_archetypes(df, user_df)
+    person_summary = _build_person_archetypes(scores, user_df)
     analytics['person_summary'] = person_summary
 
-    # 2. Task Summary with FULL Risk Analysis
-    task_summary = df.groupby('Task_Prefixed').agg(
-        Avg_Score=('Score', 'mean'),
-        Expert_Count=('Score', lambda s: (s >= config.EXPERT_THRESHOLD).sum()),
-        Beginner_Count=('Score', lambda s: (s < config.BEGINNER_THRESHOLD).sum()),
-    )
-    task_summary['Risk Index'] = (task_summary['Beginner_Count'] + 1) / (task_summary['Expert_Count'] + 1)
-    task_summary['SPOF'] = task_summary['Expert_Count'] == 1
-    task_summary['Competency_Score'] = task_summary['Avg_Score'] * (task_summary['Expert_Count'] + 1)
+    # 2-4. Threshold-dependent views (task summary, risk, pipeline) via the threshold index
+    threshold_index = build_threshold_index(scores, user_df, person_summary, as_of)
+    analytics['threshold_index'] = threshold_index
+    analytics.update(apply_thresholds(threshold_index, default_thresholds()))
 
-    # 3. License expiration risk overlay
-    experts_df = df[df['Score'] >= config.EXPERT_THRESHOLD][['Name', 'Task_Prefixed']]
-    experts_with_exp = pd.merge(experts_df, user_df[['Name', 'License Expiration']], on='Name', how='left')
-    
-    expiration_window = datetime.now() + pd.Timedelta(days=config.LICENSE_EXPIRATION_WINDOW_DAYS)
-    
-    expiring_experts = experts_with_exp[
-        (experts_with_exp['License Expiration'].notna()) & 
-        (experts_with_exp['License Expiration'] < expiration_window)
-    ]
-    tasks_with_exp_risk = set(expiring_experts['Task_Prefixed'].unique())
-    task_summary['Expiration Risk'] = task_summary.index.isin(tasks_with_exp_risk)
-    
-    analytics['task_summary'] = task_summary
-    analytics['risk_radar'] = task_summary.sort_values(by='Risk Index', ascending=False)
-    analytics['risk_matrix'] = task_summary[task_summary['Risk Index'] > config.HIGH_RISK_INDEX]
-
-    # --- EDIT: Removed 'opportunity_lens' calculation ---
+    # 5. Sorted license-expiry index for expert coverage forecasts
+    analytics['expiry_index'] = build_expiry_index(scores, user_df)
 
-    # 4. Talent pipeline: medium performers in critical tasks
-    critical_tasks = task_summary[task_summary['Avg_Score'] < config.CRITICAL_AVG_SCORE].index
-    pipeline_candidates = df[
-        df['Task_Prefixed'].isin(critical_tasks) & 
-        df['Score'].between(config.PIPELINE_MIN, config.PIPELINE_MAX)
-    ]
-    pipeline_candidates = pd.merge(pipeline_candidates, person_summary.reset_index()[['Name', 'Archetype']], on='Name')
-    analytics['talent_pipeline'] = pipeline_candidates[['Name', 'Archetype', 'Task_Prefixed', 'Score']].sort_values('Score', ascending=False)
+    # 6. Overall / per-category / per-task ranks for profiles, leaderboards and the roster
+    analytics['ranking_index'] = build_ranking_index(scores, df, user_df, person_summary, threshold_index)
 
     return analytics
 
 
+# Theme patterns are plain literal alternations (no anchors or lookarounds)
+COMMENT_THEMES = {
+    'Training/Guidance': r'training|learn|course|session|refresher|guide|help|practice',
+    'Isometric Skills': r'isometric|iso',
+    'Photo Editing': r'photo|background|remove|color|edit|retouch',
+    'Vector/Technical': r'vector|mask|clipping|rasterize|bezier|pen tool|illustrator',
+    'Confidence/Experience': r'confident|beginner|expert|feel|experience|use it|long time',
+    'Tools/Software': r'tool|affinity|photoshop|version|update|install',
+}
+
+
 def analyze_comment_themes(df_comments: pd.Series) -> pd.DataFrame:
     """Uses regex to find common themes in a Series of free-text comments."""
-    themes = {
-        'Training/Guidance': r'training|learn|course|session|refresher|guide|help|practice',
-        'Isometric Skills': r'isometric|iso',
-        'Photo Editing': r'photo|background|remove|color|edit|retouch',
-        'Vector/Technical': r'vector|mask|clipping|rasterize|bezier|pen tool|illustrator',
-        'Confidence/Experience': r'confident|beginner|expert|feel|experience|use it|long time',
-        'Tools/Software': r'tool|affinity|photoshop|version|update|install',
-    }
+    themes = COMMENT_THEMES
     theme_counts = {theme: 0 for theme in themes}
     all_comments = ' '.join(df_comments.dropna().unique())
     
@@ -0,0 +1,323 @@
+# =============================
+# File: api_server.py
+# =============================
+"""
+Standalone HTTP/JSON analytics API for other internal tools (no Streamlit UI required).
+
+Usage:
+    python api_server.py --data userData.csv [--data wave2=other.csv] [--port 8600] [--workers 8]
+
+Endpoints (GET):
+    /datasets
+    /datasets/<name>/task_summary | risk_matrix | talent_pipeline | person_summary
+    /datasets/<name>/expiry             ?as_of=YYYY-MM-DD
+    /datasets/<name>/coverage_forecast  ?as_of=YYYY-MM-DD&horizon_days=180&step_days=7
+    /datasets/<name>/heatmap            ?rows=team|cluster&row=<group>&col=<Category>&max_cells=N
+
+Threshold overrides (expert, beginner, pipeline_min, pipeline_max, critical_avg, high_risk)
+are accepted as query parameters (score thresholds in [0, 1]). Add ?format=arrow (or send
+'Accept: application/vnd.apache.arrow.stream') for an Arrow IPC stream instead of JSON.
+Every response carries a strong ETag; 'If-None-Match' returns 304 Not Modified.
+
+Files larger than config.CHUNK_FILE_SIZE_MB are analyzed out of core (chunked_engine) at the
+default thresholds and serve task_summary, risk_matrix and person_summary only.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import pandas as pd
+
+import config
+from analytics_engine import (
+    apply_thresholds, compute_analytics, default_thresholds,
+    forecast_expert_coverage, summarize_coverage_forecast
+)
+from chunked_engine import compute_analytics_chunked, use_out_of_core
+from data_engine import load_and_process_data
+from heatmap_engine import build_heatmap_index, heatmap_tile, tile_frame
+
+ARROW_MIME = "application/vnd.apache.arrow.stream"
+
+# name -> {'data', 'analytics', 'heatmap_index', 'people', 'out_of_core', 'version'}; populated once by load_datasets()
+DATASETS: Dict[str, Dict[str, Any]] = {}
+
+# Endpoints that only need the aggregates compute_analytics_chunked() produces
+OUT_OF_CORE_ENDPOINTS = {'task_summary', 'risk_matrix', 'person_summary'}
+
+
+def load_datasets(specs: Dict[str, str]) -> None:
+    """
+    Loads and analyzes every dataset once. The version hash (file + catalogs) seeds the ETags.
+    Files above config.CHUNK_FILE_SIZE_MB are streamed through the out-of-core path instead.
+    """
+    for name, path in specs.items():
+        digest = hashlib.sha256()
+        for file_path in [path, *config.TASK_CATALOGS]:
+            with open(file_path, 'rb') as f:
+                for block in iter(lambda: f.read(2**20), b''):
+                    digest.update(block)
+
+        if use_out_of_core(Path(path).stat().st_size):
+            analytics = compute_analytics_chunked(path, config.TASK_CATALOGS)
+            if not analytics:
+                raise ValueError(f"Dataset '{name}' ({path}) contains no valid skill data.")
+            DATASETS[name] = {
+                'data': None,
+                'analytics': analytics,
+                'heatmap_index': None,
+                'people': int(analytics['total_count']),
+                'out_of_core': True,
+                'version': digest.hexdigest(),
+            }
+            continue
+
+        data = load_and_process_data(path, config.TASK_CATALOGS)
+        if data is None or data['merged_df'].empty:
+            raise ValueError(f"Dataset '{name}' ({path}) contains no valid skill data.")
+        analytics = compute_analytics(data['merged_df'], data['user_df'], response_quality=data.get('response_quality'))
+        DATASETS[name] = {
+            'data': data,
+            'analytics': analytics,
+            'heatmap_index': build_heatmap_index(analytics),
+            'people': int(data['total_count']),
+            'out_of_core': False,
+            'version': digest.hexdigest(),
+        }
+
+
+# --- Endpoint renderers: (dataset entry, params) -> DataFrame ---
+
+def _as_of(params: Dict[str, str]) -> pd.Timestamp:
+    return pd.Timestamp(params.get('as_of') or datetime.now().date())
+
+
+def _threshold_overrides(params: Dict[str, str]) -> Dict[str, float]:
+    """Threshold query parameters as floats; score thresholds must lie in [0, 1], high_risk >= 0."""
+    overrides = {}
+    for name in default_thresholds().keys() & params.keys():
+        value = float(params[name])
+        in_range = value >= 0 if name == 'high_risk' else 0 <= value <= 1
+        if not in_range:
+            raise ValueError(f"{name} must be {'non-negative' if name == 'high_risk' else 'between 0 and 1'}.")
+        overrides[name] = value
+    return overrides
+
+
+def _positive_int(params: Dict[str, str], name: str, default: int) -> int:
+    value = int(params.get(name, default))
+    if value < 1:
+        raise ValueError(f"{name} must be a positive integer.")
+    return value
+
+
+def _views(entry: Dict[str, Any], params: Dict[str, str]) -> Dict[str, Any]:
+    """Threshold-dependent views, re-applied only when the request overrides thresholds."""
+    thresholds = default_thresholds()
+    overrides = _threshold_overrides(params)
+    if not overrides:
+        return entry['analytics']
+    if entry['out_of_core']:
+        raise ValueError("Threshold overrides are not available for out-of-core datasets.")
+    return apply_thresholds(entry['analytics']['threshold_index'], dict(thresholds, **overrides))
+
+
+def _task_summary(entry, params):
+    return _views(entry, params)['task_summary'].reset_index()
+
+
+def _risk_matrix(entry, params):
+    return _views(entry, params)['risk_matrix'].reset_index()
+
+
+def _talent_pipeline(entry, params):
+    return _views(entry, params)['talent_pipeline'].reset_index(drop=True)
+
+
+def _person_summary(entry, params):
+    return entry['analytics']['person_summary'].reset_index()
+
+
+def _expiry(entry, params):
+    expiry = entry['data']['user_df'][['Name', 'Active License', 'License Expiration']].copy()
+    expiry['Days Left'] = (expiry['License Expiration'] - _as_of(params)).dt.days
+    return expiry.sort_values('Days Left', na_position='last', ignore_index=True)
+
+
+def _coverage_forecast(entry, params):
+    forecast = forecast_expert_coverage(
+        entry['analytics']['expiry_index'], _as_of(params),
+        horizon_days=_positive_int(params, 'horizon_days', config.FORECAST_HORIZON_MONTHS * 30),
+        step_days=_positive_int(params, 'step_days', config.FORECAST_STEP_DAYS),
+        expert_threshold=_threshold_overrides(params).get('expert', config.EXPERT_THRESHOLD),
+    )
+    return summarize_coverage_forecast(forecast).reset_index()
+
+
+def _heatmap(entry, params):
+    # One aggregated tile in long format; max_cells can only lower the server's bound
+    max_cells = min(_positive_int(params, 'max_cells', config.HEATMAP_MAX_CELLS), config.HEATMAP_MAX_CELLS)
+    return tile_frame(heatmap_tile(
+        entry['heatmap_index'], params.get('rows', 'team'), params.get('row'), params.get('col'), max_cells=max_cells
+    ))
+
+
+ENDPOINTS: Dict[str, Tuple[Callable[[Dict[str, Any], Dict[str, str]], pd.DataFrame], set]] = {
+    'task_summary': (_task_summary, set(default_thresholds())),
+    'risk_matrix': (_risk_matrix, set(default_thresholds())),
+    'talent_pipeline': (_talent_pipeline, set(default_thresholds())),
+    'person_summary': (_person_summary, set()),
+    'expiry': (_expiry, {'as_of'}),
+    'coverage_forecast': (_coverage_forecast, {'as_of', 'horizon_days', 'step_days', 'expert'}),
+    'heatmap': (_heatmap, {'rows', 'row', 'col', 'max_cells'}),
+}
+
+
+def _encode(df: pd.DataFrame, fmt: str) -> Tuple[bytes, str]:
+    if fmt == 'arrow':
+        import pyarrow as pa  # Optional: only needed for Arrow responses
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue(), ARROW_MIME
+    return df.to_json(orient='records', date_format='iso').encode('utf-8'), "application/json"
+
+
+@lru_cache(maxsize=config.API_CACHE_SIZE)
+def render(dataset: str, endpoint: str, params: Tuple[Tuple[str, str], ...], fmt: str) -> Tuple[bytes, str, str]:
+    """
+    Cached (body, content type, ETag) for a request. The key includes the resolved as_of date,
+    so results that depend on 'today' roll over at midnight.
+    """
+    entry = DATASETS[dataset]
+    body, content_type = _encode(ENDPOINTS[endpoint][0](entry, dict(params)), fmt)
+    etag = '"' + hashlib.sha256(entry['version'].encode() + repr((endpoint, params, fmt)).encode() + body).hexdigest()[:32] + '"'
+    return body, content_type, etag
+
+
+class AnalyticsRequestHandler(BaseHTTPRequestHandler):
+    """Routes GET requests to the cached endpoint renderers."""
+    protocol_version = "HTTP/1.1"  # Keep-alive so load tests measure the service, not TCP setup
+    disable_nagle_algorithm = True  # Headers and body are separate writes; avoid the delayed-ACK stall
+    timeout = 15  # Idle keep-alive connections release their worker after this many seconds
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [p for p in url.path.split('/') if p]
+        params = dict(parse_qsl(url.query))
+        fmt = params.pop('format', 'arrow' if ARROW_MIME in self.headers.get('Accept', '') else 'json')
+
+        if parts == ['datasets']:
+            listing = [{'name': n, 'version': e['version'], 'people': e['people'], 'out_of_core': e['out_of_core']}
+                       for n, e in DATASETS.items()]
+            return self._send(200, json.dumps(listing).encode('utf-8'), "application/json")
+        if len(parts) != 3 or parts[0] != 'datasets' or parts[1] not in DATASETS or parts[2] not in ENDPOINTS:
+            return self._send_error(404, "Not found")
+        if DATASETS[parts[1]]['out_of_core'] and parts[2] not in OUT_OF_CORE_ENDPOINTS:
+            return self._send_error(400, f"'{parts[2]}' is not available for out-of-core dataset '{parts[1]}'.")
+        unknown = set(params) - ENDPOINTS[parts[2]][1]
+        if unknown or fmt not in ('json', 'arrow'):
+            return self._send_error(400, f"Unsupported parameters: {', '.join(sorted(unknown)) or fmt}")
+
+        if 'as_of' in ENDPOINTS[parts[2]][1]:
+            params['as_of'] = params.get('as_of') or datetime.now().date().isoformat()
+        try:
+            body, content_type, etag = render(parts[1], parts[2], tuple(sorted(params.items())), fmt)
+        except (ValueError, TypeError) as e:
+            return self._send_error(400, str(e))
+        except ImportError:
+            return self._send_error(406, "Arrow output requires pyarrow.")
+        except Exception as e:
+            return self._send_error(500, f"Internal error: {type(e).__name__}")
+
+        if etag in [t.strip() for t in self.headers.get('If-None-Match', '').split(',')]:
+            return self._send(304, b'', content_type, etag)
+        return self._send(200, body, content_type, etag)
+
+    def _send(self, status: int, body: bytes, content_type: str, etag: str = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")  # Clients revalidate with If-None-Match
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str):
+        self._send(status, json.dumps({'error': message}).encode('utf-8'), "application/json")
+
+    def log_message(self, format, *args):
+        pass  # Keep the console quiet under load
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that hands each accepted connection to a fixed-size worker pool."""
+
+    def __init__(self, server_address, handler_class, workers: int):
+        super().__init__(server_address, handler_class)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process_in_worker, request, client_address)
+
+    def _process_in_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def create_server(host: str = config.API_HOST, port: int = config.API_PORT, workers: int = config.API_WORKERS) -> PooledHTTPServer:
+    """Builds the server; call load_datasets() first."""
+    return PooledHTTPServer((host, port), AnalyticsRequestHandler, workers)
+
+
+def _parse_dataset_specs(values) -> Dict[str, str]:
+    """'--data path.csv' or '--data name=path.csv' -> {name: path}."""
+    specs = {}
+    for value in values:
+        name, _, path = value.rpartition('=')
+        specs[name or Path(path).stem] = path
+    return specs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', action='append', required=True, help="CSV to serve, optionally as name=path.")
+    parser.add_argument('--host', default=config.API_HOST)
+    parser.add_argument('--port', type=int, default=config.API_PORT)
+    parser.add_argument('--workers', type=int, default=config.API_WORKERS)
+    args = parser.parse_args()
+
+    load_datasets(_parse_dataset_specs(args.data))
+    server = create_server(args.host, args.port, args.workers)
+    print(f"Serving {', '.join(DATASETS)} on http://{args.host}:{server.server_port} ({args.workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,18 +3,15 @@
 # =============================
 
 import streamlit as st
-import pandas as pd
 from pathlib import Path
-from data_engine import load_and_process_data, generate_csv_template, generate_task_guide
-from analytics_engine import compute_analytics, analyze_comment_themes
-from ui_components import (
-    render_strategic_overview,
-    render_affinity_status,
-    render_team_profiles,
-    render_skill_analysis,
-    render_action_workbench
-)
+from catalog import generate_csv_template, generate_task_guide
 from typing import Dict, Any
+import config
+
+# NOTE: pandas, plotly and the engine/UI modules are imported inside the views that use them,
+# so a cold start serving only the landing page does not pay for them.
+
+TASKS_JSON_PATH = config.TASK_CATALOGS
 
 # Page configuration
 st.set_page_config(
@@ -22,6 +19,10 @@ st.set_page_config(
     layout="wide"
 )
 
+# Catalog-derived downloads are memoized per process: computed once at server start
+generate_csv_template(TASKS_JSON_PATH)
+generate_task_guide(TASKS_JSON_PATH)
+
 @st.cache_data
 def load_guide_content(filepath="guide.md") -> str:
     """Reads the content of the markdown guide file."""
@@ -39,7 +40,7 @@ def upload_landing_page():
     st.title("Team Skills Hub") # No Emoji
     st.markdown("Follow the steps to analyze your team's skills, or read the guide below for detailed instructions.")
 
-    tasks_json_path = "tasks.json"
+    tasks_json_path = TASKS_JSON_PATH
 
     st.subheader("Step 1: Get Resources (Optional)")
     st.markdown("Download templates and guides to help you prepare your data.")
@@ -94,8 +95,27 @@ def upload_landing_page():
 
     # --- AUTO-SUBMIT LOGIC ---
     if uploaded_csv is not None:
-        if 'processed_data' not in st.session_state:
+        from chunked_engine import compute_analytics_chunked, use_out_of_core
+        if 'processed_data' not in st.session_state and use_out_of_core(uploaded_csv.size):
+            # Large files are streamed in row blocks; the long-format table is never built
+            with st.spinner(f"Processing '{uploaded_csv.name}' in blocks..."):
+                try:
+                    analytics = compute_analytics_chunked(uploaded_csv, tasks_json_path)
+                except ValueError as e:
+                    st.warning(f"Warning: Could not process the file: {e}") # Use warning
+                    analytics = None
+
+            if analytics:
+                st.session_state.processed_data = {'out_of_core': True, 'source': uploaded_csv, 'analytics': analytics}
+                st.session_state.data_loaded = True
+                st.rerun()
+            elif analytics is not None:
+                st.warning("Processing complete, but no valid skill data was found. Please check your file and upload again.") # Use warning
+            st.session_state.data_loaded = False
+
+        elif 'processed_data' not in st.session_state:
             with st.spinner(f"Processing '{uploaded_csv.name}'..."):
+                from data_engine import load_and_process_data
                 data = load_and_process_data(uploaded_csv, tasks_json_path)
 
             if data is not None and not data['merged_df'].empty:
@@ -126,6 +146,26 @@ def upload_landing_page():
 
 def main_app():
     """Renders the main application interface (dashboard - Minimalist)."""
+    import pandas as pd
+    from analytics_engine import (
+        compute_analytics, analyze_comment_themes, apply_thresholds, default_thresholds, bootstrap_task_intervals,
+        bootstrap_resample_count
+    )
+    from edit_engine import build_edit_state, edited_views, replay_edits
+    from ui_components import (
+        render_threshold_controls,
+        render_uncertainty_controls,
+        render_quality_controls,
+        render_strategic_overview,
+        render_affinity_status,
+        render_team_profiles,
+        render_skill_analysis,
+        render_action_workbench,
+        render_wave_comparison,
+        render_org_rollup,
+        render_score_editor,
+        render_skills_heatmap
+    )
 
     if 'processed_data' not in st.session_state:
         st.warning("Data not found. Please upload again.") # Use warning
@@ -134,6 +174,9 @@ def main_app():
         return
 
     data = st.session_state.processed_data
+    if data.get('out_of_core'):
+        out_of_core_app(data)
+        return
 
     # --- Extract data ---
     df_merged: pd.DataFrame = data['merged_df']
@@ -151,14 +194,64 @@ def main_app():
         st.stop() # Stop seems reasonable if data is empty
 
     # --- Analytics Engine ---
-    analytics: Dict[str, Any] = compute_analytics(df_merged, user_df)
-
-    all_comments = user_df['Comments'].dropna().str.strip()
-    all_comments = all_comments[all_comments != '']
-    if not all_comments.empty:
-        analytics['comment_themes'] = analyze_comment_themes(all_comments)
-    else:
-        analytics['comment_themes'] = pd.DataFrame(columns=['Mentions'])
+    # Full analytics run once per dataset and quality mode; cleared with the session on "Upload New Data"
+    response_quality: pd.DataFrame = data.get('response_quality', pd.DataFrame())
+    num_flagged = int((response_quality['Flag'] != '').sum()) if not response_quality.empty else 0
+    quality_mode = render_quality_controls(num_flagged)
+    if st.session_state.get('base_analytics_mode') != quality_mode:
+        st.session_state.pop('base_analytics', None)
+        st.session_state.base_analytics_mode = quality_mode
+    if 'base_analytics' not in st.session_state:
+        base_analytics: Dict[str, Any] = compute_analytics(
+            df_merged, user_df, response_quality=response_quality, quality_mode=quality_mode
+        )
+        base_analytics['response_quality'] = response_quality
+
+        all_comments = user_df['Comments'].dropna().str.strip()
+        all_comments = all_comments[all_comments != '']
+        if not all_comments.empty:
+            base_analytics['comment_themes'] = analyze_comment_themes(all_comments)
+        else:
+            base_analytics['comment_themes'] = pd.DataFrame(columns=['Mentions'])
+        st.session_state.base_analytics = base_analytics
+
+    # What-if thresholds: only the threshold-dependent views are rebuilt from the precomputed index
+    analytics: Dict[str, Any] = dict(st.session_state.base_analytics)
+    if 'threshold_index' not in analytics:
+        st.warning("No participants remain after excluding flagged responses.")
+        st.stop()
+    thresholds = render_threshold_controls(default_thresholds())
+    if thresholds != analytics.get('thresholds'):
+        analytics.update(apply_thresholds(analytics['threshold_index'], thresholds))
+
+    # In-app score edits: the edit log is replayed onto a fresh incremental state per quality mode,
+    # and its running aggregates replace the task and person views
+    edits = st.session_state.get('score_edits')
+    if edits is not None and edits['mode'] != quality_mode:
+        state = build_edit_state(st.session_state.base_analytics, user_df)
+        edits = {'mode': quality_mode, 'state': state, 'skipped': replay_edits(state, edits['state']['log'] + edits['skipped'])}
+        st.session_state.score_edits = edits
+    if edits is not None and edits['state']['log']:
+        analytics.update(edited_views(edits['state'], thresholds))
+
+    # Bootstrap intervals depend only on the expert/beginner thresholds; cached per pair
+    uncertainty = render_uncertainty_controls()
+    if uncertainty['show']:
+        interval_key = (quality_mode, thresholds['expert'], thresholds['beginner'])
+        cached = st.session_state.get('task_intervals')
+        if cached is None or cached['key'] != interval_key:
+            with st.spinner("Computing confidence intervals..."):
+                index = analytics['threshold_index']
+                intervals = bootstrap_task_intervals(index, thresholds, n_resamples=bootstrap_resample_count(index))
+                cached = {'key': interval_key, 'intervals': intervals}
+            st.session_state.task_intervals = cached
+        analytics['task_intervals'] = cached['intervals']
+        if uncertainty['rank_by_lower_bound']:
+            lower = cached['intervals']['Risk Index Low'].reindex(analytics['risk_radar'].index)
+            analytics['risk_radar'] = analytics['risk_radar'].loc[lower.sort_values(ascending=False, kind='stable').index]
+
+    # Rows the analytics were computed on (flagged people removed in 'exclude' mode)
+    df_analyzed: pd.DataFrame = analytics['df_merged_for_lookup']
 
     # --- UI Rendering ---
     st.title("Team Skills Hub") # No Emoji
@@ -169,6 +262,10 @@ def main_app():
         "Team Profiles",        # No Emoji
         "Skill Analysis",       # No Emoji
         "Action Workbench",     # No Emoji
+        "Wave Comparison",      # No Emoji
+        "Org Rollup",           # No Emoji
+        "Score Editor",         # No Emoji
+        "Skills Heatmap",       # No Emoji
     ])
 
     with tabs[0]:
@@ -176,11 +273,37 @@ def main_app():
     with tabs[1]:
         render_affinity_status(user_df, analytics)
     with tabs[2]:
-        render_team_profiles(df_merged, user_df, analytics)
+        render_team_profiles(df_analyzed, user_df, analytics)
     with tabs[3]:
-        render_skill_analysis(df_merged, analytics)
+        render_skill_analysis(df_analyzed, analytics)
     with tabs[4]:
-        render_action_workbench(df_merged, analytics)
+        render_action_workbench(df_analyzed, analytics)
+    with tabs[5]:
+        render_wave_comparison(data, analytics)
+    with tabs[6]:
+        render_org_rollup(df_analyzed, analytics)
+    with tabs[7]:
+        render_score_editor(user_df, analytics)
+    with tabs[8]:
+        render_skills_heatmap(analytics)
+
+
+def out_of_core_app(data: Dict[str, Any]):
+    """Renders the reduced dashboard for files analyzed out of core (config.CHUNK_FILE_SIZE_MB)."""
+    from analytics_engine import default_thresholds
+    from chunked_engine import compute_analytics_chunked
+    from ui_components import render_threshold_controls, render_out_of_core_overview
+
+    st.button("Upload New Data", key="refresh_button", on_click=lambda: st.session_state.clear(), help="Clear current data and return to upload screen.") # No emoji
+
+    # No per-task score index is kept out of core: a threshold change streams the file again
+    thresholds = render_threshold_controls(default_thresholds())
+    if thresholds != data['analytics']['thresholds']:
+        with st.spinner("Re-reading the file with the new thresholds..."):
+            data['analytics'] = compute_analytics_chunked(data['source'], TASKS_JSON_PATH, thresholds=thresholds)
+
+    st.title("Team Skills Hub") # No Emoji
+    render_out_of_core_overview(data['analytics'])
 
 
 # --- Main execution (State Machine) ---
@@ -0,0 +1,616 @@
+# =============================
+# File: benchmarks.py
+# =============================
+"""
+Performance benchmarks for the analytics engine.
+
+Usage:
+    python benchmarks.py thresholds [--people N] [--tasks N] [--repeat N]
+    python benchmarks.py coldstart [--repeat N] [--budget-ms MS]
+    python benchmarks.py bootstrap [--people N] [--tasks N] [--resamples N]
+    python benchmarks.py loadtest [--url URL | --data CSV] [--concurrency N] [--requests N] [--etag]
+    python benchmarks.py chunked [--people N] [--budget-mb MB]
+    python benchmarks.py sketches [--teams N] [--people-per-team N] [--tasks N]
+    python benchmarks.py planner [--people N] [--tasks N] [--capacity N] [--max-tasks N]
+    python benchmarks.py edits [--people N] [--tasks N] [--edits N]
+    python benchmarks.py heatmap [--people N] [--tasks N] [--max-cells N]
+"""
+
+import argparse
+import http.client
+import json
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+
+import analytics_engine
+import config
+
+
+def make_synthetic_data(n_people: int, n_tasks: int, seed: int = 0) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Builds a (merged_df, user_df) pair shaped like the output of load_and_process_data."""
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Person {i}" for i in range(n_people)], dtype=object)
+    categories = np.array([f"Category {i % 8}" for i in range(n_tasks)], dtype=object)
+    task_names = np.array([f"[{categories[i]}] Task {i + 1}" for i in range(n_tasks)], dtype=object)
+
+    user_df = pd.DataFrame({
+        'Name': names,
+        'Team Leader': [f"Leader {i % 25}" for i in range(n_people)],
+        'Active License': rng.random(n_people) < 0.8,
+        'License Expiration': pd.Timestamp.now().normalize() + pd.to_timedelta(rng.integers(-60, 720, n_people), unit='D'),
+        'Has received Affinity training of McK?': rng.random(n_people) < 0.5,
+        'Scheduler tag': rng.random(n_people) < 0.6,
+        'Comments': '',
+    })
+
+    person_idx = np.repeat(np.arange(n_people), n_tasks)
+    task_idx = np.tile(np.arange(n_tasks), n_people)
+    scores = np.round(rng.beta(2, 2, n_people * n_tasks) * 20) / 20
+    merged_df = pd.DataFrame({
+        'Name': names[person_idx],
+        'Team Leader': user_df['Team Leader'].to_numpy()[person_idx],
+        'task_id': task_idx + 1,
+        'Score': scores,
+        'Task': task_names[task_idx],
+        'Category': categories[task_idx],
+    })
+    merged_df['Skill'] = merged_df['Category']
+    merged_df['Task_Prefixed'] = merged_df['Task']
+    merged_df['task_key'] = 'tasks:' + merged_df['task_id'].astype(str)
+    return merged_df, user_df
+
+
+def make_synthetic_scores(n_people: int, n_tasks: int, seed: int = 0) -> Tuple[Dict[str, Any], np.ndarray, np.ndarray]:
+    """
+    Sparse (COO) scores shaped like analytics_engine.build_sparse_scores, plus each person's team
+    and each task's Category, with the same distributions as make_synthetic_data but no long-format table.
+    """
+    rng = np.random.default_rng(seed)
+    names = pd.Index([f"Person {i}" for i in range(n_people)], name='Name')
+    categories = np.array([f"Category {i % 8}" for i in range(n_tasks)], dtype=object)
+    tasks = pd.Index([f"[{categories[i]}] Task {i + 1}" for i in range(n_tasks)], name='Task_Prefixed')
+    team = np.array([f"Leader {i % 25}" for i in range(n_people)], dtype=object)
+    scores = {
+        'person': np.repeat(np.arange(n_people, dtype=np.int32), n_tasks),
+        'task': np.tile(np.arange(n_tasks, dtype=np.int32), n_people),
+        'score': np.round(rng.beta(2, 2, n_people * n_tasks) * 20) / 20,
+        'weight': None,
+        'names': names,
+        'tasks': tasks,
+    }
+    return scores, team, categories
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Runs fn `repeat` times and returns median / max wall time in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': float(np.median(timings)), 'max_ms': float(np.max(timings))}
+
+
+def bench_thresholds(args: argparse.Namespace) -> None:
+    """Compares a what-if slider move (apply_thresholds) against a full compute_analytics rerun."""
+    df, user_df = make_synthetic_data(args.people, args.tasks)
+    full = _time(lambda: analytics_engine.compute_analytics(df, user_df), max(1, args.repeat // 10))
+    index = analytics_engine.compute_analytics(df, user_df)['threshold_index']
+
+    rng = np.random.default_rng(1)
+    base = analytics_engine.default_thresholds()
+
+    def slider_move():
+        thresholds = dict(base, expert=float(rng.choice([0.7, 0.75, 0.8, 0.85, 0.9])))
+        analytics_engine.apply_thresholds(index, thresholds)
+
+    move = _time(slider_move, args.repeat)
+
+    # Regression: thresholds outside the score range must not leak into neighbouring task segments,
+    # and thresholds equal to or one float step away from existing scores must count exactly
+    codes = np.repeat(np.arange(len(index['tasks'])), np.diff(index['offsets']))
+    scores = index['sorted_scores']
+    near = [float(s) for s in rng.choice(scores, 3)]
+    near += [float(np.nextafter(s, -np.inf)) for s in near] + [float(np.nextafter(s, np.inf)) for s in near]
+    bounds = [(2.5, 3.0, -5.0, 5.0), (-1.5, -1.5, -1.0, -0.5), (3.0, 2.5, 1.5, 2.0),
+              (base['expert'], base['beginner'], base['pipeline_min'], base['pipeline_max']),
+              (0.1 + 0.2, 0.1 + 0.2, 0.1 + 0.2, 0.7000000000000001), (0.7000000000000001, 0.7 + 1e-14, 0.7 + 1e-14, 0.8)]
+    bounds += [(s, s, s, s) for s in near]
+    cases = [dict(base, expert=e, beginner=b, pipeline_min=lo, pipeline_max=hi) for e, b, lo, hi in bounds]
+    consistent = True
+    for thresholds in cases:
+        result = analytics_engine.apply_thresholds(index, thresholds)
+        summary = result['task_summary']
+        critical = np.flatnonzero(index['avg_score'] < thresholds['critical_avg'])
+        in_pipeline = (np.isin(codes, critical) & (scores >= thresholds['pipeline_min'])
+                       & (scores <= thresholds['pipeline_max']))
+        consistent &= bool(
+            np.array_equal(summary['Expert_Count'].to_numpy(),
+                           np.bincount(codes[scores >= thresholds['expert']], minlength=len(summary)))
+            and np.array_equal(summary['Beginner_Count'].to_numpy(),
+                               np.bincount(codes[scores < thresholds['beginner']], minlength=len(summary)))
+            and len(result['talent_pipeline']) == int(in_pipeline.sum())
+        )
+
+    print(f"rows={len(df):,} people={args.people:,} tasks={args.tasks}")
+    print(f"compute_analytics (full) : median {full['median_ms']:.1f} ms, max {full['max_ms']:.1f} ms")
+    print(f"apply_thresholds (slider): median {move['median_ms']:.2f} ms, max {move['max_ms']:.2f} ms")
+    print(f"out-of-range and near-score thresholds match a direct count: {consistent}")
+    if not consistent:
+        sys.exit(1)
+
+
+def bench_bootstrap(args: argparse.Namespace) -> None:
+    """Times bootstrap intervals for every task at once."""
+    df, user_df = make_synthetic_data(args.people, args.tasks)
+    analytics = analytics_engine.compute_analytics(df, user_df)
+    # --resamples 0 times the count the app would use for this dataset size
+    resamples = args.resamples or analytics_engine.bootstrap_resample_count(analytics['threshold_index'])
+    run = _time(lambda: analytics_engine.bootstrap_task_intervals(
+        analytics['threshold_index'], analytics['thresholds'], n_resamples=resamples
+    ), 3)
+    print(f"rows={len(df):,} people={args.people:,} tasks={args.tasks} resamples={resamples:,}")
+    print(f"bootstrap_task_intervals: median {run['median_ms'] / 1000:.2f} s, max {run['max_ms'] / 1000:.2f} s")
+
+
+def write_synthetic_csv(path: str, n_people: int, seed: int = 0, block: int = 20000) -> None:
+    """Writes a template-shaped user CSV (catalog task columns, ~10% blank cells) block by block."""
+    from catalog import BASE_TEMPLATE_HEADERS, catalog_task_columns, load_catalogs
+
+    rng = np.random.default_rng(seed)
+    task_cols = catalog_task_columns(load_catalogs(config.TASK_CATALOGS))
+    comments = np.array(['', '', 'Needs help with isometrics', 'More photo editing training', 'Pen tool practice'], dtype=object)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(';'.join(BASE_TEMPLATE_HEADERS + task_cols) + '\n')
+        for start in range(0, n_people, block):
+            n = min(block, n_people - start)
+            cells = (np.round(rng.beta(2, 2, (n, len(task_cols))) * 20) * 5).astype(int).astype(str).astype(object) + '%'
+            cells[rng.random(cells.shape) < 0.1] = ''
+            expiry = pd.Timestamp.now().normalize() + pd.to_timedelta(rng.integers(-60, 720, n), unit='D')
+            frame = pd.DataFrame({
+                'BPS': [f"Person {i}" for i in range(start, start + n)],
+                'Team Leader': [f"Leader {i % 25}" for i in range(start, start + n)],
+                'Active License': np.where(rng.random(n) < 0.8, 'Yes', 'No'),
+                'License Expiration ': expiry.strftime('%d.%m.%Y'),
+                'Has received Affinity training of McK?': np.where(rng.random(n) < 0.5, 'Yes', 'No'),
+                'Scheduler tag': np.where(rng.random(n) < 0.6, 'Yes', 'No'),
+                'Specific Needs': comments[rng.integers(0, len(comments), n)],
+            })
+            frame = pd.concat([frame, pd.DataFrame(cells, columns=task_cols)], axis=1)
+            frame.to_csv(f, sep=';', header=False, index=False)
+
+
+def _peak_mb(fn: Callable[[], Any]) -> Tuple[Any, float]:
+    """Runs fn under tracemalloc and returns (result, peak traced allocation in MB)."""
+    tracemalloc.start()
+    try:
+        result = fn()
+        return result, tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def bench_chunked(args: argparse.Namespace) -> None:
+    """Compares the chunked (out-of-core) path with the in-memory path: time, peak memory, equality."""
+    from chunked_engine import compute_analytics_chunked
+    from data_engine import load_and_process_data
+
+    def in_memory():
+        load_and_process_data.clear()
+        data = load_and_process_data(path, config.TASK_CATALOGS)
+        return analytics_engine.compute_analytics(data['merged_df'], data['user_df'])
+
+    def chunked():
+        return compute_analytics_chunked(path, config.TASK_CATALOGS, memory_budget_mb=args.budget_mb)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "users.csv")
+        write_synthetic_csv(path, args.people)
+        print(f"people={args.people:,} file={Path(path).stat().st_size / 2**20:.0f} MB budget={args.budget_mb:.0f} MB")
+
+        chunked_time = _time(chunked, 1)
+        chunked_result, chunked_peak = _peak_mb(chunked)
+        print(f"chunked  : {chunked_time['median_ms'] / 1000:.2f} s, peak {chunked_peak:.0f} MB, {chunked_result['chunks']} blocks")
+        if args.skip_in_memory:
+            return
+        memory_time = _time(in_memory, 1)
+        memory_result, memory_peak = _peak_mb(in_memory)
+        print(f"in-memory: {memory_time['median_ms'] / 1000:.2f} s, peak {memory_peak:.0f} MB")
+
+    expected, actual = memory_result['task_summary'], chunked_result['task_summary']
+    same = (
+        expected.index.equals(actual.index)
+        and expected.drop(columns=['Avg_Score', 'Competency_Score']).equals(actual.drop(columns=['Avg_Score', 'Competency_Score']))
+        and np.allclose(expected['Avg_Score'], actual['Avg_Score'], rtol=1e-12, atol=0)
+        and memory_result['person_summary'].equals(chunked_result['person_summary'])
+    )
+    print("results identical" if same else "FAIL: results differ")
+    if not same:
+        sys.exit(1)
+
+
+def bench_sketches(args: argparse.Namespace) -> None:
+    """Sketches synthetic teams, then times merging them and checks the org summary against pooled raw data."""
+    from sketch_engine import build_task_sketch, export_sketch, load_sketch, merge_sketches, sketch_task_summary
+
+    df, user_df = make_synthetic_data(args.people_per_team * args.sample_teams, args.tasks)
+    team = df['Name'].str.extract(r'(\d+)', expand=False).astype(int) % args.sample_teams
+    sketches = []
+    for t in range(args.sample_teams):
+        team_df = df[team == t]
+        analytics = analytics_engine.compute_analytics(team_df, user_df[user_df['Name'].isin(team_df['Name'])])
+        sketches.append(load_sketch(export_sketch(build_task_sketch(analytics, team_df))))
+    size_kb = len(export_sketch(sketches[0])) / 1024
+
+    # Exactness on the sampled teams
+    pooled = analytics_engine.compute_analytics(df, user_df)['task_summary']
+    merged = sketch_task_summary(merge_sketches(sketches))
+    exact_cols = ['Expert_Count', 'Beginner_Count', 'Risk Index', 'SPOF']
+    exact = merged.index.equals(pooled.index) and merged[exact_cols].equals(pooled[exact_cols])
+    avg_err = float(np.abs(merged['Avg_Score'] - pooled['Avg_Score']).max())
+
+    # Merge cost at org scale (team sketches repeated up to --teams)
+    many = [sketches[i % len(sketches)] for i in range(args.teams)]
+    merge = _time(lambda: merge_sketches(many), 5)
+    print(f"sketch size: {size_kb:.1f} KB ({args.tasks} tasks)")
+    print(f"merge {args.teams:,} sketches: median {merge['median_ms']:.1f} ms, max {merge['max_ms']:.1f} ms")
+    print(f"vs pooled raw data ({args.sample_teams} teams): counts/Risk Index {'exact' if exact else 'DIFFER'}, max Avg_Score error {avg_err:.1e}")
+    if not exact:
+        sys.exit(1)
+
+
+def bench_planner(args: argparse.Namespace) -> None:
+    """Times the multi-skill session planner and checks the plan's constraints."""
+    from planner_engine import plan_training_sessions
+
+    df, user_df = make_synthetic_data(args.people, args.tasks)
+    analytics = analytics_engine.compute_analytics(df, user_df)
+    thresholds = analytics['thresholds']
+    plan = {}
+
+    def run():
+        plan.update(plan_training_sessions(analytics, df, capacity=args.capacity, max_tasks=args.max_tasks))
+    timing = _time(run, args.repeat)
+
+    # Constraints: one category per session, capacity, mentor expertise, gaps only, no double booking
+    schedule = plan['schedule']
+    score = df.set_index(['Name', 'Task_Prefixed'])['Score']
+    pairs = schedule.assign(Task=schedule['Tasks'].str.split('; ')).explode('Task')
+    pair_scores = score.reindex(pd.MultiIndex.from_arrays([pairs['Name'], pairs['Task']])).to_numpy()
+    is_mentor = (pairs['Role'] == 'Mentor').to_numpy()
+    ok = (
+        bool((pair_scores[is_mentor] >= thresholds['expert']).all())
+        and bool((schedule[schedule['Role'] == 'Learner'].groupby('Session').size() <= args.capacity).all())
+        and not schedule.duplicated(['Date', 'Name']).any()
+        and bool((plan['sessions']['Tasks'].str.count('; ') < args.max_tasks).all())
+    )
+    coverage = plan['coverage']
+    # Without a mentor cap, only gaps on tasks with no schedulable expert may stay unplanned
+    ok &= coverage['planned'] + coverage['not_schedulable'] + coverage['no_mentor'] == coverage['gaps']
+    bound = -(-coverage['planned'] // (args.capacity * args.max_tasks))  # Every session at full capacity and bundle size
+    print(f"{args.people:,} people x {args.tasks} tasks ({coverage['critical_tasks']} critical): "
+          f"median {timing['median_ms']:.0f} ms, max {timing['max_ms']:.0f} ms")
+    print(f"{len(plan['sessions']):,} sessions (lower bound {bound:,}), "
+          f"{coverage['planned']:,} of {coverage['gaps'] - coverage['not_schedulable']:,} schedulable gaps planned, "
+          f"{plan['schedule']['Date'].nunique()} slots; constraints {'hold' if ok else 'VIOLATED'}")
+    if not ok:
+        sys.exit(1)
+
+
+def bench_edits(args: argparse.Namespace) -> None:
+    """Times incremental score edits against a full recompute and checks the edited views match it."""
+    from edit_engine import apply_edit, build_edit_state, edited_views
+
+    df, user_df = make_synthetic_data(args.people, args.tasks)
+    full = _time(lambda: analytics_engine.compute_analytics(df, user_df), 1)
+    analytics = analytics_engine.compute_analytics(df, user_df)
+    state = build_edit_state(analytics, user_df)
+
+    rng = np.random.default_rng(1)
+    rows = rng.integers(0, len(df), args.edits)
+    values = np.round(rng.random(args.edits) * 20) / 20
+    timings = []
+    for row, value in zip(rows, values):
+        start = time.perf_counter()
+        apply_edit(state, df['Name'].iat[row], df['Task_Prefixed'].iat[row], value)
+        timings.append((time.perf_counter() - start) * 1000)
+    views = _time(lambda: edited_views(state, analytics['thresholds']), 3)
+
+    edited = df.copy()
+    edited.iloc[rows, edited.columns.get_loc('Score')] = values
+    expected = analytics_engine.compute_analytics(edited, user_df)
+    result = edited_views(state, analytics['thresholds'])
+    # Archetypes may only differ for people tied with a median to within rounding noise
+    person, reference = result['person_summary'], expected['person_summary']
+    near_median = (
+        np.isclose(reference['Avg Score'], reference['Avg Score'].median(), rtol=0, atol=1e-9)
+        | np.isclose(reference['Volatility'], reference['Volatility'].median(), rtol=0, atol=1e-9)
+    )
+    same = (
+        np.allclose(result['task_summary']['Avg_Score'], expected['task_summary']['Avg_Score'])
+        and result['task_summary'][['Expert_Count', 'Beginner_Count', 'Risk Index', 'SPOF']].equals(
+            expected['task_summary'][['Expert_Count', 'Beginner_Count', 'Risk Index', 'SPOF']])
+        and np.allclose(person['Volatility'], reference['Volatility'], equal_nan=True)
+        and person['Archetype'][~near_median].equals(reference['Archetype'][~near_median])
+    )
+    print(f"rows={len(df):,} people={args.people:,} tasks={args.tasks}")
+    print(f"compute_analytics (full): {full['median_ms']:.0f} ms")
+    print(f"apply_edit ({args.edits:,} edits): median {np.median(timings):.3f} ms, max {np.max(timings):.3f} ms")
+    print(f"edited_views (render): median {views['median_ms']:.1f} ms; matches full recompute: {same}")
+    if not same:
+        sys.exit(1)
+
+
+def bench_heatmap(args: argparse.Namespace) -> None:
+    """Times heatmap tiles (overview and zoomed) and checks none exceeds the cell budget."""
+    from heatmap_engine import build_heatmap_index_sparse, heatmap_tile, tile_frame
+
+    # Built straight from sparse scores: no long-format table or full compute_analytics run
+    scores, team, task_category = make_synthetic_scores(args.people, args.tasks)
+    start = time.perf_counter()
+    index, peak_mb = _peak_mb(lambda: build_heatmap_index_sparse(scores, team, task_category))
+    build_ms = (time.perf_counter() - start) * 1000
+    del scores
+
+    views = []
+    for rows in ('team', 'cluster'):
+        group = index['row_groups'][rows][1][0]
+        category = index['categories'][0]
+        views += [(rows, None, None), (rows, group, None), (rows, None, category), (rows, group, category)]
+
+    print(f"people={args.people:,} tasks={args.tasks} answers={len(index['score']):,} max_cells={args.max_cells:,}")
+    print(f"build_heatmap_index_sparse: {build_ms:.0f} ms, peak {peak_mb:.0f} MB above the input scores")
+    within = True
+    for rows, row_key, col_key in views:
+        start = time.perf_counter()
+        tile = heatmap_tile(index, rows, row_key, col_key, max_cells=args.max_cells)
+        first_ms = (time.perf_counter() - start) * 1000
+        cached = _time(lambda: heatmap_tile(index, rows, row_key, col_key, max_cells=args.max_cells), 5)
+        payload = len(tile_frame(tile).to_json(orient='records'))
+        within &= tile['cells'] <= args.max_cells
+        print(
+            f"{rows:<7} row={str(row_key)[:12]:<12} col={str(col_key)[:12]:<12} "
+            f"{tile['z'].shape[0]:>4} x {tile['z'].shape[1]:<3} = {tile['cells']:>5} cells "
+            f"(banded rows={tile['banded_rows']}, columns={tile['banded_columns']}) "
+            f"{first_ms:>7.1f} ms, cached {cached['median_ms']:.3f} ms, {payload / 1024:.0f} KB JSON"
+        )
+    # Clients choosing many distinct max_cells values must not grow the tile cache without bound
+    group = index['row_groups']['team'][1][0]
+    for max_cells in range(1, config.HEATMAP_TILE_CACHE_SIZE + 9):
+        heatmap_tile(index, 'team', group, max_cells=max_cells)
+    bounded = len(index['tiles']) <= config.HEATMAP_TILE_CACHE_SIZE
+    print(f"all tiles within {args.max_cells:,} cells: {within}")
+    print(f"tile cache bounded at {config.HEATMAP_TILE_CACHE_SIZE} views: {bounded} ({len(index['tiles'])} cached)")
+    if not (within and bounded):
+        sys.exit(1)
+
+
+# --- API load test ---
+
+LOADTEST_PATHS = [
+    '/datasets/{name}/risk_matrix',
+    '/datasets/{name}/talent_pipeline',
+    '/datasets/{name}/person_summary',
+    '/datasets/{name}/task_summary',
+    '/datasets/{name}/coverage_forecast',
+    '/datasets/{name}/risk_matrix?expert=0.7',
+]
+
+
+def _start_api_server(data: str) -> Tuple[subprocess.Popen, str]:
+    """Starts api_server.py on a free local port and waits until it answers."""
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    root = Path(__file__).resolve().parent
+    proc = subprocess.Popen(
+        [sys.executable, str(root / "api_server.py"), "--data", data, "--port", str(port)],
+        cwd=root, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/datasets')
+            ready = conn.getresponse().status == 200
+            conn.close()
+            if ready:
+                return proc, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("api_server.py did not start within 60 s")
+
+
+def bench_loadtest(args: argparse.Namespace) -> None:
+    """Concurrent keep-alive clients against the analytics API; reports requests/s and latency percentiles."""
+    proc = None
+    base_url = args.url
+    if base_url is None:
+        proc, base_url = _start_api_server(args.data)
+    try:
+        url = urlsplit(base_url)
+        conn = http.client.HTTPConnection(url.hostname, url.port)
+        conn.request('GET', '/datasets')
+        name = json.loads(conn.getresponse().read())[0]['name']
+        conn.close()
+        paths = [p.format(name=name) for p in LOADTEST_PATHS]
+
+        latencies: List[float] = []
+        statuses: Counter = Counter()
+        lock = threading.Lock()
+        per_client = args.requests // args.concurrency
+
+        def client(seed: int):
+            local_lat, local_status, etags = [], Counter(), {}
+            conn = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+            for i in range(per_client):
+                path = paths[(seed + i) % len(paths)]
+                headers = {'If-None-Match': etags[path]} if args.etag and path in etags else {}
+                start = time.perf_counter()
+                conn.request('GET', path, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                local_lat.append((time.perf_counter() - start) * 1000)
+                local_status[resp.status] += 1
+                if resp.getheader('ETag'):
+                    etags[path] = resp.getheader('ETag')
+            conn.close()
+            with lock:
+                latencies.extend(local_lat)
+                statuses.update(local_status)
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(args.concurrency)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    lat = np.array(latencies)
+    print(f"requests={len(lat):,} concurrency={args.concurrency} etag_revalidation={args.etag}")
+    print(f"throughput : {len(lat) / elapsed:,.0f} requests/s")
+    print(f"latency    : p50 {np.percentile(lat, 50):.2f} ms, p99 {np.percentile(lat, 99):.2f} ms, max {lat.max():.2f} ms")
+    print(f"statuses   : {dict(sorted(statuses.items()))}")
+
+
+# --- Cold start ---
+
+# Time-to-first-render of the landing page (excluding the streamlit import itself)
+COLD_START_BUDGET_MS = 250
+# Modules the landing page must not import (plotly.graph_objects is loaded by streamlit itself)
+COLD_START_FORBIDDEN_MODULES = ['numpy', 'pandas', 'pyarrow', 'plotly.express', 'data_engine', 'analytics_engine', 'ui_components']
+
+_COLD_START_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=60).run()
+rendered = time.perf_counter()
+print(json.dumps({
+    'streamlit_ms': (imported - start) * 1000,
+    'render_ms': (rendered - imported) * 1000,
+    'errors': [str(e.value) for e in at.exception],
+    'modules': [m for m in sys.argv[2:] if m in sys.modules],
+}))
+"""
+
+
+def bench_coldstart(args: argparse.Namespace) -> None:
+    """Renders the landing page in fresh interpreters and checks it against the cold start budget."""
+    app_path = str(Path(__file__).resolve().parent / "app.py")
+    runs = []
+    for _ in range(args.repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _COLD_START_PROBE, app_path, *COLD_START_FORBIDDEN_MODULES],
+            capture_output=True, text=True, check=True, cwd=Path(app_path).parent
+        )
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    render_ms = float(np.median([r['render_ms'] for r in runs]))
+    streamlit_ms = float(np.median([r['streamlit_ms'] for r in runs]))
+    loaded = sorted({m for r in runs for m in r['modules']})
+    errors = sorted({e for r in runs for e in r['errors']})
+    print(f"streamlit import       : median {streamlit_ms:.0f} ms")
+    print(f"landing first render   : median {render_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"heavy modules imported : {', '.join(loaded) or 'none'}")
+
+    failures = []
+    if render_ms > args.budget_ms:
+        failures.append(f"first render {render_ms:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+    if loaded:
+        failures.append(f"landing page imported {', '.join(loaded)}")
+    if errors:
+        failures.append(f"landing page raised: {'; '.join(errors)}")
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('thresholds', help="What-if threshold slider latency.")
+    p.add_argument('--people', type=int, default=5000)
+    p.add_argument('--tasks', type=int, default=200)
+    p.add_argument('--repeat', type=int, default=50)
+    p.set_defaults(func=bench_thresholds)
+
+    p = sub.add_parser('bootstrap', help="Bootstrap confidence intervals for all tasks.")
+    p.add_argument('--people', type=int, default=50)
+    p.add_argument('--tasks', type=int, default=300)
+    p.add_argument('--resamples', type=int, default=config.BOOTSTRAP_RESAMPLES, help="0: scaled to the dataset like the app.")
+    p.set_defaults(func=bench_bootstrap)
+
+    p = sub.add_parser('chunked', help="Out-of-core analytics: peak memory and equality with the in-memory path.")
+    p.add_argument('--people', type=int, default=100000)
+    p.add_argument('--budget-mb', type=float, default=config.CHUNK_MEMORY_BUDGET_MB)
+    p.add_argument('--skip-in-memory', action='store_true', help="Only run the chunked path (file larger than RAM).")
+    p.set_defaults(func=bench_chunked)
+
+    p = sub.add_parser('sketches', help="Team sketch size, merge time and accuracy.")
+    p.add_argument('--teams', type=int, default=2000)
+    p.add_argument('--sample-teams', type=int, default=20, help="Teams built from raw data for the accuracy check.")
+    p.add_argument('--people-per-team', type=int, default=50)
+    p.add_argument('--tasks', type=int, default=200)
+    p.set_defaults(func=bench_sketches)
+
+    p = sub.add_parser('planner', help="Multi-skill training session planner runtime and constraints.")
+    p.add_argument('--people', type=int, default=5000)
+    p.add_argument('--tasks', type=int, default=300)
+    p.add_argument('--capacity', type=int, default=config.PLANNER_SESSION_CAPACITY)
+    p.add_argument('--max-tasks', type=int, default=config.PLANNER_MAX_TASKS_PER_SESSION)
+    p.add_argument('--repeat', type=int, default=3)
+    p.set_defaults(func=bench_planner)
+
+    p = sub.add_parser('edits', help="Incremental score edits vs a full recompute.")
+    p.add_argument('--people', type=int, default=20000)
+    p.add_argument('--tasks', type=int, default=200)
+    p.add_argument('--edits', type=int, default=1000)
+    p.set_defaults(func=bench_edits)
+
+    p = sub.add_parser('heatmap', help="Aggregated heatmap tile latency and cell bound.")
+    p.add_argument('--people', type=int, default=50000)
+    p.add_argument('--tasks', type=int, default=500)
+    p.add_argument('--max-cells', type=int, default=config.HEATMAP_MAX_CELLS)
+    p.set_defaults(func=bench_heatmap)
+
+    p = sub.add_parser('loadtest', help="Analytics API throughput and p99 latency.")
+    p.add_argument('--url', default=None, help="Running api_server.py base URL; omitted = start one locally.")
+    p.add_argument('--data', default="userData.csv", help="CSV to serve when starting a local server.")
+    p.add_argument('--concurrency', type=int, default=8)
+    p.add_argument('--requests', type=int, default=4000)
+    p.add_argument('--etag', action='store_true', help="Revalidate with If-None-Match after the first response.")
+    p.set_defaults(func=bench_loadtest)
+
+    p = sub.add_parser('coldstart', help="Landing page time-to-first-render and import budget.")
+    p.add_argument('--repeat', type=int, default=5)
+    p.add_argument('--budget-ms', type=float, default=COLD_START_BUDGET_MS)
+    p.set_defaults(func=bench_coldstart)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# =============================
+# File: catalog.py
+# =============================
+
+import csv
+import io
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple, Union
+import streamlit as st
+
+# The landing page imports this module, so it must not pull in pandas/plotly.
+# Results are memoized per process, i.e. computed once per server start.
+
+BASE_TEMPLATE_HEADERS = [
+    'BPS',
+    'Team Leader',
+    'Active License',
+    'License Expiration ',
+    'Has received Affinity training of McK?',
+    'Scheduler tag',
+    'Specific Needs'
+]
+
+EXAMPLE_ROW = {
+    'BPS': 'FirstName LastName',
+    'Team Leader': 'Leader Name',
+    'Active License': 'Yes',
+    'License Expiration ': '25.10.2026',
+    'Has received Affinity training of McK?': 'No',
+    'Scheduler tag': 'No',
+    'Specific Needs': 'Needs help with isometrics',
+}
+
+
+CatalogPaths = Union[str, Sequence[str]]
+
+
+def as_catalog_paths(tasks_json_path: CatalogPaths) -> Tuple[str, ...]:
+    """Normalizes a single catalog path or a list of paths to a hashable tuple."""
+    return (tasks_json_path,) if isinstance(tasks_json_path, str) else tuple(tasks_json_path)
+
+
+@lru_cache(maxsize=None)
+def _load_catalogs(tasks_json_paths: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    with_meta = []
+    for position, path in enumerate(tasks_json_paths):
+        with open(path, encoding='utf-8') as f:
+            raw = json.load(f)
+        name = str(raw.get('catalog', Path(path).stem))
+        with_meta.append({
+            'name': name,
+            'version': str(raw.get('version', '1')),
+            # The first catalog keeps the historical 'Task N' headers; others are namespaced
+            'column_prefix': '' if position == 0 else f'{name}/',
+            'skills': raw['skills'],
+        })
+    names = [c['name'] for c in with_meta]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate catalog names: {', '.join(names)}")
+    return with_meta
+
+
+def load_catalogs(tasks_json_path: CatalogPaths) -> List[Dict[str, Any]]:
+    """
+    Reads one or more versioned task catalogs. Each JSON may declare a top-level 'catalog'
+    name and 'version' (defaults: file stem and '1'). CSV columns are 'Task N' for the first
+    catalog and '<catalog>/Task N' for the others.
+    """
+    return _load_catalogs(as_catalog_paths(tasks_json_path))
+
+
+def catalog_task_columns(catalogs: List[Dict[str, Any]]) -> List[str]:
+    """CSV column headers for every task in every catalog, in catalog order."""
+    return [f"{c['column_prefix']}Task {skill['id']}" for c in catalogs for skill in c['skills']]
+
+
+def generate_csv_template(tasks_json_path: CatalogPaths) -> str:
+    """
+    Generates a template CSV string (Emoji-Free).
+    """
+    return _generate_csv_template(as_catalog_paths(tasks_json_path))
+
+
+@lru_cache(maxsize=None)
+def _generate_csv_template(tasks_json_paths: Tuple[str, ...]) -> str:
+    try:
+        task_cols = catalog_task_columns(_load_catalogs(tasks_json_paths))
+    except Exception as e:
+        st.warning(f"Warning: Could not read tasks.json to generate template ({e}). Using 31 default tasks.") # Use warning
+        task_cols = [f'Task {i}' for i in range(1, 32)]
+
+    all_headers = BASE_TEMPLATE_HEADERS + task_cols
+    example_row = dict(EXAMPLE_ROW, **{col: '50%' for col in task_cols})
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';', lineterminator='\n')
+    writer.writerow(all_headers)
+    writer.writerow([example_row[col] for col in all_headers])
+    return buffer.getvalue()
+
+
+def generate_task_guide(tasks_json_path: CatalogPaths) -> str:
+    """
+    Generates a simple text list of tasks (Emoji-Free).
+    """
+    return _generate_task_guide(as_catalog_paths(tasks_json_path))
+
+
+@lru_cache(maxsize=None)
+def _generate_task_guide(tasks_json_paths: Tuple[str, ...]) -> str:
+    tasks_json_path = ", ".join(tasks_json_paths)
+    try:
+        catalogs = _load_catalogs(tasks_json_paths)
+        guide_lines = ["Team Skills Assessment - Task List\n", "="*35 + "\n"]
+        for catalog in catalogs:
+            skills = catalog['skills']
+            if any('id' not in skill or 'title' not in skill for skill in skills):
+                raise ValueError("Required columns 'id' or 'title' not found in tasks.json skills list.")
+
+            if len(catalogs) > 1:
+                guide_lines.append(f"\n{catalog['name']} (version {catalog['version']})\n")
+            for skill in sorted(skills, key=lambda s: s['id']):
+                guide_lines.append(f"{catalog['column_prefix']}Task {skill['id']}: {skill['title']}\n")
+
+        return "".join(guide_lines)
+
+    except FileNotFoundError:
+        return f"Warning: Could not find the task definition file at {tasks_json_path}." # Use warning
+    except Exception as e:
+        return f"Warning: Error reading or processing tasks.json: {e}" # Use warning
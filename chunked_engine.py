@@ -0,0 +1,173 @@
+# =============================
+# File: chunked_engine.py
+# =============================
+"""
+Out-of-core analytics for user files larger than memory.
+
+The CSV is streamed in row blocks (see data_engine.iter_user_chunks) and every view is
+combined from per-block partial aggregates, so the long-format table is never materialized.
+Peak memory is one block (config.CHUNK_MEMORY_BUDGET_MB) plus O(people + tasks) state.
+
+Results match compute_analytics() on the same file: counts, flags and archetypes exactly,
+Avg_Score up to floating-point summation order. People whose rows are split across blocks
+(duplicate names) have their Avg Score / Volatility merged with the parallel variance formula.
+"""
+
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+from analytics_engine import COMMENT_THEMES, assign_archetypes, build_task_summary, default_thresholds
+from catalog import CatalogPaths
+from data_engine import build_tasks_df, iter_user_chunks, task_prefixed_labels
+
+# Theme patterns are literal alternations, so no match is longer than its longest alternative
+_THEME_MAX_MATCH = max(len(alt) for pattern in COMMENT_THEMES.values() for alt in pattern.split('|'))
+
+
+def _scan_comment_themes(state: Dict[str, Any], text: str, final: bool = False) -> None:
+    """
+    Counts theme matches in the next piece of the space-joined comment stream. Each theme carries
+    its unscanned tail forward until the longest possible match starting there is fully buffered,
+    so the totals equal a single findall() over the whole stream (as in analyze_comment_themes).
+    """
+    for theme, pattern in COMMENT_THEMES.items():
+        buffer = state['tails'][theme] + text
+        limit = len(buffer) if final else len(buffer) - _THEME_MAX_MATCH
+        resume = max(limit + 1, 0)
+        for match in re.finditer(pattern, buffer, re.IGNORECASE):
+            if match.start() > limit:
+                break
+            state['counts'][theme] += 1
+            resume = max(resume, match.end())
+        state['tails'][theme] = buffer[resume:]
+
+
+def _merge_person_stats(parts: pd.DataFrame) -> pd.DataFrame:
+    """Combines per-block (count, mean, std) rows of the same person; single-block people are untouched."""
+    split = parts.index.duplicated(keep=False)
+    if not split.any():
+        return parts
+    multi = parts[split]
+    n = multi['count']
+    count = n.groupby(level=0).sum()
+    mean = (n * multi['mean']).groupby(level=0).sum() / count
+    m2 = ((multi['std'] ** 2 * (n - 1)).fillna(0.0) + n * (multi['mean'] - mean.reindex(multi.index)) ** 2).groupby(level=0).sum()
+    std = np.sqrt(m2 / (count - 1)).where(count > 1)
+    return pd.concat([parts[~split], pd.DataFrame({'count': count, 'mean': mean, 'std': std})])
+
+
+def use_out_of_core(size_bytes: int) -> bool:
+    """True when a user file is large enough that the app and the API should stream it."""
+    return size_bytes > config.CHUNK_FILE_SIZE_MB * 2**20
+
+
+def compute_analytics_chunked(
+    user_csv_file: Any,
+    tasks_json_path: CatalogPaths = config.TASK_CATALOGS,
+    memory_budget_mb: float = config.CHUNK_MEMORY_BUDGET_MB,
+    as_of: Optional[datetime] = None,
+    thresholds: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """
+    Streams the user CSV and returns task_summary (with SPOF and Expiration Risk overlays),
+    risk_radar, risk_matrix, person_summary and comment_themes, plus total_count,
+    parsing_errors and the number of blocks read. Returns {} when no valid scores are found.
+    """
+    thresholds = dict(thresholds or default_thresholds())
+    tasks_df = build_tasks_df(tasks_json_path)
+    n_tasks = len(tasks_df)
+    expiration_window = (as_of or datetime.now()) + pd.Timedelta(days=config.LICENSE_EXPIRATION_WINDOW_DAYS)
+
+    # Per catalog task partial aggregates
+    count = np.zeros(n_tasks, dtype=np.int64)
+    total = np.zeros(n_tasks)
+    expert = np.zeros(n_tasks, dtype=np.int64)
+    beginner = np.zeros(n_tasks, dtype=np.int64)
+    max_expiring = np.full(n_tasks, -np.inf)
+
+    person_parts: List[pd.DataFrame] = []
+    people_parts: List[pd.DataFrame] = []
+    first_expiration: Dict[str, Any] = {}  # The first row of a name defines its license (as in _person_lookup)
+    seen_comments: set = set()
+    themes = {'tails': {theme: '' for theme in COMMENT_THEMES}, 'counts': {theme: 0 for theme in COMMENT_THEMES}, 'any': False}
+    parsing_errors = 0
+    chunks = 0
+
+    for chunk in iter_user_chunks(user_csv_file, tasks_df['column'].tolist(), memory_budget_mb):
+        chunks += 1
+        user_df, task_pos, values = chunk['user_df'], chunk['task_pos'], chunk['scores']
+        parsing_errors += chunk['parsing_errors']
+        people_parts.append(user_df[['Name'] + [c for c in ('Team Leader', 'Scheduler tag') if c in user_df.columns]])
+
+        # Task aggregates
+        count += np.bincount(task_pos, minlength=n_tasks)
+        total += np.bincount(task_pos, values, minlength=n_tasks)
+        expert += np.bincount(task_pos[values >= thresholds['expert']], minlength=n_tasks)
+        beginner += np.bincount(task_pos[values < thresholds['beginner']], minlength=n_tasks)
+
+        # Expiry overlay: highest score per task among people whose license expires in the window
+        if 'License Expiration' in user_df.columns:
+            for name, expiration in zip(user_df['Name'], user_df['License Expiration']):
+                first_expiration.setdefault(name, expiration)
+            row_expiration = pd.to_datetime(pd.Series([first_expiration[name] for name in user_df['Name']], dtype=object))
+            expiring = (row_expiration.notna() & (row_expiration < expiration_window)).to_numpy()[chunk['row_pos']]
+            np.maximum.at(max_expiring, task_pos[expiring], values[expiring])
+        names = user_df['Name'].to_numpy()[chunk['row_pos']]
+
+        # Person partials: same per-person value order as the in-memory groupby
+        if len(values):
+            person_parts.append(pd.Series(values).groupby(names).agg(['count', 'mean', 'std']))
+
+        # Comment themes over the first occurrence of each distinct comment
+        if 'Comments' in user_df.columns:
+            comments = user_df['Comments'].dropna().str.strip()
+            comments = [c for c in comments[comments != ''].unique() if c not in seen_comments]
+            if comments:
+                seen_comments.update(comments)
+                _scan_comment_themes(themes, (' ' if themes['any'] else '') + ' '.join(comments))
+                themes['any'] = True
+
+    if not person_parts:
+        return {}
+
+    # Tasks sharing a display label are one task in the in-memory path too
+    answered = count > 0
+    by_label = pd.DataFrame({
+        'count': count, 'total': total, 'expert': expert, 'beginner': beginner, 'max_expiring': max_expiring,
+    })[answered].groupby(task_prefixed_labels(tasks_df, answered)[answered], sort=True).agg({
+        'count': 'sum', 'total': 'sum', 'expert': 'sum', 'beginner': 'sum', 'max_expiring': 'max',
+    })
+    task_summary = build_task_summary(
+        pd.Index(by_label.index, name='Task_Prefixed'),
+        (by_label['total'] / by_label['count']).to_numpy(),
+        by_label['expert'].to_numpy(), by_label['beginner'].to_numpy(), by_label['max_expiring'].to_numpy(),
+        thresholds,
+    )
+
+    person_stats = _merge_person_stats(pd.concat(person_parts)).sort_index()
+    summary = person_stats[['mean', 'std']].set_axis(['Avg Score', 'Volatility'], axis=1)
+    summary.index.name = 'Name'
+    people = pd.concat(people_parts, ignore_index=True)
+
+    _scan_comment_themes(themes, '', final=True)
+    if themes['any']:
+        comment_themes = pd.DataFrame.from_dict(themes['counts'], orient='index', columns=['Mentions']).sort_values('Mentions', ascending=False)
+    else:
+        comment_themes = pd.DataFrame(columns=['Mentions'])
+
+    return {
+        'thresholds': thresholds,
+        'task_summary': task_summary,
+        'risk_radar': task_summary.sort_values(by='Risk Index', ascending=False),
+        'risk_matrix': task_summary[task_summary['Risk Index'] > thresholds['high_risk']],
+        'person_summary': assign_archetypes(summary, people),
+        'comment_themes': comment_themes,
+        'total_count': people['Name'].nunique(),
+        'parsing_errors': parsing_errors,
+        'chunks': chunks,
+    }
@@ -2,6 +2,25 @@
 # File: config.py
 # =============================
 
+# --- Data Sources ---
+
+# Task catalogs, in order. The first uses 'Task N' CSV headers; others use '<catalog>/Task N'.
+TASK_CATALOGS = ("tasks.json",)
+
+# Local analytics API (api_server.py)
+API_HOST = "127.0.0.1"
+API_PORT = 8600
+API_WORKERS = 8
+API_CACHE_SIZE = 256
+
+# Chunked (out-of-core) analytics (chunked_engine.py)
+CHUNK_MEMORY_BUDGET_MB = 256     # Target peak memory for one CSV row block and its parsing
+CHUNK_BYTES_PER_CELL = 400       # Estimated bytes per CSV cell while a block is parsed
+CHUNK_FILE_SIZE_MB = 100         # Larger user files are analyzed out of core (app and API); below server.maxUploadSize
+
+# Mergeable team score sketches (sketch_engine.py): histogram bins per unit of score
+SKETCH_BINS_PER_UNIT = 100       # 1 percentage point per bin; whole-percent scores are exact
+
 # --- Business Logic Constants ---
 
 # Skill level thresholds
@@ -14,9 +33,41 @@ PIPELINE_MAX = 0.79
 CRITICAL_AVG_SCORE = 0.6
 HIGH_RISK_INDEX = 2.0
 
+# Response quality (straight-lining / low-effort detection)
+QUALITY_MIN_ANSWERS = 5          # Fewer answers than this are never flagged
+QUALITY_NEAR_CONSTANT_STD = 0.05 # Std below this counts as near-constant
+QUALITY_MODAL_SHARE = 0.9        # Share of answers on one value that counts as near-constant
+QUALITY_DOWNWEIGHT = 0.25        # Weight given to flagged people in 'downweight' mode
+
+# Response quality flags
+QUALITY_FLAG_CONSTANT = "Constant"
+QUALITY_FLAG_NEAR_CONSTANT = "Near-constant"
+QUALITY_FLAG_EXTREMES_ONLY = "Extremes only"
+
+# Bootstrap confidence intervals for task statistics
+BOOTSTRAP_RESAMPLES = 10000
+BOOTSTRAP_MIN_RESAMPLES = 200         # Floor when large datasets scale the resample count down
+BOOTSTRAP_MAX_DRAWS = 150_000_000     # Resamples x answered cells per computation (~3 s); 10,000 resamples up to 15,000 answers
+BOOTSTRAP_CONFIDENCE = 0.95
+
 # License expiration window (in days)
 LICENSE_EXPIRATION_WINDOW_DAYS = 90
 
+# Expert coverage forecast (horizon in months, resolution in days)
+FORECAST_HORIZON_MONTHS = 6
+FORECAST_STEP_DAYS = 7
+
+# Training session planner (planner_engine.py)
+PLANNER_SESSION_CAPACITY = 6         # Learners per session, mentor not included
+PLANNER_MAX_TASKS_PER_SESSION = 3    # Tasks bundled into one session (same Category)
+PLANNER_MAX_SESSIONS_PER_MENTOR = None  # Optional cap per mentor; None plans every gap that has an expert
+PLANNER_SLOT_DAYS = 7                # Days between consecutive session slots
+
+# Skills heatmap (heatmap_engine.py)
+HEATMAP_MAX_CELLS = 2500  # Upper bound on cells per tile; larger views are merged into bands
+HEATMAP_CLUSTERS = 12     # Groups of people with similar category profiles
+HEATMAP_TILE_CACHE_SIZE = 64  # Most recently used tiles kept per dataset
+
 # Archetype Definitions (No Emojis)
 ARCHETYPE_NEEDS_SUPPORT = "Needs Support"
 ARCHETYPE_VERSATILE_LEADER = "Versatile Leader"
@@ -2,36 +2,207 @@
 # File: data_engine.py
 # =============================
 
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from pathlib import Path
 import streamlit as st
-from typing import Dict, Any, Optional, IO
+from typing import Dict, Any, Iterator, List, Optional, IO, Tuple
+import config
+from catalog import CatalogPaths, load_catalogs
+
+def build_tasks_df(tasks_json_path: CatalogPaths) -> pd.DataFrame:
+    """Flattens one or more versioned catalogs into a task table (one row per catalog task)."""
+    frames = []
+    for catalog in load_catalogs(tasks_json_path):
+        frame = pd.DataFrame(catalog['skills'])
+        frame.rename(columns={'title': 'Task', 'id': 'task_id', 'category': 'Category'}, inplace=True)
+        if 'task_id' not in frame.columns:
+            raise KeyError('task_id')
+        frame['Catalog'] = catalog['name']
+        frame['Catalog Version'] = catalog['version']
+        frame['column'] = catalog['column_prefix'] + 'Task ' + frame['task_id'].astype(str)
+        frames.append(frame)
+    tasks_df = pd.concat(frames, ignore_index=True)
+    tasks_df['task_key'] = tasks_df['Catalog'] + ':' + tasks_df['task_id'].astype(str)
+    return tasks_df
+
+
+def _normalize_user_columns(user_df: pd.DataFrame) -> None:
+    """Strips header whitespace and renames the template headers to their internal names (in place)."""
+    user_df.columns = user_df.columns.str.strip()
+    user_df.rename(columns={
+        'BPS': 'Name',
+        'Specific Needs': 'Comments',
+        'Has received Affinity training of McK?': 'Has received Affinity training of McK?',
+        'License Expiration ': 'License Expiration'
+    }, inplace=True)
+
+
+def _clean_person_columns(user_df: pd.DataFrame) -> None:
+    """Parses yes/no flags and the license date, and strips text columns (in place)."""
+    yes_values = {'yes', 'si', 'sí', 'true', '1', 'y', 't'}
+    for col in ['Active License', 'Has received Affinity training of McK?', 'Scheduler tag']:
+        if col in user_df.columns:
+            user_df[col] = user_df[col].astype(str).str.strip().str.lower().isin(yes_values)
+        else:
+            user_df[col] = False # Add missing boolean columns as False
+
+    if 'License Expiration' in user_df.columns:
+        user_df['License Expiration'] = pd.to_datetime(user_df['License Expiration'], errors='coerce', dayfirst=True)
+    # else: # Handle missing date column if needed, maybe add as NaT
+        # user_df['License Expiration'] = pd.NaT
+
+    for col in user_df.select_dtypes(include=['object']).columns:
+        user_df[col] = user_df[col].fillna('').astype(str).str.strip()
+
+
+def task_prefixed_labels(tasks_df: pd.DataFrame, answered: np.ndarray) -> np.ndarray:
+    """
+    Display label ('[Category] Task') for every catalog task. When several answered task_keys
+    share a label (same title in several catalogs), those are suffixed with the catalog name and version.
+    """
+    if 'Category' in tasks_df.columns and 'Task' in tasks_df.columns:
+        labels = '[' + tasks_df['Category'].fillna('Unknown') + '] ' + tasks_df['Task'].fillna('Unknown Task')
+    elif 'Task' in tasks_df.columns:
+        labels = tasks_df['Task'].fillna('Unknown Task')
+    else:
+        labels = 'Task ' + tasks_df['task_id'].astype(str)
+
+    keys_per_label = tasks_df['task_key'][answered].groupby(labels[answered]).nunique()
+    clashing = answered & labels.isin(keys_per_label.index[keys_per_label > 1]).to_numpy()
+    suffix = ' (' + tasks_df['Catalog'] + ' v' + tasks_df['Catalog Version'] + ')'
+    return labels.where(~clashing, labels + suffix).to_numpy()
+
+
+def _parse_sparse_scores(user_df: pd.DataFrame, task_cols: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """
+    Parses the answered cells of each task column into coordinate arrays
+    (row position, task position, score). Blank cells are unanswered, not errors;
+    memory is proportional to the number of answered cells.
+    """
+    rows, tasks, scores = [], [], []
+    parsing_errors = 0
+    for task_pos, col in enumerate(task_cols):
+        if col not in user_df.columns:
+            continue
+        text = user_df[col].astype(str).str.replace('%', '', regex=False).str.strip()
+        answered = user_df[col].notna() & (text != '')
+        numeric = pd.to_numeric(text.where(answered), errors='coerce')
+        parsing_errors += int((answered & numeric.isna()).sum())
+        valid = numeric.notna().to_numpy()
+        rows.append(np.flatnonzero(valid))
+        tasks.append(np.full(int(valid.sum()), task_pos, dtype=np.int32))
+        scores.append(numeric.to_numpy(dtype=float)[valid] / 100)
+    if not rows:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.int32), np.empty(0), parsing_errors
+    return np.concatenate(rows), np.concatenate(tasks), np.concatenate(scores), parsing_errors
+
+
+def assess_response_quality(df_merged: pd.DataFrame) -> pd.DataFrame:
+    """
+    Flags straight-lining and low-effort responses from per-person row statistics.
+    All statistics are hash-grouped aggregations over the answered cells (linear time):
+    - Constant: every answer identical.
+    - Near-constant: tiny spread, or one value dominates the answers.
+    - Extremes only: answers use nothing but 0% and 100%.
+    """
+    columns = ['Answers', 'Mean', 'Std', 'Distinct', 'Modal Share', 'Flag']
+    if df_merged.empty:
+        return pd.DataFrame(columns=columns, index=pd.Index([], name='Name'))
+
+    scores = df_merged['Score'].round(4)
+    by_person = scores.groupby(df_merged['Name'])
+    stats = by_person.agg(['size', 'mean', 'std', 'nunique', 'min', 'max'])
+    modal = scores.groupby([df_merged['Name'], scores]).size().groupby(level=0).max()
+
+    quality = pd.DataFrame({
+        'Answers': stats['size'],
+        'Mean': stats['mean'],
+        'Std': stats['std'].fillna(0.0),
+        'Distinct': stats['nunique'],
+        'Modal Share': modal.reindex(stats.index) / stats['size'],
+    })
+    extremes = (scores.isin([0.0, 1.0])).groupby(df_merged['Name']).all()
+
+    eligible = quality['Answers'] >= config.QUALITY_MIN_ANSWERS
+    constant = eligible & (quality['Distinct'] == 1)
+    near_constant = eligible & ~constant & (
+        (quality['Std'] < config.QUALITY_NEAR_CONSTANT_STD) | (quality['Modal Share'] >= config.QUALITY_MODAL_SHARE)
+    )
+    extremes_only = eligible & ~constant & ~near_constant & extremes.reindex(quality.index)
+
+    quality['Flag'] = ''
+    quality.loc[extremes_only, 'Flag'] = config.QUALITY_FLAG_EXTREMES_ONLY
+    quality.loc[near_constant, 'Flag'] = config.QUALITY_FLAG_NEAR_CONSTANT
+    quality.loc[constant, 'Flag'] = config.QUALITY_FLAG_CONSTANT
+    return quality[columns]
+
+
+def iter_user_chunks(
+    user_csv_file: Any,
+    task_cols: List[str],
+    memory_budget_mb: float = config.CHUNK_MEMORY_BUDGET_MB
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streams the user CSV in row blocks sized so that one block stays within the memory budget.
+    Each block is normalized and cleaned exactly like load_and_process_data and yields its
+    person columns ('user_df', task columns dropped) plus its sparse scores
+    ('row_pos' within the block, 'task_pos', 'scores') and 'parsing_errors'.
+    """
+    if hasattr(user_csv_file, 'seek'):
+        user_csv_file.seek(0)  # Uploaded files are re-streamed when thresholds change
+    header = pd.read_csv(user_csv_file, sep=';', encoding='utf-8-sig', nrows=0)
+    if hasattr(user_csv_file, 'seek'):
+        user_csv_file.seek(0)
+    rows_per_chunk = max(1, int(memory_budget_mb * 2**20 // (max(len(header.columns), 1) * config.CHUNK_BYTES_PER_CELL)))
+
+    for user_df in pd.read_csv(user_csv_file, sep=';', encoding='utf-8-sig', chunksize=rows_per_chunk):
+        _normalize_user_columns(user_df)
+        if 'Name' not in user_df.columns:
+            raise ValueError("Required column 'BPS' (renamed to 'Name') not found in the CSV.")
+        user_df.dropna(subset=['Name'], inplace=True)
+        user_df.reset_index(drop=True, inplace=True)
+
+        present_task_cols = [col for col in task_cols if col in user_df.columns]
+        row_pos, task_pos, scores, parsing_errors = _parse_sparse_scores(user_df, task_cols)
+        user_df.drop(columns=present_task_cols, inplace=True)
+        # A text column that is blank throughout one block is read as float; keep it textual
+        for col in user_df.columns[user_df.isna().all()]:
+            user_df[col] = user_df[col].astype(object)
+        _clean_person_columns(user_df)
+        yield {
+            'user_df': user_df,
+            'row_pos': row_pos,
+            'task_pos': task_pos,
+            'scores': scores,
+            'parsing_errors': parsing_errors,
+            'rows_per_chunk': rows_per_chunk,
+        }
+
 
 @st.cache_data
-def load_and_process_data(user_csv_file: IO[Any], tasks_json_path: str) -> Optional[Dict[str, Any]]:
+def load_and_process_data(user_csv_file: IO[Any], tasks_json_path: CatalogPaths) -> Optional[Dict[str, Any]]:
     """
-    Load, clean, and merge the user skills CSV and the tasks catalog JSON.
+    Load, clean, and merge the user skills CSV and one or more task catalog JSONs.
+    Scores are parsed sparsely (answered cells only) and joined to person and task details.
     Uses st.warning for non-critical file reading errors.
     """
 
-    # Read tasks.json -> tasks_df
+    # Read catalog JSON(s) -> tasks_df
     try:
-        tasks_df = pd.read_json(tasks_json_path)['skills'].apply(pd.Series)
-        tasks_df.rename(columns={'title': 'Task', 'id': 'task_id', 'category': 'Category'}, inplace=True)
+        tasks_df = build_tasks_df(tasks_json_path)
     except FileNotFoundError:
         st.warning(f"Warning: tasks.json not found at path: {tasks_json_path}. Cannot validate task list.") # Use warning
         return None # Critical if tasks.json missing
+    except KeyError:
+        st.warning("Warning: 'task_id' (from 'id') not found in tasks.json. Cannot process tasks.") # Use warning
+        return None # Critical
     except Exception as e:
         st.warning(f"Warning: Could not read tasks.json: {e}. Cannot validate task list.") # Use warning
         return None # Critical if tasks.json unreadable
 
-    if 'task_id' not in tasks_df.columns:
-        st.warning("Warning: 'task_id' (from 'id') not found in tasks.json. Cannot process tasks.") # Use warning
-        return None # Critical
-
-    task_cols = [f'Task {i}' for i in tasks_df['task_id']]
-    num_tasks = len(task_cols)
+    task_cols = tasks_df['column'].tolist()
 
     # Read uploaded user_csv_file -> user_df
     try:
@@ -42,53 +213,30 @@ def load_and_process_data(user_csv_file: IO[Any], tasks_json_path: str) -> Optio
         return None # Critical if CSV unreadable
 
     # Normalize headers and key columns
-    user_df.columns = user_df.columns.str.strip()
-    user_df.rename(columns={
-        'BPS': 'Name',
-        'Specific Needs': 'Comments',
-        'Has received Affinity training of McK?': 'Has received Affinity training of McK?',
-        'License Expiration ': 'License Expiration'
-    }, inplace=True)
+    _normalize_user_columns(user_df)
 
     if 'Name' not in user_df.columns:
          st.warning("Warning: Required column 'BPS' (renamed to 'Name') not found in the CSV.") # Use warning
          return None # Critical if Name is missing
 
     user_df.dropna(subset=['Name'], inplace=True)
+    user_df.reset_index(drop=True, inplace=True)
     if user_df.empty:
         st.warning("Warning: No rows with valid 'Name' found in the CSV.") # Use warning
         # Allow processing to continue, might result in empty dashboard
         # return None
 
-    yes_values = {'yes', 'si', 'sí', 'true', '1', 'y', 't'}
-    for col in ['Active License', 'Has received Affinity training of McK?', 'Scheduler tag']:
-        if col in user_df.columns:
-            user_df[col] = user_df[col].astype(str).str.strip().str.lower().isin(yes_values)
-        else:
-            user_df[col] = False # Add missing boolean columns as False
+    # Task columns are parsed into coordinate arrays, then dropped from the person table
+    present_task_cols = [col for col in task_cols if col in user_df.columns]
+    missing_task_cols_for_warning = [col for col in task_cols if col not in user_df.columns]
+    row_pos, task_pos, scores, parsing_errors = _parse_sparse_scores(user_df, task_cols)
+    user_df.drop(columns=present_task_cols, inplace=True)
 
-    if 'License Expiration' in user_df.columns:
-        user_df['License Expiration'] = pd.to_datetime(user_df['License Expiration'], errors='coerce', dayfirst=True)
-    # else: # Handle missing date column if needed, maybe add as NaT
-        # user_df['License Expiration'] = pd.NaT
+    _clean_person_columns(user_df)
 
-    for col in user_df.select_dtypes(include=['object']).columns:
-        user_df[col] = user_df[col].fillna('').astype(str).str.strip()
-
-    # Unpivot Task 1..N into long format
-    present_task_cols = []
-    missing_task_cols_for_warning = []
-    for col in task_cols:
-        if col in user_df.columns:
-            present_task_cols.append(col)
-        else:
-            missing_task_cols_for_warning.append(col) # Track missing Task columns
-
-    if missing_task_cols_for_warning:
+    if missing_task_cols_for_warning and len(tasks_df['Catalog'].unique()) == 1:
         st.info(f"Info: The following task columns expected from tasks.json were not found in the CSV and will be ignored: {', '.join(missing_task_cols_for_warning)}") # Use info
 
-    id_vars = [c for c in user_df.columns if c not in task_cols]
-
     if not present_task_cols:
         st.warning("Warning: No 'Task X' columns found in the uploaded userData.csv.") # Use warning
         # Return minimal structure to avoid breaking app, but dashboard will show warnings
@@ -97,46 +245,27 @@ def load_and_process_data(user_csv_file: IO[Any], tasks_json_path: str) -> Optio
             'user_df': user_df,
             'total_count': user_df['Name'].nunique(),
             'parsing_errors': 0,
+            'response_quality': assess_response_quality(pd.DataFrame()),
         }
 
-    df_long = pd.melt(user_df, id_vars=id_vars, value_vars=present_task_cols, var_name='task_id_str', value_name='Score')
+    # Long format built only from answered cells: person attributes + score + task details
+    df_merged = user_df.iloc[row_pos].reset_index(drop=True)
+    df_merged['task_id_str'] = tasks_df['column'].to_numpy()[task_pos]
+    df_merged['Score'] = scores
+    task_details = tasks_df.drop(columns=['column']).iloc[task_pos].reset_index(drop=True)
+    df_merged = pd.concat([df_merged, task_details], axis=1)
 
-    # Extract numeric task_id and parse percentage scores
-    df_long['task_id'] = df_long['task_id_str'].str.extract(r'(\d+)').astype(int)
-    raw_scores = df_long['Score'].dropna()
-    # Attempt conversion, coercing errors to NaN
-    numeric_scores = pd.to_numeric(raw_scores.astype(str).str.replace('%', '', regex=False).str.strip(), errors='coerce')
-    parsing_errors = int(numeric_scores.isnull().sum()) # Count how many failed
-
-    # Convert valid scores, keep NaNs for invalid ones temporarily
-    df_long['Score'] = pd.to_numeric(df_long['Score'].astype(str).str.replace('%', '', regex=False).str.strip(), errors='coerce') / 100
-    # Drop rows where Score could NOT be converted (parsing errors)
-    df_long.dropna(subset=['Score'], inplace=True)
-
-    # Merge with tasks catalog
-    # Use left merge to keep all user rows even if task_id is somehow invalid
-    df_merged = pd.merge(df_long, tasks_df, on='task_id', how='left')
-
-    # Handle potential merge issues if tasks.json was problematic
-    if df_merged['Task'].isnull().any():
-        st.warning("Warning: Some task scores could not be matched with task details from tasks.json. Check task IDs.")
-
-    # Convenience columns - Check if merge columns exist before creating
+    # Convenience columns - Check if catalog columns exist before creating
     if 'Category' in df_merged.columns:
         df_merged['Skill'] = df_merged['Category']
     else:
         df_merged['Skill'] = 'Unknown'
 
-    if 'Category' in df_merged.columns and 'Task' in df_merged.columns:
-         df_merged['Task_Prefixed'] = '[' + df_merged['Category'].fillna('Unknown') + '] ' + df_merged['Task'].fillna('Unknown Task')
-    elif 'Task' in df_merged.columns:
-         df_merged['Task_Prefixed'] = df_merged['Task'].fillna('Unknown Task')
-    else:
-         df_merged['Task_Prefixed'] = 'Task ' + df_merged['task_id'].astype(str)
-
+    answered_tasks = np.bincount(task_pos, minlength=len(tasks_df)) > 0
+    df_merged['Task_Prefixed'] = task_prefixed_labels(tasks_df, answered_tasks)[task_pos]
 
     # Align Comments naming across views
-    if 'Comments' in df_merged.columns: # Check if 'Comments' survived the melt/merge
+    if 'Comments' in df_merged.columns: # Check if 'Comments' survived the join
         df_merged.rename(columns={'Comments': 'Specific needs'}, inplace=True)
 
     total_names_in_file = user_df['Name'].nunique()
@@ -146,77 +275,5 @@ def load_and_process_data(user_csv_file: IO[Any], tasks_json_path: str) -> Optio
         'user_df': user_df,
         'total_count': total_names_in_file,
         'parsing_errors': parsing_errors, # Report the count
+        'response_quality': assess_response_quality(df_merged),
     }
-
-@st.cache_data
-def generate_csv_template(tasks_json_path: str) -> str:
-    """
-    Generates a template CSV string (Emoji-Free).
-    """
-    try:
-        tasks_df = pd.read_json(tasks_json_path)['skills'].apply(pd.Series)
-        tasks_df.rename(columns={'id': 'task_id'}, inplace=True)
-        task_cols = [f'Task {i}' for i in tasks_df['task_id']]
-    except Exception as e:
-        st.warning(f"Warning: Could not read tasks.json to generate template ({e}). Using 31 default tasks.") # Use warning
-        task_cols = [f'Task {i}' for i in range(1, 32)]
-
-    base_headers = [
-        'BPS',
-        'Team Leader',
-        'Active License',
-        'License Expiration ',
-        'Has received Affinity training of McK?',
-        'Scheduler tag',
-        'Specific Needs'
-    ]
-
-    all_headers = base_headers + task_cols
-    template_df = pd.DataFrame(columns=all_headers)
-
-    example_row = {
-        'BPS': 'FirstName LastName',
-        'Team Leader': 'Leader Name',
-        'Active License': 'Yes',
-        'License Expiration ': '25.10.2026',
-        'Has received Affinity training of McK?': 'No',
-        'Scheduler tag': 'No',
-        'Specific Needs': 'Needs help with isometrics',
-    }
-    for col in task_cols:
-        example_row[col] = '50%'
-
-    # Create DataFrame from the single example row dictionary
-    example_df = pd.DataFrame([example_row], columns=all_headers) # Ensure columns match template
-
-    # Concatenate the empty template_df with the example_df
-    template_df = pd.concat([template_df, example_df], ignore_index=True)
-
-
-    return template_df.to_csv(sep=';', index=False, encoding='utf-8-sig')
-
-
-@st.cache_data
-def generate_task_guide(tasks_json_path: str) -> str:
-    """
-    Generates a simple text list of tasks (Emoji-Free).
-    """
-    try:
-        tasks_df = pd.read_json(tasks_json_path)['skills'].apply(pd.Series)
-        tasks_df.rename(columns={'id': 'task_id', 'title': 'Task'}, inplace=True)
-
-        if 'task_id' not in tasks_df.columns or 'Task' not in tasks_df.columns:
-            raise ValueError("Required columns 'id' or 'title' not found in tasks.json skills list.")
-
-        tasks_df = tasks_df.sort_values(by='task_id')
-
-        guide_lines = ["Team Skills Assessment - Task List\n", "="*35 + "\n"]
-        for _, row in tasks_df.iterrows():
-            guide_lines.append(f"Task {row['task_id']}: {row['Task']}\n")
-
-        return "".join(guide_lines)
-
-    except FileNotFoundError:
-        return f"Warning: Could not find the task definition file at {tasks_json_path}." # Use warning
-    except Exception as e:
-        return f"Warning: Error reading or processing tasks.json: {e}" # Use warning
\ No newline at end of file
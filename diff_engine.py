@@ -0,0 +1,143 @@
+# =============================
+# File: diff_engine.py
+# =============================
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Any
+import config
+from analytics_engine import build_sparse_scores
+
+
+def _cells(scores: Dict[str, Any], names: pd.Index, tasks: pd.Index):
+    """
+    Answered cells of one wave as sorted union-grid keys (row * len(tasks) + col) and their scores.
+    A repeated (person, task) answer keeps its last score; NaN scores count as unanswered.
+    """
+    rows = names.get_indexer(scores['names'])[scores['person']]
+    cols = tasks.get_indexer(scores['tasks'])[scores['task']]
+    keys = rows.astype(np.int64) * len(tasks) + cols
+    keys, last = np.unique(keys[::-1], return_index=True)
+    values = scores['score'][::-1][last]
+    answered = ~np.isnan(values)
+    return keys[answered], values[answered]
+
+
+def _license_changes(old_users: pd.DataFrame, new_users: pd.DataFrame) -> pd.DataFrame:
+    """Compares license status and expiry for people present in both waves."""
+    cols = ['Active License', 'License Expiration']
+    old = old_users.drop_duplicates('Name').set_index('Name').reindex(columns=cols)
+    new = new_users.drop_duplicates('Name').set_index('Name').reindex(columns=cols)
+    both = old.join(new, how='inner', lsuffix=' (Old)', rsuffix=' (New)')
+
+    was_active = both['Active License (Old)'].fillna(False).astype(bool)
+    is_active = both['Active License (New)'].fillna(False).astype(bool)
+    old_exp = both['License Expiration (Old)']
+    new_exp = both['License Expiration (New)']
+
+    change = pd.Series('', index=both.index)
+    change[is_active & new_exp.notna() & (old_exp.isna() | (new_exp > old_exp))] = 'Renewed'
+    change[~was_active & is_active] = 'Newly Licensed'
+    change[was_active & ~is_active] = 'Lapsed'
+    both['Change'] = change
+    return both[both['Change'] != ''].reset_index()
+
+
+def compare_snapshots(
+    old_data: Dict[str, Any],
+    new_data: Dict[str, Any],
+    expert_threshold: float = config.EXPERT_THRESHOLD
+) -> Dict[str, Any]:
+    """
+    Diffs two processed datasets (outputs of load_and_process_data) aligned on Name x task_key.
+    Both waves stay sparse: answered cells are matched on their (person, task) coordinates and
+    deltas are taken only where both waves answered. Cells answered in only one wave are reported
+    as new or removed answers (for people assessed in both waves; everyone else is a new or
+    departed person). People and SPOF changes are set operations on indexes.
+    """
+    old_df, new_df = old_data['merged_df'], new_data['merged_df']
+    old_s = build_sparse_scores(old_df, task_col='task_key')
+    new_s = build_sparse_scores(new_df, task_col='task_key')
+
+    old_names = pd.Index(old_data['user_df']['Name'].unique())
+    new_names = pd.Index(new_data['user_df']['Name'].unique())
+    names = old_s['names'].union(new_s['names'])
+    tasks = old_s['tasks'].union(new_s['tasks'])
+    old_keys, old_values = _cells(old_s, names, tasks)
+    new_keys, new_values = _cells(new_s, names, tasks)
+    both, old_pos, new_pos = np.intersect1d(old_keys, new_keys, assume_unique=True, return_indices=True)
+    delta = new_values[new_pos] - old_values[old_pos]
+    rows, cols = np.divmod(both, len(tasks))
+
+    # Task labels: prefer the newest catalog naming
+    labels = pd.concat([
+        old_df.drop_duplicates('task_key').set_index('task_key')['Task_Prefixed'],
+        new_df.drop_duplicates('task_key').set_index('task_key')['Task_Prefixed'],
+    ])
+    task_labels = labels[~labels.index.duplicated(keep='last')].reindex(tasks).to_numpy()
+    name_labels = names.to_numpy()
+
+    # Cell-level changes
+    changed = delta != 0
+    score_changes = pd.DataFrame({
+        'Name': name_labels[rows[changed]],
+        'Task_Prefixed': task_labels[cols[changed]],
+        'Old Score': old_values[old_pos][changed],
+        'New Score': new_values[new_pos][changed],
+        'Delta': delta[changed],
+    }).sort_values('Delta', key=np.abs, ascending=False, ignore_index=True)
+
+    # Cells answered in one wave only, for people present in both
+    in_both = names.isin(old_s['names']) & names.isin(new_s['names'])
+
+    def _one_wave(keys: np.ndarray, values: np.ndarray, other: np.ndarray) -> pd.DataFrame:
+        only = ~np.isin(keys, other, assume_unique=True)
+        only_rows, only_cols = np.divmod(keys[only], len(tasks))
+        kept = in_both[only_rows]
+        return pd.DataFrame({
+            'Name': name_labels[only_rows[kept]],
+            'Task_Prefixed': task_labels[only_cols[kept]],
+            'Score': values[only][kept],
+        })
+
+    new_answers = _one_wave(new_keys, new_values, old_keys)
+    removed_answers = _one_wave(old_keys, old_values, new_keys)
+
+    # Person-level movers (only people assessed in both waves)
+    compared = np.bincount(rows, minlength=len(names))
+    with np.errstate(invalid='ignore'):
+        mean_delta = np.bincount(rows, weights=delta, minlength=len(names)) / compared
+    person_movers = pd.DataFrame({
+        'Avg Delta': mean_delta,
+        'Improved Tasks': np.bincount(rows[delta > 0], minlength=len(names)),
+        'Declined Tasks': np.bincount(rows[delta < 0], minlength=len(names)),
+        'Tasks Compared': compared,
+    }, index=names)
+    person_movers = person_movers[compared > 0].sort_values('Avg Delta', key=np.abs, ascending=False)
+
+    # Task-level movers
+    with np.errstate(invalid='ignore'):
+        task_mean_delta = np.bincount(cols, weights=delta, minlength=len(tasks)) / np.bincount(cols, minlength=len(tasks))
+    old_experts = np.bincount(old_keys[old_values >= expert_threshold] % len(tasks), minlength=len(tasks))
+    new_experts = np.bincount(new_keys[new_values >= expert_threshold] % len(tasks), minlength=len(tasks))
+    task_movers = pd.DataFrame({
+        'Avg Delta': task_mean_delta,
+        'Old Experts': old_experts,
+        'New Experts': new_experts,
+    }, index=pd.Index(task_labels, name='Task_Prefixed')).sort_values('Avg Delta', ascending=False)
+
+    old_spof = set(task_labels[old_experts == 1])
+    new_spof = set(task_labels[new_experts == 1])
+
+    return {
+        'score_changes': score_changes,
+        'new_answers': new_answers,
+        'removed_answers': removed_answers,
+        'person_movers': person_movers,
+        'task_movers': task_movers,
+        'new_people': new_names.difference(old_names),
+        'departed_people': old_names.difference(new_names),
+        'license_changes': _license_changes(old_data['user_df'], new_data['user_df']),
+        'new_spofs': sorted(new_spof - old_spof),
+        'resolved_spofs': sorted(old_spof - new_spof),
+    }
@@ -0,0 +1,337 @@
+# =============================
+# File: edit_engine.py
+# =============================
+"""
+In-app score editing with incremental analytics.
+
+An edit state keeps running aggregates next to the answered cells:
+- per person: answer count, score sum and sum of squares (Avg Score and Volatility),
+- per task: (weighted) answer count, score sum, expert / beginner counts at the active
+  thresholds, and the number of experts whose license expires in the window,
+- sorted per-person Avg Score / Volatility arrays, from which the archetype medians are read.
+
+Editing a cell subtracts the old score from these aggregates and adds the new one, so an edit
+touches one person, one task and two sorted arrays, independent of the team size. Views
+(task_summary, risk views, person_summary) are materialized from the aggregates on demand.
+The edit log is the source of truth: it can be replayed onto a fresh state and exported as a
+user CSV in the upload format.
+
+Results match compute_analytics() on the edited data up to floating-point summation order
+(an edited person's Avg Score / Volatility come from running sums). Archetypes can therefore
+only differ for people whose Avg Score or Volatility ties a team median to within rounding noise.
+"""
+
+import csv
+import io
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+from analytics_engine import archetype_labels, build_task_summary
+from data_engine import build_tasks_df
+
+
+def _sorted_median(values: np.ndarray) -> float:
+    """Median of an already sorted array (pandas semantics: NaN when empty)."""
+    n = len(values)
+    if not n:
+        return np.nan
+    return float((values[(n - 1) // 2] + values[n // 2]) / 2)
+
+
+def _replace_sorted(values: np.ndarray, old: float, new: float) -> np.ndarray:
+    """Swaps one occurrence of `old` for `new` in a sorted array (NaN = absent on either side)."""
+    if not np.isnan(old):
+        values = np.delete(values, np.searchsorted(values, old))
+    if not np.isnan(new):
+        values = np.insert(values, np.searchsorted(values, new), new)
+    return values
+
+
+def _person_stats(count: float, total: float, total_sq: float):
+    """(mean, sample std) from running sums; NaN where pandas' groupby mean/std would be NaN."""
+    if count == 0:
+        return np.nan, np.nan
+    mean = total / count
+    if count == 1:
+        return mean, np.nan
+    return mean, float(np.sqrt(max(total_sq - total * mean, 0.0) / (count - 1)))
+
+
+def build_edit_state(
+    analytics: Dict[str, Any],
+    user_df: pd.DataFrame,
+    as_of: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Running aggregates for one analyzed dataset (compute_analytics output), at its thresholds.
+    Initial Avg Score / Volatility are taken from person_summary, so untouched people keep
+    their exact values; task aggregates honor down-weighted answers like apply_thresholds.
+    The license expiration window starts at `as_of`, by default the evaluation date of the
+    analytics' threshold index, so Expiration Risk matches the unedited views.
+    """
+    scores = analytics['scores']
+    thresholds = analytics['thresholds']
+    names, tasks = scores['names'], scores['tasks']
+    n_people, n_tasks = len(names), len(tasks)
+
+    # Cells sorted by (person, task): a person's answers are one contiguous block
+    cell_keys = scores['person'].astype(np.int64) * n_tasks + scores['task']
+    order = np.argsort(cell_keys, kind='stable')
+    # Unweighted data keeps integer counts, as apply_thresholds does
+    weights = scores['weight'] if scores['weight'] is not None else np.ones(len(order), dtype=np.int64)
+    person_weight = np.ones(n_people, dtype=weights.dtype)
+    person_weight[scores['person']] = weights
+
+    as_of = as_of or analytics['threshold_index']['as_of']
+    expiration_window = as_of + pd.Timedelta(days=config.LICENSE_EXPIRATION_WINDOW_DAYS)
+    person_expiry = pd.Series(
+        user_df.drop_duplicates('Name').set_index('Name')['License Expiration'].reindex(names).to_numpy()
+        if 'License Expiration' in user_df.columns else pd.NaT, index=names, dtype='datetime64[ns]'
+    )
+
+    person_summary = analytics['person_summary']
+    person_summary = person_summary[~person_summary.index.duplicated()]
+    avg = person_summary['Avg Score'].reindex(names).to_numpy(dtype=float, copy=True)
+    volatility = person_summary['Volatility'].reindex(names).to_numpy(dtype=float, copy=True)
+    values, person = scores['score'], scores['person']
+
+    # CSV column and Category of every task, from the first row that answers it
+    df = analytics['df_merged_for_lookup']
+    _, first_row = np.unique(scores['task'], return_index=True)
+    columns = pd.Series(np.nan, index=tasks, dtype=object)
+    if 'task_id_str' in df.columns:
+        columns[:] = df['task_id_str'].to_numpy()[first_row]
+
+    state = {
+        'names': names,
+        'tasks': tasks,
+        'columns': columns,
+        'categories': pd.Series(df['Category'].to_numpy()[first_row], index=tasks),
+        'cell_keys': cell_keys[order],
+        'cell_score': values[order].copy(),
+        'cell_weight': weights[order],
+        'extra': {},  # Cells answered only through edits: key -> score
+        'person_weight': person_weight,
+        'as_of': as_of,
+        'expiring': (person_expiry.notna() & (person_expiry < expiration_window)).to_numpy(),
+        'p_count': np.bincount(person, minlength=n_people).astype(float),
+        'p_sum': np.bincount(person, values, minlength=n_people),
+        'p_sum_sq': np.bincount(person, values * values, minlength=n_people),
+        'avg': avg,
+        'volatility': volatility,
+        'sorted_avg': np.sort(avg[~np.isnan(avg)]),
+        'sorted_volatility': np.sort(volatility[~np.isnan(volatility)]),
+        't_weight': np.bincount(scores['task'], weights, minlength=n_tasks),
+        't_sum': np.bincount(scores['task'], weights * values, minlength=n_tasks),
+        'avg_score': analytics['threshold_index']['avg_score'].copy(),
+        'person_columns': person_summary.drop(columns=['Avg Score', 'Volatility', 'Archetype'], errors='ignore'),
+        'log': [],
+    }
+    _retarget(state, thresholds)
+    return state
+
+
+def _all_cells(state: Dict[str, Any]):
+    """(person, task, score, weight) of every answered cell, including cells added by edits."""
+    n_tasks = len(state['tasks'])
+    keys = np.concatenate([state['cell_keys'], np.fromiter(state['extra'], dtype=np.int64, count=len(state['extra']))])
+    values = np.concatenate([state['cell_score'], np.fromiter(state['extra'].values(), dtype=float, count=len(state['extra']))])
+    person, task = np.divmod(keys, n_tasks)
+    weights = np.concatenate([state['cell_weight'], state['person_weight'][person[len(state['cell_keys']):]]])
+    answered = ~np.isnan(values)
+    return person[answered], task[answered], values[answered], weights[answered]
+
+
+def _retarget(state: Dict[str, Any], thresholds: Dict[str, float]) -> None:
+    """Recounts the threshold-dependent task aggregates (only needed when a threshold slider moves)."""
+    n_tasks = len(state['tasks'])
+    person, task, values, weights = _all_cells(state)
+    expert = values >= thresholds['expert']
+    state['thresholds'] = dict(thresholds)
+    beginner = values < thresholds['beginner']
+    state['t_expert'] = np.bincount(task[expert], weights[expert], minlength=n_tasks).astype(weights.dtype)
+    state['t_beginner'] = np.bincount(task[beginner], weights[beginner], minlength=n_tasks).astype(weights.dtype)
+    expiring_expert = expert & state['expiring'][person]
+    state['t_expiring_experts'] = np.bincount(task[expiring_expert], minlength=n_tasks)
+
+
+def _contribute(state: Dict[str, Any], p: int, t: int, value: float, sign: int) -> None:
+    """Adds (sign=1) or removes (sign=-1) one answer from the running aggregates."""
+    weight = state['person_weight'][p]
+    state['p_count'][p] += sign
+    state['p_sum'][p] += sign * value
+    state['p_sum_sq'][p] += sign * value * value
+    state['t_weight'][t] += sign * weight
+    state['t_sum'][t] += sign * weight * value
+    if value >= state['thresholds']['expert']:
+        state['t_expert'][t] += sign * weight
+        state['t_expiring_experts'][t] += sign * bool(state['expiring'][p])
+    if value < state['thresholds']['beginner']:
+        state['t_beginner'][t] += sign * weight
+
+
+def current_score(state: Dict[str, Any], p: int, t: int) -> float:
+    """Current score of a cell by person / task position (NaN = not answered)."""
+    key = p * len(state['tasks']) + t
+    i = np.searchsorted(state['cell_keys'], key)
+    if i < len(state['cell_keys']) and state['cell_keys'][i] == key:
+        return float(state['cell_score'][i])
+    return state['extra'].get(key, np.nan)
+
+
+def apply_edit(state: Dict[str, Any], name: str, task: str, score: Optional[float]) -> Optional[Dict[str, Any]]:
+    """
+    Sets one score (0-1; None or NaN clears the answer) and updates the affected aggregates.
+    Returns the log entry, or None when the value is unchanged. Raises ValueError for
+    unknown people / tasks or scores outside 0-1.
+    """
+    if name not in state['names'] or task not in state['tasks']:
+        raise ValueError(f"Unknown person or task: {name} / {task}")
+    new = np.nan if score is None else float(score)
+    if not np.isnan(new) and not 0.0 <= new <= 1.0:
+        raise ValueError(f"Score must be between 0 and 1, got {score}")
+    p, t = state['names'].get_loc(name), state['tasks'].get_loc(task)
+    old = current_score(state, p, t)
+    if old == new or (np.isnan(old) and np.isnan(new)):
+        return None
+
+    # Store the new value
+    key = p * len(state['tasks']) + t
+    i = np.searchsorted(state['cell_keys'], key)
+    if i < len(state['cell_keys']) and state['cell_keys'][i] == key:
+        state['cell_score'][i] = new
+    elif np.isnan(new):
+        state['extra'].pop(key, None)
+    else:
+        state['extra'][key] = new
+
+    # Running sums: remove the old answer, add the new one
+    if not np.isnan(old):
+        _contribute(state, p, t, old, -1)
+    if not np.isnan(new):
+        _contribute(state, p, t, new, 1)
+
+    avg, volatility = _person_stats(state['p_count'][p], state['p_sum'][p], state['p_sum_sq'][p])
+    state['sorted_avg'] = _replace_sorted(state['sorted_avg'], state['avg'][p], avg)
+    state['sorted_volatility'] = _replace_sorted(state['sorted_volatility'], state['volatility'][p], volatility)
+    state['avg'][p], state['volatility'][p] = avg, volatility
+    state['avg_score'][t] = state['t_sum'][t] / state['t_weight'][t] if state['t_weight'][t] > 0 else np.nan
+
+    entry = {'Name': name, 'Task_Prefixed': task, 'Old Score': old, 'New Score': new, 'Edited At': datetime.now()}
+    state['log'].append(entry)
+    return entry
+
+
+def replay_edits(state: Dict[str, Any], log: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Re-applies a previous edit log to a fresh state. Returns the entries that do not apply
+    (e.g. people excluded in the current quality mode) so they can be replayed later.
+    """
+    skipped = []
+    for entry in log:
+        try:
+            apply_edit(state, entry['Name'], entry['Task_Prefixed'], entry['New Score'])
+        except ValueError:
+            skipped.append(entry)
+    return skipped
+
+
+def edited_views(state: Dict[str, Any], thresholds: Dict[str, float]) -> Dict[str, Any]:
+    """
+    task_summary, risk_radar, risk_matrix and person_summary from the running aggregates.
+    Tasks and people left without answers are dropped, as a full recompute would.
+    """
+    if thresholds['expert'] != state['thresholds']['expert'] or thresholds['beginner'] != state['thresholds']['beginner']:
+        _retarget(state, thresholds)
+    state['thresholds'] = dict(thresholds)
+
+    answered = state['t_weight'] > 0
+    task_summary = build_task_summary(
+        state['tasks'][answered], state['avg_score'][answered],
+        state['t_expert'][answered], state['t_beginner'][answered],
+        np.full(int(answered.sum()), -np.inf), thresholds
+    )
+    task_summary['Expiration Risk'] = state['t_expiring_experts'][answered] > 0
+
+    present = state['p_count'] > 0
+    person_summary = pd.DataFrame({
+        'Avg Score': state['avg'][present],
+        'Volatility': state['volatility'][present],
+    }, index=state['names'][present])
+    person_summary['Archetype'] = archetype_labels(
+        person_summary['Avg Score'].to_numpy(), person_summary['Volatility'].to_numpy(),
+        _sorted_median(state['sorted_avg']), _sorted_median(state['sorted_volatility'])
+    )
+    person_summary = person_summary.join(state['person_columns'], how='left')
+
+    return {
+        'task_summary': task_summary,
+        'risk_radar': task_summary.sort_values(by='Risk Index', ascending=False),
+        'risk_matrix': task_summary[task_summary['Risk Index'] > thresholds['high_risk']],
+        'person_summary': person_summary,
+    }
+
+
+def _person_cells(state: Dict[str, Any], p: int) -> pd.Series:
+    """Current answers of one person by task position: their contiguous cell block plus added cells."""
+    n_tasks = len(state['tasks'])
+    lo, hi = np.searchsorted(state['cell_keys'], [p * n_tasks, (p + 1) * n_tasks])
+    cells = pd.Series(state['cell_score'][lo:hi], index=state['cell_keys'][lo:hi] - p * n_tasks)
+    extra = {key - p * n_tasks: value for key, value in state['extra'].items() if key // n_tasks == p}
+    if extra:
+        cells = pd.concat([cells, pd.Series(extra)])
+    return cells.dropna()
+
+
+def score_grid(state: Dict[str, Any], names: List[str], tasks: List[str]) -> pd.DataFrame:
+    """Current scores for a block of people x tasks (NaN = not answered)."""
+    task_pos = state['tasks'].get_indexer(tasks)
+    rows = [_person_cells(state, p).reindex(task_pos).to_numpy() for p in state['names'].get_indexer(names)]
+    grid = np.vstack(rows) if rows else np.empty((0, len(tasks)))
+    return pd.DataFrame(grid, index=pd.Index(names, name='Name'), columns=tasks)
+
+
+def export_edited_csv(
+    state: Dict[str, Any],
+    user_df: pd.DataFrame,
+    tasks_json_path: Any = config.TASK_CATALOGS,
+    edited_only: bool = True
+) -> str:
+    """
+    Writes people (by default only those in the edit log) as a user CSV in the upload format:
+    template header names, yes/no flags, dd.mm.yyyy dates and 'NN%' scores in the catalog task columns.
+    Re-uploading it reproduces the edited scores.
+    """
+    people = user_df.drop_duplicates('Name')
+    if edited_only:
+        people = people[people['Name'].isin({entry['Name'] for entry in state['log']})]
+    task_columns = build_tasks_df(tasks_json_path)['column'].tolist()
+    rename = {'Name': 'BPS', 'Comments': 'Specific Needs', 'License Expiration': 'License Expiration '}
+    headers = [rename.get(c, c) for c in people.columns]  # Same person columns and order as the upload
+
+    person_pos = state['names'].get_indexer(people['Name'])
+    column_of_task = state['columns'].to_numpy()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';', lineterminator='\n')
+    writer.writerow(headers + task_columns)
+    for p, (_, row) in zip(person_pos, people.rename(columns=rename).iterrows()):
+        cells = {}
+        for header in headers:
+            value = row[header]
+            if isinstance(value, (bool, np.bool_)):
+                value = 'Yes' if value else 'No'
+            elif isinstance(value, pd.Timestamp):
+                value = value.strftime('%d.%m.%Y')
+            elif pd.isna(value):
+                value = ''
+            cells[header] = value
+        if p >= 0:
+            for t, value in _person_cells(state, p).items():
+                if isinstance(column_of_task[t], str):
+                    cells[column_of_task[t]] = f"{round(value * 100, 4):g}%"
+        writer.writerow([cells.get(h, '') for h in headers + task_columns])
+    return buffer.getvalue()
@@ -0,0 +1,284 @@
+# =============================
+# File: heatmap_engine.py
+# =============================
+"""
+Server-side aggregated people x tasks heatmap.
+
+Rows are groups of people (Team Leader, or clusters of similar category profiles) and
+columns are Categories. Zooming into a row group shows its people; zooming into a
+Category shows its tasks. Every tile is aggregated from the sparse scores with one
+bincount and holds at most `max_cells` cells: when a view has more rows or columns than
+fit, neighbouring ones (ordered by average score) are merged into bands. The most recently
+used tiles (config.HEATMAP_TILE_CACHE_SIZE) are memoized in the index, so switching back to
+a view costs nothing.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+
+ROW_LEVELS = {'team': 'Team Leader', 'cluster': 'Cluster'}
+
+
+def _cluster_people(features: np.ndarray, k: int, iterations: int = 25) -> np.ndarray:
+    """
+    Deterministic k-means on people x category means (NaN filled with the person's mean).
+    Non-empty clusters are numbered by ascending average score, so Cluster 1 is the least confident.
+    """
+    n_people = len(features)
+    if n_people == 0:
+        return np.zeros(0, dtype=np.int64)
+    k = max(1, min(k, n_people))
+    with np.errstate(invalid='ignore'):
+        row_mean = np.nanmean(np.where(np.isnan(features).all(axis=1, keepdims=True), 0.0, features), axis=1)
+    x = np.where(np.isnan(features), row_mean[:, None], features)
+
+    # Seeds: people at evenly spaced quantiles of the overall mean
+    order = np.argsort(row_mean, kind='stable')
+    centers = x[order[np.linspace(0, n_people - 1, k).round().astype(np.int64)]].copy()
+    labels = np.zeros(n_people, dtype=np.int64)
+    x_sq = (x ** 2).sum(axis=1, keepdims=True)
+    for i in range(iterations):
+        distances = x_sq - 2 * x @ centers.T + (centers ** 2).sum(axis=1)
+        new_labels = distances.argmin(axis=1)
+        if i > 0 and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        sizes = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, x)
+        filled = sizes > 0  # Empty clusters keep their previous center
+        centers[filled] = sums[filled] / sizes[filled, None]
+
+    # Empty clusters (e.g. seeds on identical profiles) are dropped before numbering
+    used = np.flatnonzero(np.bincount(labels, minlength=k))
+    rank = np.empty(k, dtype=np.int64)
+    rank[used[np.argsort(centers[used].mean(axis=1), kind='stable')]] = np.arange(len(used))
+    return rank[labels]
+
+
+def build_heatmap_index(analytics: Dict[str, Any], clusters: int = config.HEATMAP_CLUSTERS) -> Dict[str, Any]:
+    """Heatmap index for a compute_analytics result (its sparse scores, teams and task Categories)."""
+    scores = analytics['scores']
+    person_summary = analytics['person_summary']
+    if 'Team Leader' in person_summary.columns:
+        team = person_summary['Team Leader'].reindex(scores['names'])
+    else:
+        team = pd.Series(np.nan, index=scores['names'])
+    df = analytics['df_merged_for_lookup']
+    task_category = df.drop_duplicates('Task_Prefixed').set_index('Task_Prefixed')['Category'].reindex(scores['tasks'])
+    return build_heatmap_index_sparse(scores, team.to_numpy(), task_category.to_numpy(), clusters)
+
+
+def build_heatmap_index_sparse(
+    scores: Dict[str, Any],
+    team: np.ndarray,
+    task_category: np.ndarray,
+    clusters: int = config.HEATMAP_CLUSTERS
+) -> Dict[str, Any]:
+    """
+    Everything a tile needs, built once per dataset straight from sparse (COO) scores
+    (analytics_engine.build_sparse_scores layout): the scores in person-major order, each
+    person's team and cluster and each task's Category. `team` is aligned to scores['names']
+    and `task_category` to scores['tasks']. No long-format table or full analytics run is needed.
+    """
+    names, tasks = scores['names'], scores['tasks']
+    n_people = len(names)
+
+    order = np.argsort(scores['person'], kind='stable')
+    person = scores['person'][order]
+    task = scores['task'][order]
+    score = scores['score'][order]
+    weight = None if scores.get('weight') is None else np.asarray(scores['weight'], dtype=float)[order]
+    del order
+
+    team = pd.Series(team, dtype=object).fillna('').astype(str).replace('', 'Unassigned')
+    team_code, teams = pd.factorize(team.to_numpy(), sort=True)
+    category_code, categories = pd.factorize(pd.Series(task_category, dtype=object).fillna('Unknown').to_numpy(), sort=True)
+
+    # Clusters from each person's unweighted mean per Category (NaN = Category not answered)
+    n_categories = len(categories)
+    flat = person.astype(np.int64) * n_categories + category_code[task]
+    counts = np.bincount(flat, minlength=n_people * n_categories).reshape(n_people, n_categories)
+    sums = np.bincount(flat, score, minlength=n_people * n_categories).reshape(n_people, n_categories)
+    del flat
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cluster_code = _cluster_people(sums / counts, clusters)
+    n_clusters = int(cluster_code.max()) + 1 if n_people else 0
+
+    return {
+        'names': names,
+        'tasks': tasks,
+        'person': person,
+        'person_offsets': np.searchsorted(person, np.arange(n_people + 1)),
+        'task': task,
+        'score': score,
+        'weight': weight,  # None: every answer counts fully
+        'row_groups': {
+            'team': (team_code, pd.Index(teams, name='Team Leader')),
+            'cluster': (cluster_code, pd.Index([f"Cluster {i + 1}" for i in range(n_clusters)], name='Cluster')),
+        },
+        'category_code': category_code,
+        'categories': pd.Index(categories, name='Category'),
+        'tiles': OrderedDict(),  # Bounded LRU: view -> tile
+        'tiles_lock': threading.Lock(),  # API workers share one index
+    }
+
+
+def _band(sums: np.ndarray, weights: np.ndarray, counts: np.ndarray, labels: np.ndarray, sizes: np.ndarray, limit: int, unit: str):
+    """
+    Merges rows (axis 0) into at most `limit` bands of neighbours by average score.
+    `sizes` (people / tasks behind each row) are summed per band; labels give the band's
+    row count and average score range.
+    """
+    n = len(labels)
+    if n <= limit:
+        return sums, weights, counts, labels, sizes
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums.sum(axis=1) / weights.sum(axis=1)
+    order = np.argsort(np.nan_to_num(means, nan=-1.0), kind='stable')
+    starts = np.linspace(0, n, limit + 1).round().astype(np.int64)[:-1]
+    sorted_means = means[order]
+    band_labels = []
+    for b, (start, stop) in enumerate(zip(starts, np.append(starts[1:], n))):
+        band = sorted_means[start:stop]
+        band = band[~np.isnan(band)]
+        span = f"{band.min():.0%}-{band.max():.0%}" if len(band) else "no answers"
+        band_labels.append(f"Band {b + 1}: {stop - start} {unit} ({span})")
+    return (
+        np.add.reduceat(sums[order], starts, axis=0),
+        np.add.reduceat(weights[order], starts, axis=0),
+        np.add.reduceat(counts[order], starts, axis=0),
+        np.array(band_labels, dtype=object),
+        np.add.reduceat(sizes[order], starts),
+    )
+
+
+def heatmap_tile(
+    index: Dict[str, Any],
+    rows: str = 'team',
+    row_key: Optional[str] = None,
+    col_key: Optional[str] = None,
+    max_cells: int = config.HEATMAP_MAX_CELLS
+) -> Dict[str, Any]:
+    """
+    One aggregated view of the score matrix.
+    rows: 'team' or 'cluster'. row_key zooms into one row group (rows become its people);
+    col_key zooms into one Category (columns become its tasks).
+    Returns {'z' (weighted mean score, NaN = no answers), 'answers', 'rows', 'columns',
+    'row_sizes', 'column_sizes', 'cells', 'banded_rows', 'banded_columns', ...}; the row and
+    column sizes count the people / tasks behind each cell.
+    """
+    if rows not in ROW_LEVELS:
+        raise ValueError(f"Unknown row grouping '{rows}'. Use one of: {', '.join(ROW_LEVELS)}.")
+    view = (rows, row_key, col_key, max_cells)
+    with index['tiles_lock']:
+        if view in index['tiles']:
+            index['tiles'].move_to_end(view)
+            return index['tiles'][view]
+
+    group_code, groups = index['row_groups'][rows]
+    categories = index['categories']
+    person, task = index['person'], index['task']
+    score, weight = index['score'], index['weight']
+
+    # Rows: groups, or the people of one group (only their slice of the person-major cells)
+    if row_key is None:
+        row_of_cell = group_code[person]
+        row_labels = groups.to_numpy(dtype=object)
+        row_unit = 'teams' if rows == 'team' else 'clusters'
+        row_sizes = np.bincount(group_code, minlength=len(groups))
+    else:
+        if row_key not in groups:
+            raise ValueError(f"Unknown {ROW_LEVELS[rows]} '{row_key}'.")
+        members = np.flatnonzero(group_code == groups.get_loc(row_key))
+        offsets = index['person_offsets']
+        lengths = offsets[members + 1] - offsets[members]
+        starts = np.repeat(offsets[members] - np.cumsum(lengths) + lengths, lengths)
+        cells = starts + np.arange(lengths.sum())
+        person, task, score = person[cells], task[cells], score[cells]
+        weight = None if weight is None else weight[cells]
+        local = np.full(len(index['names']), -1, dtype=np.int64)
+        local[members] = np.arange(len(members))
+        row_of_cell = local[person]
+        row_labels = index['names'][members].to_numpy(dtype=object)
+        row_unit = 'people'
+        row_sizes = np.ones(len(members), dtype=np.int64)
+
+    # Columns: Categories, or the tasks of one Category
+    if col_key is None:
+        col_of_cell = index['category_code'][task]
+        col_labels = categories.to_numpy(dtype=object)
+    else:
+        if col_key not in categories:
+            raise ValueError(f"Unknown Category '{col_key}'.")
+        category_tasks = np.flatnonzero(index['category_code'] == categories.get_loc(col_key))
+        local = np.full(len(index['tasks']), -1, dtype=np.int64)
+        local[category_tasks] = np.arange(len(category_tasks))
+        col_of_cell = local[task]
+        keep = col_of_cell >= 0
+        row_of_cell, col_of_cell, score = row_of_cell[keep], col_of_cell[keep], score[keep]
+        weight = None if weight is None else weight[keep]
+        col_labels = index['tasks'][category_tasks].to_numpy(dtype=object)
+    col_sizes = (
+        np.bincount(index['category_code'], minlength=len(categories)) if col_key is None
+        else np.ones(len(col_labels), dtype=np.int64)
+    )
+
+    n_rows, n_cols = len(row_labels), len(col_labels)
+    flat = row_of_cell * n_cols + col_of_cell
+    size = n_rows * n_cols
+    sums = np.bincount(flat, score if weight is None else score * weight, minlength=size).reshape(n_rows, n_cols)
+    counts = np.bincount(flat, minlength=size).reshape(n_rows, n_cols)
+    weights = counts.astype(float) if weight is None else np.bincount(flat, weight, minlength=size).reshape(n_rows, n_cols)
+
+    # Bound the tile: columns first (about twice the square root of the budget), then rows
+    col_limit = max(1, min(int(np.sqrt(max_cells)) * 2, max_cells))
+    banded_columns = n_cols > col_limit
+    sums, weights, counts, col_labels, col_sizes = _band(
+        sums.T, weights.T, counts.T, col_labels, col_sizes, col_limit,
+        'tasks' if col_key is not None else 'categories'
+    )
+    sums, weights, counts = sums.T, weights.T, counts.T
+    row_limit = max(1, max_cells // max(len(col_labels), 1))
+    banded_rows = n_rows > row_limit
+    sums, weights, counts, row_labels, row_sizes = _band(sums, weights, counts, row_labels, row_sizes, row_limit, row_unit)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = np.where(weights > 0, sums / weights, np.nan)
+
+    tile = {
+        'rows_level': ROW_LEVELS[rows],
+        'row_key': row_key,
+        'col_key': col_key,
+        'z': z,
+        'answers': counts,
+        'rows': pd.Index(row_labels, name='Row'),
+        'columns': pd.Index(col_labels, name='Column'),
+        'row_sizes': row_sizes,
+        'column_sizes': col_sizes,
+        'cells': z.size,
+        'banded_rows': banded_rows,
+        'banded_columns': banded_columns,
+    }
+    with index['tiles_lock']:
+        index['tiles'][view] = tile
+        while len(index['tiles']) > config.HEATMAP_TILE_CACHE_SIZE:
+            index['tiles'].popitem(last=False)
+    return tile
+
+
+def tile_frame(tile: Dict[str, Any]) -> pd.DataFrame:
+    """Long format of a tile: one row per cell with its mean score and answer count."""
+    n_rows, n_cols = tile['z'].shape
+    return pd.DataFrame({
+        'Row': np.repeat(tile['rows'].to_numpy(dtype=object), n_cols),
+        'Column': np.tile(tile['columns'].to_numpy(dtype=object), n_rows),
+        'Avg Score': tile['z'].ravel(),
+        'Answers': tile['answers'].ravel(),
+    })
@@ -0,0 +1,219 @@
+# =============================
+# File: planner_engine.py
+# =============================
+"""
+Multi-skill training session planner.
+
+Covers every learner gap on the critical tasks (Avg_Score < critical_avg) with few sessions.
+A gap is an answered score below the gap threshold. Each session bundles up to
+`max_tasks` tasks of one Category, seats up to `capacity` learners and is led by a mentor
+who is an expert (>= expert threshold) in every bundled task.
+
+Sessions are chosen by lazy greedy set cover: candidates are the distinct mentor expertise
+profiles per category, each valued by the uncovered gaps its best session would close.
+Values only shrink as gaps get covered, so a candidate is re-evaluated only when it reaches
+the top of the heap with a stale value. One evaluation ranks all learners of the best bundle,
+and every group of `capacity` of them still worth at least the next candidate's value becomes
+a session. Mentors have no session cap by default, so only gaps on tasks without any
+schedulable expert stay unplanned.
+"""
+
+import heapq
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+from analytics_engine import build_score_matrix
+
+
+def _best_bundle(uncovered: np.ndarray, column_gaps: np.ndarray, experts_of: np.ndarray, max_tasks: int):
+    """
+    Best bundle for one mentor profile within a category: the profile tasks with the most uncovered
+    gaps (up to max_tasks), and every learner with uncovered gaps in it, most gaps first.
+    `column_gaps` holds the running uncovered count of each column of `uncovered`.
+    Returns (bundle task positions, ranked learner positions, their gap counts).
+    """
+    task_gaps = column_gaps[experts_of]
+    candidates = np.flatnonzero(experts_of)[task_gaps > 0]
+    if not len(candidates):
+        return candidates, candidates, candidates
+    bundle = candidates[np.argsort(-task_gaps[task_gaps > 0], kind='stable')[:max_tasks]]
+    learner_gaps = uncovered[:, bundle].sum(axis=1)
+    learners = np.flatnonzero(learner_gaps)
+    learners = learners[np.argsort(-learner_gaps[learners], kind='stable')]
+    return bundle, learners, learner_gaps[learners]
+
+
+def plan_training_sessions(
+    analytics: Dict[str, Any],
+    df: pd.DataFrame,
+    capacity: int = config.PLANNER_SESSION_CAPACITY,
+    max_tasks: int = config.PLANNER_MAX_TASKS_PER_SESSION,
+    max_sessions_per_mentor: Optional[int] = config.PLANNER_MAX_SESSIONS_PER_MENTOR,
+    scheduler_only: bool = True,
+    gap_threshold: Optional[float] = None,
+    start_date: Optional[date] = None,
+    slot_days: int = config.PLANNER_SLOT_DAYS
+) -> Dict[str, Any]:
+    """
+    Plans sessions for the analyzed dataset (compute_analytics output and the rows it was computed on).
+    With `scheduler_only`, only people with the Scheduler tag (person_summary) are seated as learners or mentors.
+    Without `max_sessions_per_mentor`, every schedulable gap on a task with an expert is planned;
+    mentors are still balanced by picking the least-loaded one of a profile.
+    Returns 'sessions' (one row per session), 'schedule' (one row per participant), 'coverage'
+    (gap counts) and 'unplanned' (remaining gaps per task). Sessions get the earliest time slot in
+    which none of their participants is busy; slots are `slot_days` apart from `start_date`.
+    """
+    thresholds = analytics['thresholds']
+    gap_threshold = thresholds['pipeline_min'] if gap_threshold is None else gap_threshold
+    task_summary = analytics['task_summary']
+    matrix = build_score_matrix(analytics['scores'])
+    names, tasks = matrix['names'], matrix['tasks']
+
+    critical = tasks.isin(task_summary.index[task_summary['Avg_Score'] < thresholds['critical_avg']])
+    categories = df.drop_duplicates('Task_Prefixed').set_index('Task_Prefixed')['Category'].reindex(tasks[critical]).fillna('Unknown').to_numpy()
+    # Columns grouped by category, so each category's block of the gap matrix is a view
+    by_category = np.argsort(categories, kind='stable')
+    categories = categories[by_category]
+    scores = matrix['scores'][:, np.flatnonzero(critical)[by_category]]
+    tasks = tasks[critical][by_category]
+    name_labels, task_labels = np.asarray(names, dtype=object), np.asarray(tasks, dtype=object)
+
+    with np.errstate(invalid='ignore'):
+        gaps = scores < gap_threshold  # NaN (unanswered) is never a gap
+        experts = scores >= thresholds['expert']
+    person_summary = analytics['person_summary']
+    person_summary = person_summary[~person_summary.index.duplicated()]
+    schedulable = np.ones(len(names), dtype=bool)
+    if scheduler_only and 'Scheduler tag' in person_summary.columns:
+        schedulable = person_summary['Scheduler tag'].reindex(names).fillna(False).to_numpy(dtype=bool)
+    total_gaps = int(gaps.sum())
+    uncovered = np.asfortranarray(gaps & schedulable[:, None])  # Column-major: sessions read a few task columns
+    experts &= schedulable[:, None]
+    not_schedulable = total_gaps - int(uncovered.sum())
+    no_mentor = int(uncovered[:, ~experts.any(axis=0)].sum())
+    uncovered[:, ~experts.any(axis=0)] = False
+
+    # Candidates: distinct expertise profiles per category; priority = cheap upper bound on the gain
+    heap, pools = [], []
+    category_start = np.searchsorted(categories, np.unique(categories))
+    for category, start, stop in zip(np.unique(categories), category_start, np.append(category_start[1:], len(categories))):
+        columns = slice(start, stop)
+        profiles, owner = np.unique(experts[:, columns], axis=0, return_inverse=True)
+        owner = owner.ravel()
+        column_gaps = uncovered[:, columns].sum(axis=0)
+        for p, profile in enumerate(profiles):
+            if not profile.any():
+                continue
+            bound = min(capacity * max_tasks, int(np.sort(column_gaps[profile])[::-1][:max_tasks].sum()))
+            if bound > 0:
+                pools.append({'category': category, 'columns': columns, 'profile': profile, 'mentors': list(np.flatnonzero(owner == p))})
+                heapq.heappush(heap, (-bound, len(pools) - 1))
+
+    column_gaps = uncovered.sum(axis=0)
+    load = np.zeros(len(names), dtype=int)
+    sessions: List[Dict[str, Any]] = []
+    while heap:
+        _, c = heapq.heappop(heap)
+        pool = pools[c]
+        if max_sessions_per_mentor is not None:
+            pool['mentors'] = [m for m in pool['mentors'] if load[m] < max_sessions_per_mentor]
+        if not pool['mentors']:
+            continue
+        next_bound = -heap[0][0] if heap else 0
+        # Re-check the cheap bound on current column counts before scanning learners
+        pool_gaps = column_gaps[pool['columns']][pool['profile']]
+        bound = min(capacity * max_tasks, int(np.sort(pool_gaps)[::-1][:max_tasks].sum()))
+        if bound <= 0:
+            continue
+        if bound < next_bound:
+            heapq.heappush(heap, (-bound, c))
+            continue
+        block = uncovered[:, pool['columns']]
+        bundle, ranked, ranked_gaps = _best_bundle(block, column_gaps[pool['columns']], pool['profile'], max_tasks)
+        # Consecutive groups of `capacity` ranked learners are the profile's next sessions on this bundle
+        group_gains = np.add.reduceat(ranked_gaps, np.arange(0, len(ranked), capacity)) if len(ranked) else ranked_gaps
+        if not len(group_gains):
+            continue
+        gain = int(group_gains[0])
+        if gain < next_bound:
+            heapq.heappush(heap, (-gain, c))  # Stale value: re-queue with the exact one
+            continue
+        # Every group at least as valuable as any other candidate's bound becomes a session
+        bundle_columns = pool['columns'].start + bundle
+        strength = np.nanmean(scores[np.ix_(pool['mentors'], bundle_columns)], axis=1)
+        for g, group_gain in enumerate(group_gains):
+            if group_gain < next_bound:
+                break
+            if max_sessions_per_mentor is not None:
+                available = load[pool['mentors']] < max_sessions_per_mentor
+                pool['mentors'] = [m for m, ok in zip(pool['mentors'], available) if ok]
+                strength = strength[available]
+                if not pool['mentors']:
+                    break
+            # Least-loaded mentor of the profile, strongest on the bundle among equals
+            mentor = pool['mentors'][np.lexsort((-strength, load[pool['mentors']]))[0]]
+            load[mentor] += 1
+            learners = np.sort(ranked[g * capacity:(g + 1) * capacity])
+            covered = uncovered[np.ix_(learners, bundle_columns)]
+            uncovered[np.ix_(learners, bundle_columns)] = False
+            column_gaps[bundle_columns] -= covered.sum(axis=0)
+            sessions.append({
+                'category': pool['category'], 'columns': bundle_columns, 'mentor': mentor,
+                'learners': learners, 'learner_gaps': covered.sum(axis=1), 'covered': int(covered.sum()),
+            })
+        heapq.heappush(heap, (-gain, c))  # The profile may lead more sessions
+
+    # Time slots: earliest slot in which neither the mentor nor any learner is already booked.
+    # Each person's booked slots are a bitmask, so the first free slot is the lowest zero bit of their union.
+    busy = [0] * len(names)
+    start_date = start_date or date.today()
+    session_rows, schedule_rows = [], []
+    for number, session in enumerate(sessions, start=1):
+        people = [session['mentor'], *session['learners']]
+        booked = 0
+        for p in people:
+            booked |= busy[p]
+        slot = (~booked & (booked + 1)).bit_length() - 1
+        for p in people:
+            busy[p] |= 1 << slot
+        session_date = start_date + timedelta(days=slot * slot_days)
+        task_list = '; '.join(task_labels[session['columns']])
+        mentor_name = name_labels[session['mentor']]
+        session_rows.append({
+            'Session': number, 'Date': session_date, 'Category': session['category'], 'Tasks': task_list,
+            'Mentor': mentor_name, 'Learners': len(session['learners']), 'Gaps Covered': session['covered'],
+        })
+        schedule_rows.append({
+            'Session': number, 'Date': session_date, 'Category': session['category'], 'Tasks': task_list,
+            'Role': 'Mentor', 'Name': mentor_name, 'Gaps Covered': 0,
+        })
+        schedule_rows.extend({
+            'Session': number, 'Date': session_date, 'Category': session['category'], 'Tasks': task_list,
+            'Role': 'Learner', 'Name': name_labels[learner], 'Gaps Covered': int(n),
+        } for learner, n in zip(session['learners'], session['learner_gaps']))
+
+    schedule = pd.DataFrame(schedule_rows, columns=['Session', 'Date', 'Category', 'Tasks', 'Role', 'Name', 'Gaps Covered'])
+    if 'Team Leader' in person_summary.columns:
+        schedule.insert(6, 'Team Leader', person_summary['Team Leader'].reindex(schedule['Name']).to_numpy())
+
+    remaining = gaps.copy()
+    for session in sessions:
+        remaining[np.ix_(session['learners'], session['columns'])] = False
+    planned = int(total_gaps - remaining.sum())
+    return {
+        'sessions': pd.DataFrame(session_rows, columns=['Session', 'Date', 'Category', 'Tasks', 'Mentor', 'Learners', 'Gaps Covered']),
+        'schedule': schedule,
+        'coverage': {
+            'gaps': total_gaps,
+            'planned': planned,
+            'not_schedulable': not_schedulable,
+            'no_mentor': no_mentor,
+            'mentor_limit': int(uncovered.sum()),  # Left over once every suitable mentor hit max_sessions_per_mentor (0 without a cap)
+            'critical_tasks': len(tasks),
+        },
+        'unplanned': pd.Series(remaining.sum(axis=0), index=tasks, name='Unplanned Gaps').loc[lambda s: s > 0].sort_values(ascending=False),
+    }
@@ -0,0 +1,253 @@
+# =============================
+# File: sketch_engine.py
+# =============================
+"""
+Mergeable per-task score sketches, so teams can be combined without sharing raw scores.
+
+A sketch holds, per task_key: answer count, score sum, expert / beginner counts at the
+config thresholds, the highest score among soon-expiring licenses, and a score histogram
+with 1 / config.SKETCH_BINS_PER_UNIT wide bins. No names or per-person rows are included.
+Sketches merge associatively and commutatively (counts and sums add, maxima take the max).
+
+Accuracy of merged results against the exact computation on the pooled raw data:
+- Answers, Avg_Score (up to float summation order), Expert_Count, Beginner_Count,
+  Risk Index, SPOF and Expiration Risk at the export thresholds: exact.
+- Quantiles and counts at other thresholds come from the histogram, where scores are rounded
+  to the nearest bin. For whole-percent scores (the CSV template format) they are exact.
+  Otherwise quantiles are off by at most half a bin (0.5 percentage points with the default
+  100 bins per unit), and scores within half a bin of a threshold may be counted on the wrong side.
+
+Usage:
+    python sketch_engine.py export userData.csv team_a.npz
+    python sketch_engine.py merge team_a.npz team_b.npz [...] [--csv org_summary.csv]
+"""
+
+import argparse
+import io
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import config
+from analytics_engine import build_task_summary, default_thresholds
+
+SKETCH_FORMAT_VERSION = 1
+
+
+def build_task_sketch(analytics: Dict[str, Any], df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Sketches one analyzed dataset (compute_analytics output and the rows it was computed on).
+    Down-weighting is not carried over: every remaining answer counts once.
+    """
+    scores = analytics['scores']
+    n_tasks, n_bins = len(scores['tasks']), config.SKETCH_BINS_PER_UNIT + 1
+    codes, values = scores['task'], scores['score']
+    thresholds = default_thresholds()
+
+    bins = np.clip(np.rint(values * config.SKETCH_BINS_PER_UNIT), 0, config.SKETCH_BINS_PER_UNIT).astype(np.int64)
+    histogram = np.bincount(codes.astype(np.int64) * n_bins + bins, minlength=n_tasks * n_bins).reshape(n_tasks, n_bins)
+    task_keys = df.drop_duplicates('Task_Prefixed').set_index('Task_Prefixed')['task_key'].reindex(scores['tasks'])
+
+    return {
+        'version': SKETCH_FORMAT_VERSION,
+        'bins_per_unit': config.SKETCH_BINS_PER_UNIT,
+        'expert': thresholds['expert'],
+        'beginner': thresholds['beginner'],
+        'teams': 1,
+        'people': len(scores['names']),
+        'task_keys': task_keys.to_numpy(dtype=str),
+        'labels': scores['tasks'].to_numpy(dtype=str),
+        'count': np.bincount(codes, minlength=n_tasks).astype(np.int64),
+        'sum': np.bincount(codes, values, minlength=n_tasks),
+        'expert_count': np.bincount(codes[values >= thresholds['expert']], minlength=n_tasks).astype(np.int64),
+        'beginner_count': np.bincount(codes[values < thresholds['beginner']], minlength=n_tasks).astype(np.int64),
+        'max_expiring': analytics['threshold_index']['max_expiring_score'].copy(),
+        'histogram': histogram.astype(np.int64),
+    }
+
+
+def merge_sketches(sketches: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combines sketches on the union of their task_keys. All sketches must share the histogram
+    resolution and the expert / beginner thresholds. Task labels come from the last sketch
+    that contains the task.
+    """
+    sketches = list(sketches)
+    if not sketches:
+        raise ValueError("No sketches to merge.")
+    first = sketches[0]
+    for sketch in sketches[1:]:
+        if (sketch['bins_per_unit'], sketch['expert'], sketch['beginner']) != (first['bins_per_unit'], first['expert'], first['beginner']):
+            raise ValueError("Sketches use different histogram resolutions or expert/beginner thresholds.")
+
+    # Sketches over the same task list (the common case) are summed in place first;
+    # groups are applied in order of their last member so later labels still win
+    groups: Dict[bytes, List[Dict[str, Any]]] = {}
+    last_seen: Dict[bytes, int] = {}
+    for position, sketch in enumerate(sketches):
+        key = sketch['task_keys'].dtype.str.encode() + sketch['task_keys'].tobytes()
+        groups.setdefault(key, []).append(sketch)
+        last_seen[key] = position
+
+    task_keys = pd.Index(np.concatenate([g[0]['task_keys'] for g in groups.values()])).unique().sort_values()
+    n_tasks = len(task_keys)
+    labels = np.empty(n_tasks, dtype=object)
+    merged = {
+        'count': np.zeros(n_tasks, dtype=np.int64),
+        'sum': np.zeros(n_tasks),
+        'expert_count': np.zeros(n_tasks, dtype=np.int64),
+        'beginner_count': np.zeros(n_tasks, dtype=np.int64),
+        'histogram': np.zeros((n_tasks, first['bins_per_unit'] + 1), dtype=np.int64),
+    }
+    max_expiring = np.full(n_tasks, -np.inf)
+    for key in sorted(groups, key=last_seen.get):
+        members = groups[key]
+        rows = task_keys.get_indexer(members[0]['task_keys'])
+        for field, total in merged.items():
+            group_total = members[0][field].copy()
+            for member in members[1:]:
+                group_total += member[field]
+            total[rows] += group_total
+        np.maximum.at(max_expiring, rows, np.max([m['max_expiring'] for m in members], axis=0))
+        labels[rows] = members[-1]['labels']
+
+    return dict(
+        merged,
+        version=SKETCH_FORMAT_VERSION,
+        bins_per_unit=first['bins_per_unit'],
+        expert=first['expert'],
+        beginner=first['beginner'],
+        teams=sum(s['teams'] for s in sketches),
+        people=sum(s['people'] for s in sketches),
+        task_keys=task_keys.to_numpy(dtype=str),
+        labels=labels.astype(str),
+        max_expiring=max_expiring,
+    )
+
+
+def sketch_task_summary(sketch: Dict[str, Any], overrides: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    """
+    task_summary (as in compute_analytics) from a sketch, indexed by Task_Prefixed.
+    `overrides` changes thresholds; expert / beginner counts are exact at the sketch
+    thresholds and histogram-based otherwise.
+    """
+    thresholds = dict(default_thresholds(), expert=sketch['expert'], beginner=sketch['beginner'])
+    thresholds.update(overrides or {})
+    values = np.arange(sketch['bins_per_unit'] + 1) / sketch['bins_per_unit']
+    expert_count = sketch['expert_count']
+    if thresholds['expert'] != sketch['expert']:
+        expert_count = sketch['histogram'][:, values >= thresholds['expert']].sum(axis=1)
+    beginner_count = sketch['beginner_count']
+    if thresholds['beginner'] != sketch['beginner']:
+        beginner_count = sketch['histogram'][:, values < thresholds['beginner']].sum(axis=1)
+
+    # Tasks sharing a display label are one task in the raw-data path too
+    by_label = pd.DataFrame({
+        'count': sketch['count'], 'sum': sketch['sum'], 'expert': expert_count,
+        'beginner': beginner_count, 'max_expiring': sketch['max_expiring'],
+    }).groupby(sketch['labels'], sort=True).agg({
+        'count': 'sum', 'sum': 'sum', 'expert': 'sum', 'beginner': 'sum', 'max_expiring': 'max',
+    })
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg_score = (by_label['sum'] / by_label['count']).to_numpy()
+    task_summary = build_task_summary(
+        pd.Index(by_label.index, name='Task_Prefixed'), avg_score,
+        by_label['expert'].to_numpy(), by_label['beginner'].to_numpy(), by_label['max_expiring'].to_numpy(),
+        thresholds,
+    )
+    task_summary.insert(0, 'Answers', by_label['count'].to_numpy())
+    return task_summary
+
+
+def sketch_quantiles(sketch: Dict[str, Any], quantiles: Sequence[float] = (0.1, 0.25, 0.5, 0.75, 0.9)) -> pd.DataFrame:
+    """
+    Per-task score quantiles from the histogram: the smallest bin value whose cumulative
+    share reaches q (numpy's 'inverted_cdf' method on the binned scores).
+    """
+    histogram = pd.DataFrame(sketch['histogram']).groupby(sketch['labels'], sort=True).sum()
+    cumulative = histogram.to_numpy().cumsum(axis=1)
+    totals = cumulative[:, -1:]
+    result = {}
+    for q in quantiles:
+        first_bin = (cumulative >= np.ceil(q * totals - 1e-9)).argmax(axis=1)
+        result[f"P{round(q * 100):g}"] = np.where(totals[:, 0] > 0, first_bin / sketch['bins_per_unit'], np.nan)
+    return pd.DataFrame(result, index=pd.Index(histogram.index, name='Task_Prefixed'))
+
+
+def export_sketch(sketch: Dict[str, Any]) -> bytes:
+    """Serializes a sketch to a compressed .npz (arrays only, no pickled objects)."""
+    buffer = io.BytesIO()
+    np.savez_compressed(
+        buffer,
+        meta=np.array([sketch['version'], sketch['bins_per_unit'], sketch['teams'], sketch['people']], dtype=np.int64),
+        thresholds=np.array([sketch['expert'], sketch['beginner']]),
+        task_keys=sketch['task_keys'],
+        labels=sketch['labels'],
+        count=sketch['count'],
+        sum=sketch['sum'],
+        expert_count=sketch['expert_count'],
+        beginner_count=sketch['beginner_count'],
+        max_expiring=sketch['max_expiring'],
+        histogram=sketch['histogram'].astype(np.uint32),
+    )
+    return buffer.getvalue()
+
+
+def load_sketch(data: bytes) -> Dict[str, Any]:
+    """Reads a sketch written by export_sketch(); raises ValueError for anything else."""
+    try:
+        with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+        version, bins_per_unit, teams, people = (int(v) for v in arrays.pop('meta'))
+        expert, beginner = (float(v) for v in arrays.pop('thresholds'))
+    except Exception as e:
+        raise ValueError(f"Not a skills sketch file: {e}") from e
+    if version != SKETCH_FORMAT_VERSION:
+        raise ValueError(f"Unsupported sketch format version {version}.")
+    if arrays['histogram'].shape != (len(arrays['task_keys']), bins_per_unit + 1):
+        raise ValueError("Sketch histogram does not match its task list.")
+    arrays['histogram'] = arrays['histogram'].astype(np.int64)
+    return dict(
+        arrays, version=version, bins_per_unit=bins_per_unit, teams=teams, people=people,
+        expert=expert, beginner=beginner,
+    )
+
+
+def main() -> None:
+    from analytics_engine import compute_analytics
+    from data_engine import load_and_process_data
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('export', help="Sketch a user CSV.")
+    p.add_argument('csv')
+    p.add_argument('out')
+    p = sub.add_parser('merge', help="Merge sketches and print the org-level task summary.")
+    p.add_argument('sketches', nargs='+')
+    p.add_argument('--csv', default=None, help="Also write the summary (with quantiles) to this CSV.")
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        data = load_and_process_data(args.csv, config.TASK_CATALOGS)
+        if data is None or data['merged_df'].empty:
+            raise SystemExit(f"{args.csv} contains no valid skill data.")
+        analytics = compute_analytics(data['merged_df'], data['user_df'])
+        with open(args.out, 'wb') as f:
+            f.write(export_sketch(build_task_sketch(analytics, analytics['df_merged_for_lookup'])))
+        return
+
+    sketches = []
+    for path in args.sketches:
+        with open(path, 'rb') as f:
+            sketches.append(load_sketch(f.read()))
+    merged = merge_sketches(sketches)
+    summary = sketch_task_summary(merged).join(sketch_quantiles(merged))
+    print(f"{merged['teams']} teams, {merged['people']} people, {len(summary)} tasks")
+    print(summary.sort_values('Risk Index', ascending=False).to_string())
+    if args.csv:
+        summary.to_csv(args.csv, sep=';')
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,17 @@ import pandas as pd
 from datetime import datetime
 from typing import Dict, Any
 import config
+from analytics_engine import (
+    forecast_expert_coverage, summarize_coverage_forecast, person_rankings, ranking_leaderboard
+)
+from data_engine import load_and_process_data
+from diff_engine import compare_snapshots
+from edit_engine import apply_edit, build_edit_state, export_edited_csv, score_grid
+from heatmap_engine import ROW_LEVELS, build_heatmap_index, heatmap_tile, tile_frame
+from planner_engine import plan_training_sessions
+from sketch_engine import (
+    build_task_sketch, export_sketch, load_sketch, merge_sketches, sketch_quantiles, sketch_task_summary
+)
 
 # --- Style Constants for Charts ---
 GRAY_PALETTE = px.colors.sequential.Greys
@@ -21,6 +32,53 @@ LIGHT_GRAY = "#CCCCCC"
 # UI Rendering Functions (Minimalist Style with Containers)
 # ==============================================================================
 
+def render_threshold_controls(defaults: Dict[str, float]) -> Dict[str, float]:
+    """Renders the what-if threshold sliders in the sidebar and returns the selected set."""
+    with st.sidebar:
+        st.subheader("What-If Thresholds")
+        st.caption("Redefine skill levels and risk cut-offs. Views update without re-running the full analysis.")
+        expert = st.slider("Expert (>=)", 0.0, 1.0, defaults['expert'], 0.05, key="th_expert")
+        beginner = st.slider("Beginner (<)", 0.0, 1.0, defaults['beginner'], 0.05, key="th_beginner")
+        pipeline_min, pipeline_max = st.slider(
+            "Talent pipeline range", 0.0, 1.0, (defaults['pipeline_min'], defaults['pipeline_max']), 0.01, key="th_pipeline"
+        )
+        critical_avg = st.slider("Critical task (Avg <)", 0.0, 1.0, defaults['critical_avg'], 0.05, key="th_critical")
+        high_risk = st.slider("High risk (Risk Index >)", 0.0, 10.0, defaults['high_risk'], 0.25, key="th_high_risk")
+    return {
+        'expert': expert,
+        'beginner': beginner,
+        'pipeline_min': pipeline_min,
+        'pipeline_max': pipeline_max,
+        'critical_avg': critical_avg,
+        'high_risk': high_risk,
+    }
+
+
+def render_quality_controls(num_flagged: int) -> str:
+    """Renders the sidebar selector for how flagged low-effort responses are treated."""
+    modes = {"Include": 'include', "Down-weight": 'downweight', "Exclude": 'exclude'}
+    with st.sidebar:
+        st.subheader("Response Quality")
+        label = st.radio(
+            f"Flagged responses ({num_flagged})", list(modes), horizontal=True, key="quality_mode",
+            help=f"Straight-lined or low-effort responses. Down-weight counts them at {config.QUALITY_DOWNWEIGHT:.0%} in task statistics."
+        )
+    return modes[label]
+
+
+def render_uncertainty_controls() -> Dict[str, bool]:
+    """Renders the sidebar toggles for bootstrap confidence intervals."""
+    with st.sidebar:
+        st.subheader("Uncertainty")
+        # Off by default: the bootstrap reruns whenever the expert or beginner slider moves
+        show = st.toggle("Show confidence intervals", value=False, key="ci_show",
+                         help=f"{config.BOOTSTRAP_CONFIDENCE:.0%} bootstrap intervals (up to {config.BOOTSTRAP_RESAMPLES:,} "
+                              "resamples, fewer for large datasets).")
+        rank = st.toggle("Rank risks by lower bound", value=False, key="ci_rank", disabled=not show,
+                         help="Only rank a task as high risk if it stays risky at the optimistic end of its interval.")
+    return {'show': show, 'rank_by_lower_bound': show and rank}
+
+
 def render_strategic_overview(
     df_merged: pd.DataFrame,
     user_df: pd.DataFrame,
@@ -31,6 +89,7 @@ def render_strategic_overview(
     """Renders the high-level dashboard tab (Minimalist with Containers)."""
     risk_radar: pd.DataFrame = analytics.get('risk_radar', pd.DataFrame())
     theme_counts: pd.DataFrame = analytics.get('comment_themes', pd.DataFrame())
+    intervals: pd.DataFrame = analytics.get('task_intervals', pd.DataFrame())
 
     col1, col2 = st.columns(2, gap="large")
     with col1:
@@ -54,7 +113,11 @@ def render_strategic_overview(
                 for skill_name, row in risk_data_head.iterrows():
                     avg_score = row.get('Avg_Score', 0)
                     risk_index = row.get('Risk Index', 0)
-                    st.metric(label=skill_name, value=f"{avg_score:.1%} Avg. Confidence", delta=f"Risk Index: {risk_index:.2f}", delta_color="normal")
+                    delta = f"Risk Index: {risk_index:.2f}"
+                    if skill_name in intervals.index:
+                        ci = intervals.loc[skill_name]
+                        delta += f" (CI {ci['Risk Index Low']:.2f}-{ci['Risk Index High']:.2f})"
+                    st.metric(label=skill_name, value=f"{avg_score:.1%} Avg. Confidence", delta=delta, delta_color="normal")
             else:
                 st.info("No risk data available.")
 
@@ -68,6 +131,21 @@ def render_strategic_overview(
 
             st.metric("Self-Assessment Response", f"{len(assessed_names)} / {len(all_user_names)}", f"{len(pending_assessment_names)} pending")
             st.metric("Score Data Quality", f"{score_parsing_errors} invalid entries", delta_color="off")
+
+            response_quality: pd.DataFrame = analytics.get('response_quality', pd.DataFrame())
+            flagged = response_quality[response_quality['Flag'] != ''] if not response_quality.empty else response_quality
+            mode_label = {'include': "included", 'downweight': "down-weighted", 'exclude': "excluded"}
+            st.metric("Low-Effort Responses", f"{len(flagged)} flagged",
+                      f"{mode_label.get(analytics.get('quality_mode', 'include'))} in analytics", delta_color="off")
+            with st.expander(f"View {len(flagged)} flagged"):
+                if not flagged.empty:
+                    st.dataframe(
+                        flagged.reset_index()[['Name', 'Flag', 'Answers', 'Mean', 'Std', 'Modal Share']],
+                        hide_index=True, use_container_width=True,
+                        column_config={"Modal Share": st.column_config.NumberColumn("Modal Share", format="%.2f")}
+                    )
+                else:
+                    st.info("No straight-lining or low-effort patterns detected.")
             # Expander naturally has a background from the theme, doesn't need extra border
             with st.expander(f"View {len(pending_assessment_names)} pending"):
                 if pending_assessment_names:
@@ -89,6 +167,66 @@ def render_strategic_overview(
             else:
                 st.info("No comment data found.")
 
+def render_out_of_core_overview(analytics: Dict[str, Any]):
+    """Renders the reduced dashboard for files analyzed out of core (task, person and theme aggregates only)."""
+    task_summary: pd.DataFrame = analytics['task_summary']
+    person_summary: pd.DataFrame = analytics['person_summary']
+    theme_counts: pd.DataFrame = analytics.get('comment_themes', pd.DataFrame())
+    st.info(f"This file is larger than {config.CHUNK_FILE_SIZE_MB} MB, so it was analyzed in {analytics['chunks']} blocks "
+            "without loading every score into memory. Task, risk and archetype views are available; views that need "
+            "individual scores (profiles, workbench, editing, heatmap) require a smaller file.")
+
+    col1, col2 = st.columns(2, gap="large")
+    with col1:
+        with st.container(border=True):
+            st.subheader("Team Vital Signs")
+            kpi1, kpi2, kpi3 = st.columns(3)
+            total = analytics['total_count']
+            kpi1.metric("People in File", total)
+            kpi2.metric("Active Participants", len(person_summary), f"{len(person_summary) / total if total else 0:.0%} Response Rate")
+            kpi3.metric("Score Data Quality", f"{analytics['parsing_errors']} invalid entries", delta_color="off")
+
+        with st.container(border=True):
+            st.subheader("Skill Risk Radar")
+            st.caption("Top 5 tasks with the highest risk (few experts, many beginners).")
+            for skill_name, row in analytics['risk_radar'].head(5).iterrows():
+                st.metric(label=skill_name, value=f"{row['Avg_Score']:.1%} Avg. Confidence",
+                          delta=f"Risk Index: {row['Risk Index']:.2f}", delta_color="normal")
+
+    with col2:
+        with st.container(border=True):
+            st.subheader("Top Comment Themes")
+            st.caption("Top themes from all user comments.")
+            if not theme_counts.empty:
+                fig_bar = px.bar(theme_counts.head(5), x='Mentions', y=theme_counts.head(5).index, orientation='h', text_auto=True,
+                                 template=PLOTLY_TEMPLATE)
+                fig_bar.update_traces(marker_color=DARK_GRAY)
+                fig_bar.update_layout(height=300, margin=dict(t=20, b=20, l=0, r=0), yaxis_title=None, xaxis_title="Mentions")
+                st.plotly_chart(fig_bar, use_container_width=True)
+            else:
+                st.info("No comment data found.")
+
+        with st.container(border=True):
+            st.subheader("Archetypes")
+            st.dataframe(person_summary['Archetype'].value_counts().rename_axis('Archetype').reset_index(name='People'),
+                         hide_index=True, use_container_width=True)
+
+    with st.container(border=True):
+        st.subheader("Task Summary")
+        st.caption(f"{int(task_summary['SPOF'].sum())} single points of failure, "
+                   f"{len(analytics['risk_matrix'])} high-risk tasks.")
+        st.dataframe(
+            analytics['risk_radar'].reset_index()[['Task_Prefixed', 'Avg_Score', 'Expert_Count', 'Beginner_Count', 'Risk Index', 'SPOF', 'Expiration Risk']],
+            hide_index=True, use_container_width=True,
+            column_config={"Avg_Score": st.column_config.ProgressColumn("Avg Score", format="%.2f", min_value=0, max_value=1)}
+        )
+
+    with st.container(border=True):
+        st.subheader("People")
+        st.dataframe(person_summary.reset_index().sort_values('Avg Score', ascending=False), hide_index=True, use_container_width=True,
+                     column_config={"Avg Score": st.column_config.ProgressColumn("Avg Score", format="%.2f", min_value=0, max_value=1)})
+
+
 def render_affinity_status(user_df: pd.DataFrame, analytics: Dict[str, Any]):
     """Renders the Affinity license and feedback tab (Minimalist with Containers)."""
     st.header("Affinity Status & Team Feedback")
@@ -143,6 +281,41 @@ def render_affinity_status(user_df: pd.DataFrame, analytics: Dict[str, Any]):
         else:
             st.info("No license expiration data found.")
 
+    with st.container(border=True):
+        st.subheader("Expert Coverage Forecast")
+        st.caption("Licensed experts remaining per task as licenses expire (no renewals assumed).")
+        expiry_index = analytics.get('expiry_index')
+        if expiry_index is None or len(expiry_index['tasks']) == 0:
+            st.info("No skill data available for a coverage forecast.")
+        else:
+            f1, f2 = st.columns(2)
+            as_of = f1.date_input("Evaluation date", value=datetime.now().date(), key="forecast_as_of")
+            horizon_months = f2.slider("Horizon (months)", 1, 24, config.FORECAST_HORIZON_MONTHS, key="forecast_horizon")
+            expert_th = analytics.get('thresholds', {}).get('expert', config.EXPERT_THRESHOLD)
+
+            forecast = forecast_expert_coverage(
+                expiry_index, pd.Timestamp(as_of), horizon_days=horizon_months * 30,
+                step_days=config.FORECAST_STEP_DAYS, expert_threshold=expert_th
+            )
+            coverage = summarize_coverage_forecast(forecast)
+            at_risk = coverage[coverage['Drops to One'].notna()]
+            if at_risk.empty:
+                st.info("Every task keeps at least two licensed experts over this horizon.")
+            else:
+                st.dataframe(
+                    at_risk.reset_index(), hide_index=True, use_container_width=True,
+                    column_config={
+                        "Drops to One": st.column_config.DateColumn("Drops to One Expert"),
+                        "Drops to Zero": st.column_config.DateColumn("Drops to Zero Experts"),
+                    }
+                )
+                shown = at_risk.index[:5]
+                forecast_long = forecast.loc[shown].T.reset_index().melt(id_vars='Date', var_name='Task', value_name='Experts')
+                fig_fc = px.line(forecast_long, x='Date', y='Experts', color='Task', line_shape='hv',
+                                 color_discrete_sequence=GRAY_PALETTE[::-1], template=PLOTLY_TEMPLATE)
+                fig_fc.update_layout(height=350, margin=dict(t=20, b=20), legend_title_text='', yaxis_title="Licensed Experts")
+                st.plotly_chart(fig_fc, use_container_width=True)
+
     # --- Re-added border=True ---
     with st.container(border=True):
         st.subheader("All Team Feedback")
@@ -175,20 +348,14 @@ def render_team_profiles(
         with st.container(border=True):
             st.subheader("Team Roster")
             all_user_names_list = sorted(user_df['Name'].unique())
-
-            ranking_df = person_summary.reset_index().sort_values('Avg Score', ascending=False)
-            ranking_df['Rank'] = ranking_df['Avg Score'].rank(method='min', ascending=False).astype(int)
-            merged_ranking = user_df[['Name']].drop_duplicates().merge(
-                ranking_df[['Name', 'Rank', 'Avg Score', 'Archetype']], on='Name', how='left'
-            )
-            merged_ranking['Assessed'] = merged_ranking['Name'].isin(set(df_merged['Name'].unique()))
-            merged_ranking.sort_values('Rank', ascending=True, na_position='last', inplace=True)
+            ranking_index: Dict[str, Any] = analytics['ranking_index']
             selected_person = st.selectbox("Select a Team Member", all_user_names_list, label_visibility="collapsed")
 
             st.dataframe(
-                merged_ranking, height=750, hide_index=True, use_container_width=True,
+                ranking_index['roster'], height=750, hide_index=True, use_container_width=True,
                 column_config={
                     "Assessed": st.column_config.CheckboxColumn("Assessed?", disabled=True),
+                    "Percentile": st.column_config.NumberColumn("Percentile", format="percent"),
                     "Avg Score": st.column_config.ProgressColumn(
                         "Avg Score", format="%.1f%%", min_value=0, max_value=1
                     )
@@ -199,28 +366,30 @@ def render_team_profiles(
         # --- Re-added border=True ---
         with st.container(border=True):
             st.subheader(f"Profile: {selected_person}")
+            standing = person_rankings(ranking_index, selected_person)
 
-            if selected_person not in set(df_merged['Name'].unique()):
+            response_quality: pd.DataFrame = analytics.get('response_quality', pd.DataFrame())
+            quality_flag = response_quality['Flag'].get(selected_person, '') if not response_quality.empty else ''
+            if standing is None and analytics.get('quality_mode') == 'exclude' and quality_flag:
+                st.info(f"**{selected_person}** is excluded for response quality ({quality_flag}). Switch Response Quality to Include or Down-weight to see this profile.")
+            elif standing is None:
                 st.warning(f"**{selected_person}** has not completed the self-assessment.")
             elif selected_person not in person_summary.index:
                 st.warning(f"Data for {selected_person} is missing from the person summary.")
             else:
                 person_stats = person_summary.loc[selected_person]
-                person_data = df_merged[df_merged['Name'] == selected_person].copy()
-                rank_val = merged_ranking.loc[merged_ranking['Name'] == selected_person, 'Rank'].iloc[0]
-                rank_display = f"#{int(rank_val)}" if pd.notna(rank_val) else "N/A"
 
                 c1, c2, c3 = st.columns(3)
-                c1.metric("Overall Rank", rank_display)
+                c1.metric("Overall Rank", f"#{standing['rank']} of {standing['of']}",
+                          help=f"Scores at or above {standing['percentile']:.0%} of assessed people.")
                 c2.metric("Average Score", f"{person_stats['Avg Score']:.1%}")
                 c3.metric("Archetype", person_stats['Archetype'])
                 st.divider()
 
-                team_avg_scores = df_merged.groupby('Category')['Score'].mean()
-                person_avg_scores = person_data.groupby('Category')['Score'].mean().reindex(team_avg_scores.index, fill_value=0)
-                categories_ordered = sorted(team_avg_scores.index)
-                team_avg_ordered = team_avg_scores.reindex(categories_ordered)
-                person_avg_ordered = person_avg_scores.reindex(categories_ordered)
+                category_standing = standing['categories']
+                categories_ordered = list(category_standing.index)
+                person_avg_ordered = category_standing['Score'].fillna(0)
+                team_avg_ordered = category_standing['Team Avg']
 
                 fig_radar = go.Figure()
                 fig_radar.add_trace(go.Scatterpolar(r=person_avg_ordered.values, theta=categories_ordered, fill='toself', name=f'{selected_person}', line_color=DARK_GRAY, fillcolor=f'rgba({int(DARK_GRAY[1:3], 16)},{int(DARK_GRAY[3:5], 16)},{int(DARK_GRAY[5:7], 16)},0.3)'))
@@ -228,8 +397,19 @@ def render_team_profiles(
                 fig_radar.update_layout(title="Confidence vs. Team Average by Category", template=PLOTLY_TEMPLATE, legend_title_text='')
                 st.plotly_chart(fig_radar, use_container_width=True)
 
+                st.markdown("**Standing by Category**")
+                st.dataframe(
+                    category_standing[category_standing['Rank'] > 0].reset_index(),
+                    hide_index=True, use_container_width=True,
+                    column_config={
+                        "Score": st.column_config.ProgressColumn("Score", format="%.1f%%", min_value=0, max_value=1),
+                        "Team Avg": st.column_config.NumberColumn("Team Avg", format="percent"),
+                        "Percentile": st.column_config.NumberColumn("Percentile", format="percent"),
+                    }
+                )
+
                 st.markdown("**Strengths & Development Areas**")
-                person_skills = person_data.set_index('Task_Prefixed')['Score'].sort_values(ascending=False)
+                person_skills = standing['tasks']['Score'].sort_values(ascending=False, kind='stable')
 
                 sc1, sc2 = st.columns(2)
                 # Group skills/areas in bordered containers if desired, or leave flat
@@ -261,6 +441,9 @@ def render_skill_analysis(df_merged: pd.DataFrame, analytics: Dict[str, Any]):
     Renders the deep-dive analysis by skill/category (Minimalist with Containers).
     """
     st.header("Skill Analysis")
+    thresholds: Dict[str, float] = analytics.get('thresholds', {})
+    expert_th = thresholds.get('expert', config.EXPERT_THRESHOLD)
+    beginner_th = thresholds.get('beginner', config.BEGINNER_THRESHOLD)
 
     # --- Re-added border=True ---
     with st.container(border=True):
@@ -284,19 +467,27 @@ def render_skill_analysis(df_merged: pd.DataFrame, analytics: Dict[str, Any]):
 
             c1, c2, c3 = st.columns(3)
             c1.metric("Avg Confidence", f"{avg_score_selected:.1%}")
-            c2.metric("Experts (>=80%)", skill_data[skill_data['Score'] >= config.EXPERT_THRESHOLD]['Name'].nunique())
-            c3.metric("Beginners (<40%)", skill_data[skill_data['Score'] < config.BEGINNER_THRESHOLD]['Name'].nunique())
+            c2.metric(f"Experts (>={expert_th:.0%})", skill_data[skill_data['Score'] >= expert_th]['Name'].nunique())
+            c3.metric(f"Beginners (<{beginner_th:.0%})", skill_data[skill_data['Score'] < beginner_th]['Name'].nunique())
             st.divider()
 
             s1, s2 = st.columns(2)
             with s1:
                 st.markdown("**Skill Leaderboard**")
-                leaderboard = skill_data.groupby('Name')['Score'].mean().sort_values(ascending=False).reset_index()
+                if len(selected) == 1:
+                    # Single task/category: precomputed ranks, no groupby
+                    leaderboard = ranking_leaderboard(analytics['ranking_index'], analysis_type, selected[0])
+                else:
+                    leaderboard = skill_data.groupby('Name')['Score'].mean().sort_values(ascending=False).reset_index()
+                    leaderboard.insert(0, 'Rank', leaderboard['Score'].rank(method='min', ascending=False).astype(int))
                 st.dataframe(
                     leaderboard, hide_index=True, use_container_width=True,
-                    column_config={"Score": st.column_config.ProgressColumn(
-                        "Confidence", format="%.1f%%", min_value=0, max_value=1
-                        )}
+                    column_config={
+                        "Score": st.column_config.ProgressColumn(
+                            "Confidence", format="%.1f%%", min_value=0, max_value=1
+                        ),
+                        "Percentile": st.column_config.NumberColumn("Percentile", format="percent"),
+                    }
                 )
             with s2:
                 st.markdown("**Score Distribution**")
@@ -314,11 +505,287 @@ def render_skill_analysis(df_merged: pd.DataFrame, analytics: Dict[str, Any]):
                 st.plotly_chart(fig_hist, use_container_width=True)
 
 
+def render_wave_comparison(current_data: Dict[str, Any], analytics: Dict[str, Any]):
+    """Renders the wave-to-wave diff against a previously exported dataset (Minimalist with Containers)."""
+    st.header("Wave Comparison")
+    st.caption("Upload the previous wave's CSV to see what changed in the current file.")
+
+    previous_csv = st.file_uploader("Previous wave CSV", type="csv", key="previous_wave_csv")
+    if previous_csv is None:
+        st.info("Upload a previous `userData.csv` to compare.")
+        return
+
+    # Diff is cached per uploaded file and expert threshold; cleared with the rest of the session on "Upload New Data"
+    expert_th = analytics.get('thresholds', {}).get('expert', config.EXPERT_THRESHOLD)
+    cache_key = (previous_csv.file_id, expert_th)
+    cache = st.session_state.get('wave_diff')
+    if cache is None or cache['key'] != cache_key:
+        previous_data = load_and_process_data(previous_csv, config.TASK_CATALOGS)
+        if previous_data is None or previous_data['merged_df'].empty:
+            st.warning("The previous wave file contains no valid skill data.")
+            return
+        cache = {'key': cache_key, 'diff': compare_snapshots(previous_data, current_data, expert_th)}
+        st.session_state.wave_diff = cache
+    diff: Dict[str, Any] = cache['diff']
+
+    with st.container(border=True):
+        st.subheader("What Changed")
+        k1, k2, k3, k4 = st.columns(4)
+        k1.metric("Score Changes", len(diff['score_changes']),
+                  f"{len(diff['new_answers'])} new, {len(diff['removed_answers'])} removed answers", delta_color="off")
+        k2.metric("New People", len(diff['new_people']))
+        k3.metric("Departed People", len(diff['departed_people']))
+        k4.metric("New SPOFs", len(diff['new_spofs']), f"{len(diff['resolved_spofs'])} resolved", delta_color="off")
+
+    col1, col2 = st.columns(2, gap="large")
+    with col1:
+        with st.container(border=True):
+            st.subheader("Biggest Movers")
+            movers = diff['person_movers'].head(15).reset_index()
+            if not movers.empty:
+                fig_movers = px.bar(movers, x='Avg Delta', y='Name', orientation='h', template=PLOTLY_TEMPLATE)
+                fig_movers.update_traces(marker_color=DARK_GRAY)
+                fig_movers.update_layout(height=400, margin=dict(t=20, b=20, l=0, r=0), yaxis_title=None,
+                                         xaxis_title="Avg Confidence Change", xaxis_tickformat='.0%',
+                                         yaxis=dict(autorange="reversed"))
+                st.plotly_chart(fig_movers, use_container_width=True)
+            else:
+                st.info("No people were assessed in both waves.")
+        with st.container(border=True):
+            st.subheader("People")
+            p1, p2 = st.columns(2)
+            p1.markdown("**New**")
+            p1.dataframe(pd.DataFrame({'Name': diff['new_people']}), hide_index=True, use_container_width=True)
+            p2.markdown("**Departed**")
+            p2.dataframe(pd.DataFrame({'Name': diff['departed_people']}), hide_index=True, use_container_width=True)
+
+    with col2:
+        with st.container(border=True):
+            st.subheader("Task Changes")
+            st.dataframe(diff['task_movers'], height=300, use_container_width=True,
+                         column_config={"Avg Delta": st.column_config.NumberColumn("Avg Delta", format="%.3f")})
+            if diff['new_spofs']:
+                st.warning("New single points of failure: " + ", ".join(diff['new_spofs']))
+        with st.container(border=True):
+            st.subheader("License Changes")
+            if not diff['license_changes'].empty:
+                st.dataframe(diff['license_changes'], hide_index=True, use_container_width=True)
+            else:
+                st.info("No license renewals or lapses between waves.")
+
+    with st.container(border=True):
+        st.subheader("All Score Changes")
+        st.dataframe(diff['score_changes'], height=300, hide_index=True, use_container_width=True)
+        a1, a2 = st.columns(2)
+        with a1.expander(f"New Answers ({len(diff['new_answers'])})"):
+            st.caption("Tasks answered in the new wave only, by people assessed in both waves.")
+            st.dataframe(diff['new_answers'], hide_index=True, use_container_width=True)
+        with a2.expander(f"Removed Answers ({len(diff['removed_answers'])})"):
+            st.caption("Tasks answered in the previous wave only, by people assessed in both waves.")
+            st.dataframe(diff['removed_answers'], hide_index=True, use_container_width=True)
+
+
+def render_org_rollup(df_merged: pd.DataFrame, analytics: Dict[str, Any]):
+    """Renders the team sketch export and the org-wide merge of team sketches (Minimalist with Containers)."""
+    st.header("Org Rollup")
+    st.caption("Teams share compact score sketches (counts and score histograms per task, no names or individual scores) and combine them into an org-wide view.")
+
+    # The export depends only on the analyzed dataset; cached with the rest of the session
+    cache = st.session_state.get('team_sketch')
+    if cache is None or cache['mode'] != analytics.get('quality_mode'):
+        sketch = build_task_sketch(analytics, df_merged)
+        cache = {'mode': analytics.get('quality_mode'), 'sketch': sketch, 'bytes': export_sketch(sketch)}
+        st.session_state.team_sketch = cache
+
+    with st.container(border=True):
+        st.subheader("Export This Dataset")
+        st.download_button(
+            label="Download Team Sketch",
+            data=cache['bytes'],
+            file_name="skills_sketch.npz",
+            mime="application/octet-stream",
+            help="Per-task counts, sums, expert/beginner counts and score histograms."
+        )
+        st.caption(f"{len(cache['sketch']['task_keys'])} tasks, {cache['sketch']['people']} people, {len(cache['bytes']) / 1024:.1f} KB.")
+
+    with st.container(border=True):
+        st.subheader("Combine Team Sketches")
+        include_current = st.checkbox("Include this dataset", value=True, key="rollup_include_current")
+        uploads = st.file_uploader("Team sketch files", type="npz", accept_multiple_files=True, key="rollup_sketches")
+
+        sketches = [cache['sketch']] if include_current else []
+        for upload in uploads or []:
+            try:
+                sketches.append(load_sketch(upload.getvalue()))
+            except ValueError as e:
+                st.warning(f"Skipped {upload.name}: {e}") # Use warning
+        if not sketches:
+            st.info("Upload team sketches to build the org-wide view.")
+            return
+        try:
+            merged = merge_sketches(sketches)
+        except ValueError as e:
+            st.warning(f"Could not combine sketches: {e}") # Use warning
+            return
+
+        thresholds: Dict[str, float] = analytics.get('thresholds', {})
+        org_summary = sketch_task_summary(merged, thresholds).join(sketch_quantiles(merged))
+        high_risk = org_summary['Risk Index'] > thresholds.get('high_risk', config.HIGH_RISK_INDEX)
+
+        k1, k2, k3, k4 = st.columns(4)
+        k1.metric("Teams", merged['teams'])
+        k2.metric("People", merged['people'])
+        k3.metric("Org Avg Confidence", f"{merged['sum'].sum() / max(merged['count'].sum(), 1):.1%}")
+        k4.metric("High-Risk Tasks", int(high_risk.sum()))
+        if (thresholds.get('expert', merged['expert']), thresholds.get('beginner', merged['beginner'])) != (merged['expert'], merged['beginner']):
+            st.caption("Expert/beginner counts use the score histograms because the thresholds differ from the exported ones (within 0.5 percentage points).")
+
+        st.dataframe(
+            org_summary.sort_values('Risk Index', ascending=False), height=450, use_container_width=True,
+            column_config={
+                "Avg_Score": st.column_config.ProgressColumn("Avg Score", format="%.2f", min_value=0, max_value=1),
+                "Risk Index": st.column_config.NumberColumn("Risk Index", format="%.2f"),
+                "Competency_Score": None,
+            }
+        )
+
+
+def render_score_editor(user_df: pd.DataFrame, analytics: Dict[str, Any]):
+    """Renders the editable score grid, the edit log and its CSV export (Minimalist with Containers)."""
+    st.header("Score Editor")
+    st.caption("Correct individual scores without re-uploading. Task statistics, risk views and archetypes update with each edit; rankings, the talent pipeline and forecasts update after re-uploading the exported file.")
+
+    # Built once per session; app.py rebuilds it (replaying the log) when the quality mode changes
+    edits = st.session_state.get('score_edits')
+    if edits is None:
+        edits = {'mode': analytics.get('quality_mode'), 'state': build_edit_state(analytics, user_df), 'skipped': []}
+        st.session_state.score_edits = edits
+    state = edits['state']
+    if edits['skipped']:
+        st.warning(f"{len(edits['skipped'])} edits refer to people not analyzed in this quality mode; they apply again when those people are included.") # Use warning
+
+    person_summary: pd.DataFrame = analytics.get('person_summary', pd.DataFrame())
+
+    with st.container(border=True):
+        st.subheader("Edit Scores")
+        c1, c2 = st.columns(2)
+        leaders = sorted(person_summary['Team Leader'].dropna().unique()) if 'Team Leader' in person_summary.columns else []
+        leader = c1.selectbox("Team Leader:", ["All"] + leaders, key="editor_leader")
+        category = c2.selectbox("Category:", sorted(state['categories'].dropna().unique()), key="editor_category")
+
+        names = state['names']
+        if leader != "All":
+            names = names[names.isin(person_summary.index[person_summary['Team Leader'] == leader])]
+        names = list(names)
+        tasks = list(state['tasks'][(state['categories'] == category).to_numpy()])
+        if not names or not tasks:
+            st.info("No people or tasks for this selection.")
+            return
+
+        grid = score_grid(state, names, tasks)
+        edited = st.data_editor(
+            grid, use_container_width=True, height=min(600, 40 + 35 * len(names)),
+            key=f"score_grid_{leader}_{category}",
+            column_config={
+                task: st.column_config.NumberColumn(task.split('] ', 1)[-1], min_value=0.0, max_value=1.0, step=0.01, format="percent")
+                for task in tasks
+            }
+        )
+
+        # Apply only the cells that differ from the current state; timed to show the incremental cost
+        changed = ~((edited == grid) | (edited.isna() & grid.isna()))
+        if changed.to_numpy().any():
+            start = datetime.now()
+            applied = 0
+            for name, task in changed.stack().loc[lambda s: s].index:
+                value = edited.at[name, task]
+                if apply_edit(state, name, task, None if pd.isna(value) else float(value)) is not None:
+                    applied += 1
+            st.session_state.last_edit_ms = (datetime.now() - start).total_seconds() * 1000 / max(applied, 1)
+            st.rerun() # Re-render every tab with the updated aggregates
+        if 'last_edit_ms' in st.session_state:
+            st.caption(f"Last edit applied in {st.session_state.last_edit_ms:.2f} ms.")
+
+    log = state['log']
+    with st.container(border=True):
+        st.subheader("Edit Log")
+        if not log:
+            st.info("No edits yet.")
+            return
+        k1, k2, k3 = st.columns(3)
+        k1.metric("Edits", len(log))
+        k2.metric("People Edited", len({entry['Name'] for entry in log}))
+        k3.metric("Tasks Edited", len({entry['Task_Prefixed'] for entry in log}))
+        st.dataframe(
+            pd.DataFrame(log).iloc[::-1], hide_index=True, use_container_width=True,
+            column_config={
+                "Old Score": st.column_config.NumberColumn("Old Score", format="percent"),
+                "New Score": st.column_config.NumberColumn("New Score", format="percent"),
+            }
+        )
+        everyone = st.checkbox("Export everyone (not only edited people)", value=False, key="editor_export_all")
+        st.download_button(
+            label="Download Corrected CSV",
+            data=export_edited_csv(state, user_df, edited_only=not everyone),
+            file_name="userData_corrected.csv",
+            mime="text/csv",
+            help="Same format as the upload file, with the edited scores. Re-upload it to refresh every view."
+        )
+
+
+def render_skills_heatmap(analytics: Dict[str, Any]):
+    """Renders the aggregated people x tasks heatmap with zoom controls (Minimalist with Containers)."""
+    st.header("Skills Heatmap")
+    st.caption(f"Average confidence by group of people and Category, aggregated on the server. Zoom into a group or a Category for detail; every view shows at most {config.HEATMAP_MAX_CELLS:,} cells.")
+
+    # Index and tiles depend only on the analyzed dataset; cached with the rest of the session
+    cache = st.session_state.get('heatmap_index')
+    if cache is None or cache['mode'] != analytics.get('quality_mode'):
+        cache = {'mode': analytics.get('quality_mode'), 'index': build_heatmap_index(analytics)}
+        st.session_state.heatmap_index = cache
+    index = cache['index']
+
+    with st.container(border=True):
+        c1, c2, c3 = st.columns(3)
+        rows = c1.radio("Group people by:", list(ROW_LEVELS), format_func=ROW_LEVELS.get, horizontal=True, key="heatmap_rows")
+        groups = index['row_groups'][rows][1]
+        row_key = c2.selectbox(f"Zoom into {ROW_LEVELS[rows]}:", ["All"] + list(groups), key=f"heatmap_row_{rows}")
+        col_key = c3.selectbox("Zoom into Category:", ["All"] + list(index['categories']), key="heatmap_col")
+        tile = heatmap_tile(index, rows, None if row_key == "All" else row_key, None if col_key == "All" else col_key)
+
+        if tile['cells'] == 0:
+            st.info("No answers for this selection.")
+            return
+        # Tasks are shown without the Category prefix already given by the zoom
+        columns = [c.split('] ', 1)[-1] for c in tile['columns']]
+        fig = go.Figure(go.Heatmap(
+            z=tile['z'], x=columns, y=list(tile['rows']), customdata=tile['answers'],
+            colorscale='Greys', zmin=0, zmax=1, colorbar=dict(title="Avg", tickformat=".0%"),
+            hovertemplate="%{y}<br>%{x}<br>Avg Score: %{z:.0%}<br>Answers: %{customdata}<extra></extra>"
+        ))
+        fig.update_layout(
+            template=PLOTLY_TEMPLATE, height=min(1200, max(400, 60 + 22 * len(tile['rows']))),
+            yaxis=dict(autorange='reversed'), margin=dict(l=0, r=0, t=30, b=0)
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+        notes = [f"{tile['cells']:,} cells"]
+        if tile['banded_rows'] or tile['banded_columns']:
+            notes.append("rows or columns with similar averages are merged into bands to stay within the cell limit")
+        st.caption("; ".join(notes) + ". Empty cells have no answers.")
+        st.download_button(
+            label="Download View (CSV)",
+            data=tile_frame(tile).to_csv(index=False, sep=';').encode('utf-8'),
+            file_name="skills_heatmap.csv",
+            mime="text/csv"
+        )
+
+
 # ==============================================================================
 # STREAMLINED ACTION TAB (Minimalist Style with Containers)
 # ==============================================================================
 def render_action_workbench(df_merged: pd.DataFrame, analytics: Dict[str, Any]):
-    """Renders the risk mitigation and group builder workbench (Minimalist with Containers)."""
+    """Renders the risk mitigation, group builder and session planner workbench (Minimalist with Containers)."""
     st.header("Action Workbench")
     st.caption("Use these tools to mitigate risks and build training groups.")
 
@@ -326,12 +793,15 @@ def render_action_workbench(df_merged: pd.DataFrame, analytics: Dict[str, Any]):
     talent_pipeline: pd.DataFrame = analytics.get('talent_pipeline', pd.DataFrame())
     df_merged_lookup: pd.DataFrame = analytics.get('df_merged_for_lookup')
     person_summary: pd.DataFrame = analytics.get('person_summary', pd.DataFrame())
+    thresholds: Dict[str, float] = analytics.get('thresholds', {})
+    expert_th = thresholds.get('expert', config.EXPERT_THRESHOLD)
+    beginner_th = thresholds.get('beginner', config.BEGINNER_THRESHOLD)
 
     if df_merged_lookup is None or person_summary is None:
         st.warning("Required data not available for this module.")
         return
 
-    sub_tabs = st.tabs(["Risk Mitigation", "Group Builder"])
+    sub_tabs = st.tabs(["Risk Mitigation", "Group Builder", "Session Planner"])
 
     with sub_tabs[0]:
         # --- Re-added border=True ---
@@ -343,6 +813,22 @@ def render_action_workbench(df_merged: pd.DataFrame, analytics: Dict[str, Any]):
                 st.info("No high-risk skills detected.")
             else:
                 high_risk_skills = risk_matrix.sort_values('Risk Index', ascending=False)
+                intervals: pd.DataFrame = analytics.get('task_intervals', pd.DataFrame())
+                if not intervals.empty:
+                    ci = intervals.reindex(high_risk_skills.index)
+                    fig_ci = go.Figure(go.Scatter(
+                        x=high_risk_skills['Risk Index'], y=high_risk_skills.index, mode='markers',
+                        marker=dict(color=DARK_GRAY, size=8),
+                        error_x=dict(type='data', symmetric=False, color=MEDIUM_GRAY,
+                                     array=ci['Risk Index High'] - high_risk_skills['Risk Index'],
+                                     arrayminus=high_risk_skills['Risk Index'] - ci['Risk Index Low'])
+                    ))
+                    fig_ci.add_vline(x=thresholds.get('high_risk', config.HIGH_RISK_INDEX), line_dash="dash", line_color=LIGHT_GRAY)
+                    fig_ci.update_layout(title=f"Risk Index with {config.BOOTSTRAP_CONFIDENCE:.0%} Confidence Interval",
+                                         template=PLOTLY_TEMPLATE, height=max(250, 40 * len(high_risk_skills)),
+                                         margin=dict(t=40, b=20, l=0, r=0), yaxis=dict(autorange="reversed"))
+                    st.plotly_chart(fig_ci, use_container_width=True)
+
                 selected_risk = st.selectbox(
                     "Select a high-risk skill to solve:",
                     options=high_risk_skills.index,
@@ -354,8 +840,8 @@ def render_action_workbench(df_merged: pd.DataFrame, analytics: Dict[str, Any]):
                     risk_info = high_risk_skills.loc[selected_risk]
                     c1, c2, c3 = st.columns(3)
                     c1.metric("Avg Confidence", f"{risk_info['Avg_Score']:.1%}")
-                    c2.metric("Experts (>=80%)", f"{int(risk_info['Expert_Count'])}")
-                    c3.metric("Beginners (<40%)", f"{int(risk_info['Beginner_Count'])}")
+                    c2.metric(f"Experts (>={expert_th:.0%})", f"{int(risk_info['Expert_Count'])}")
+                    c3.metric(f"Beginners (<{beginner_th:.0%})", f"{int(risk_info['Beginner_Count'])}")
 
                     st.markdown("---")
                     st.subheader("Action Plan")
@@ -363,7 +849,7 @@ def render_action_workbench(df_merged: pd.DataFrame, analytics: Dict[str, Any]):
                     c1, c2 = st.columns(2)
                     with c1:
                         st.markdown("##### Talent Pipeline")
-                        st.caption("People with 60-79% confidence.")
+                        st.caption(f"People with {thresholds.get('pipeline_min', config.PIPELINE_MIN):.0%}-{thresholds.get('pipeline_max', config.PIPELINE_MAX):.0%} confidence.")
                         pipeline_for_skill = talent_pipeline[talent_pipeline['Task_Prefixed'] == selected_risk]
                         if not pipeline_for_skill.empty:
                             st.dataframe(pipeline_for_skill[['Name', 'Archetype', 'Score']], hide_index=True, use_container_width=True)
@@ -372,10 +858,10 @@ def render_action_workbench(df_merged: pd.DataFrame, analytics: Dict[str, Any]):
 
                     with c2:
                         st.markdown("##### Available Mentors")
-                        st.caption("Experts (>=80%) for this skill.")
+                        st.caption(f"Experts (>={expert_th:.0%}) for this skill.")
                         all_experts = df_merged_lookup[
                             (df_merged_lookup['Task_Prefixed'] == selected_risk) &
-                            (df_merged_lookup['Score'] >= config.EXPERT_THRESHOLD)
+                            (df_merged_lookup['Score'] >= expert_th)
                         ]
                         if not all_experts.empty:
                              experts_with_archetype = pd.merge(
@@ -419,8 +905,8 @@ def render_action_workbench(df_merged: pd.DataFrame, analytics: Dict[str, Any]):
                         st.warning("No participants found for the selected criteria.")
                     else:
                         group_scores = filtered_df.groupby('Name')['Score'].mean().sort_values()
-                        mentors = group_scores[group_scores >= config.EXPERT_THRESHOLD].sort_values(ascending=False)
-                        learners = group_scores[group_scores < config.EXPERT_THRESHOLD].sort_values(ascending=True)
+                        mentors = group_scores[group_scores >= expert_th].sort_values(ascending=False)
+                        learners = group_scores[group_scores < expert_th].sort_values(ascending=True)
                         cols = st.columns(num_groups)
                         assigned = set()
 
@@ -446,4 +932,72 @@ def render_action_workbench(df_merged: pd.DataFrame, analytics: Dict[str, Any]):
                                     if group_data:
                                          st.dataframe(pd.DataFrame(group_data), hide_index=True, use_container_width=True)
                                     else:
-                                         st.warning(f"Not enough people to form Group {i+1}.")
\ No newline at end of file
+                                         st.warning(f"Not enough people to form Group {i+1}.")
+
+    with sub_tabs[2]:
+        with st.container(border=True):
+            st.subheader("Multi-Skill Session Planner")
+            st.markdown(f"**Goal:** Cover every learner gap on critical skills (avg < {thresholds.get('critical_avg', config.CRITICAL_AVG_SCORE):.0%}) with as few sessions as possible.")
+            st.caption("Each session bundles related tasks of one category and is led by an expert in all of them.")
+            with st.form("session_planner_form"):
+                p1, p2, p3 = st.columns(3)
+                capacity = p1.number_input("Learners per session:", 1, 30, value=config.PLANNER_SESSION_CAPACITY)
+                max_tasks = p2.number_input("Tasks per session:", 1, 10, value=config.PLANNER_MAX_TASKS_PER_SESSION)
+                max_per_mentor = p3.number_input("Sessions per mentor (0 = no limit):", 0, 100, value=config.PLANNER_MAX_SESSIONS_PER_MENTOR or 0)
+                p1, p2, p3 = st.columns(3)
+                gap_threshold = p1.slider(
+                    "Gap below score:", 0.0, 1.0, value=float(thresholds.get('pipeline_min', config.PIPELINE_MIN)), step=0.05,
+                    help="Answered scores below this count as a training gap."
+                )
+                start_date = p2.date_input("First session:", value=datetime.now().date())
+                scheduler_only = p3.checkbox("Only people with Scheduler tag", value=True)
+                submitted = st.form_submit_button("Plan Sessions", type="primary", use_container_width=True)
+
+            # Plan is kept across reruns (e.g. the download click) until the inputs change
+            key = (capacity, max_tasks, max_per_mentor, gap_threshold, start_date, scheduler_only,
+                   analytics.get('quality_mode'), tuple(sorted(thresholds.items())))
+            if submitted:
+                st.session_state.session_plan = {'key': key, 'plan': plan_training_sessions(
+                    analytics, df_merged_lookup, capacity=capacity, max_tasks=max_tasks,
+                    max_sessions_per_mentor=max_per_mentor or None, scheduler_only=scheduler_only,
+                    gap_threshold=gap_threshold, start_date=start_date
+                )}
+            cached = st.session_state.get('session_plan')
+            if cached is None or cached['key'] != key:
+                st.info("Set the session limits and click 'Plan Sessions'.")
+                return
+            plan = cached['plan']
+            coverage = plan['coverage']
+
+            k1, k2, k3, k4 = st.columns(4)
+            k1.metric("Sessions", len(plan['sessions']))
+            k2.metric("Time Slots", plan['sessions']['Date'].nunique())
+            k3.metric("Gaps Planned", f"{coverage['planned']} of {coverage['gaps']}")
+            k4.metric("Critical Skills", coverage['critical_tasks'])
+            if coverage['not_schedulable']:
+                st.caption(f"{coverage['not_schedulable']} gaps belong to people without the Scheduler tag.")
+            if coverage['planned'] + coverage['not_schedulable'] == coverage['gaps']:
+                st.success("Every schedulable gap is covered by a session.")
+            if coverage['no_mentor']:
+                st.warning(f"{coverage['no_mentor']} gaps are on skills with no available expert to mentor.") # Use warning
+            if coverage['mentor_limit']:
+                st.warning(f"{coverage['mentor_limit']} gaps remain because every suitable mentor reached {max_per_mentor} sessions. "
+                           "Raise or clear the sessions-per-mentor limit to plan them.") # Use warning
+
+            if plan['sessions'].empty:
+                st.info("No sessions needed for the current settings.")
+                return
+            st.dataframe(
+                plan['sessions'], hide_index=True, use_container_width=True, height=400,
+                column_config={"Date": st.column_config.DateColumn("Date", format="YYYY-MM-DD")}
+            )
+            st.download_button(
+                label="Download Schedule (CSV)",
+                data=plan['schedule'].to_csv(index=False, sep=';').encode('utf-8'),
+                file_name="training_schedule.csv",
+                mime="text/csv",
+                help="One row per participant: session, date, tasks, role and name."
+            )
+            if not plan['unplanned'].empty:
+                with st.expander(f"Unplanned gaps by skill ({int(plan['unplanned'].sum())})"):
+                    st.dataframe(plan['unplanned'], use_container_width=True)